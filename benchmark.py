@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Excel Sorter processing stages on synthetic lead lists
+
+Usage:
+    python benchmark.py fuzzy --rows 10000 50000 100000
+    python benchmark.py memory --rows 1000000
+    python benchmark.py write --rows 200000
+    python benchmark.py csv --mb 1024
+    python benchmark.py startup [--exe dist/run_excel_sorter.exe]
+    python benchmark.py social --links 1000 5000 20000
+"""
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from excel_sorter import ExcelSorter, HAS_PYARROW, OUTPUT_FORMATS, peak_rss_mb, read_csv_fast, save_output
+
+WORDS = ['dental', 'care', 'city', 'auto', 'repair', 'pizza', 'family', 'law', 'group',
+         'plumbing', 'best', 'smile', 'green', 'home', 'services', 'clinic', 'studio', 'north']
+
+
+def make_leads(rows, seed=0):
+    """Synthetic lead list where about 10% of rows are variants of another business"""
+    rng = np.random.default_rng(seed)
+    businesses = max(1, int(rows * 0.9))
+    words = rng.choice(WORDS, size=(businesses, 2))
+    tokens = rng.integers(ord('a'), ord('z') + 1, size=(businesses, 7), dtype=np.uint8)
+    tokens = tokens.view('S7').ravel().astype(str)
+    base_names = np.char.add(np.char.add(np.char.add(words[:, 0], ' '), np.char.add(words[:, 1], ' ')), tokens)
+    picks = np.concatenate([np.arange(businesses), rng.integers(0, businesses, rows - businesses)])
+    names = base_names[picks].astype(object)
+    # Duplicates get a small spelling variation and usually no website
+    names[businesses:] = [name.replace(' ', '  ', 1) + ' LLC' for name in names[businesses:]]
+    has_website = (np.arange(rows) < businesses) | (rng.random(rows) < 0.3)
+    websites = np.where(has_website, np.char.add(np.char.add('https://www.site', picks.astype(str)), '.com'), '')
+    has_phone = rng.random(rows) < 0.5
+    phones = np.where(has_phone, np.char.add('555', np.char.zfill((picks % 10**7).astype(str), 7)), '')
+    return pd.DataFrame({
+        'Business Name': names,
+        'Website': websites.astype(object),
+        'Phone': phones.astype(object),
+        'Reviews': rng.integers(0, 5000, rows),
+        'Rating': np.round(rng.uniform(1, 5, rows), 1),
+    })
+
+
+def bench_fuzzy(sizes):
+    """Time process_dataframe with and without fuzzy duplicate grouping"""
+    print(f"{'rows':>10} {'exact (s)':>10} {'fuzzy (s)':>10} {'comparisons':>12} {'per row':>8}")
+    for rows in sizes:
+        df = make_leads(rows)
+        start = time.perf_counter()
+        ExcelSorter().process_dataframe(df)
+        exact = time.perf_counter() - start
+
+        sorter = ExcelSorter(fuzzy_dedup=True)
+        start = time.perf_counter()
+        sorter.process_dataframe(df)
+        fuzzy = time.perf_counter() - start
+        comparisons = sorter.last_fuzzy_comparisons
+        print(f"{rows:>10} {exact:>10.2f} {fuzzy:>10.2f} {comparisons:>12} {comparisons / rows:>8.2f}")
+
+
+def _memory_run(data_file, low_memory, results):
+    """Process a saved synthetic list in a fresh process and report its peak memory"""
+    df = pd.read_pickle(data_file)
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    ExcelSorter(low_memory=low_memory).process_dataframe(df)
+    results.put((before, peak_rss_mb(), time.perf_counter() - start))
+
+
+def bench_memory(rows):
+    """Peak RSS of process_dataframe with and without low-memory mode"""
+    if peak_rss_mb() is None:
+        print("Peak memory cannot be measured on this platform")
+        return
+    # Each mode runs in its own process that only loads the finished frame,
+    # so building the test data does not inflate the measured peak
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_file = os.path.join(tmp_dir, 'leads.pkl')
+        make_leads(rows).to_pickle(data_file)
+        
+        print(f"{'mode':>12} {'rows':>10} {'loaded (MB)':>12} {'peak (MB)':>10} {'added (MB)':>11} {'time (s)':>9}")
+        for low_memory in (False, True):
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_memory_run, args=(data_file, low_memory, results))
+            process.start()
+            before, peak, seconds = results.get()
+            process.join()
+            mode = 'low-memory' if low_memory else 'default'
+            print(f"{mode:>12} {rows:>10} {before:>12.0f} {peak:>10.0f} {peak - before:>11.0f} {seconds:>9.2f}")
+
+
+def bench_write(rows):
+    """Write throughput and file size of each output format"""
+    df = ExcelSorter().process_dataframe(make_leads(rows))
+    print(f"{'format':>8} {'rows':>10} {'time (s)':>9} {'rows/s':>10} {'size (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for output_format in OUTPUT_FORMATS:
+            if output_format == 'parquet' and not HAS_PYARROW:
+                print(f"{output_format:>8} {'skipped, pyarrow is not installed':>41}")
+                continue
+            output_file = os.path.join(tmp_dir, f"leads.{output_format}")
+            start = time.perf_counter()
+            save_output(df, output_file)
+            seconds = time.perf_counter() - start
+            size = os.path.getsize(output_file) / (1024 * 1024)
+            print(f"{output_format:>8} {len(df):>10} {seconds:>9.2f} {len(df) / seconds:>10.0f} {size:>10.1f}")
+
+
+def bench_csv(megabytes):
+    """Parse throughput of plain pd.read_csv and read_csv_fast on a large CSV file"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_file = os.path.join(tmp_dir, 'leads.csv')
+        chunk = make_leads(500000)
+        chunk.to_csv(csv_file, index=False)
+        while os.path.getsize(csv_file) < megabytes * 1024 * 1024:
+            chunk.to_csv(csv_file, index=False, header=False, mode='a')
+        del chunk
+        size = os.path.getsize(csv_file) / (1024 * 1024)
+        
+        engine = 'pyarrow' if HAS_PYARROW else f"{os.cpu_count()} processes"
+        print(f"{'reader':>28} {'MB':>7} {'rows':>10} {'time (s)':>9} {'MB/s':>7}")
+        for name, read in (('pd.read_csv', pd.read_csv), (f"read_csv_fast ({engine})", read_csv_fast)):
+            start = time.perf_counter()
+            rows = len(read(csv_file))
+            seconds = time.perf_counter() - start
+            print(f"{name:>28} {size:>7.0f} {rows:>10} {seconds:>9.2f} {size / seconds:>7.1f}")
+
+
+def bench_startup(runs, exe=None):
+    """Wall time of the CLI, the GUI module and the GUI window to start (best of runs)"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    gui_modules = "import excel_sorter_gui, lazy_import; lazy_import.preload(excel_sorter_gui.PRELOAD_MODULES).join()"
+    commands = [
+        ('CLI --help', [sys.executable, os.path.join(here, 'excel_sorter.py'), '--help']),
+        ('GUI module import', [sys.executable, '-c', 'import excel_sorter_gui']),
+        ('GUI module + all dependencies', [sys.executable, '-c', gui_modules]),
+        ('GUI window shown', [sys.executable, os.path.join(here, 'run_excel_sorter.py')]),
+    ]
+    if exe:
+        commands.append(('frozen executable window', [exe]))
+    
+    # The GUI closes itself once its window is drawn
+    env = dict(os.environ, EXCEL_SORTER_STARTUP_CHECK='1')
+    print(f"{'startup':>30} {'best (s)':>9}")
+    for name, command in commands:
+        best = None
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = subprocess.run(command, cwd=here, env=env, stdin=subprocess.DEVNULL,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            seconds = time.perf_counter() - start
+            if result.returncode != 0:
+                best = None
+                break
+            best = seconds if best is None else min(best, seconds)
+        print(f"{name:>30} {best:>9.2f}" if best is not None else f"{name:>30} {'failed':>9}")
+
+
+def make_link_page(links, seed=0):
+    """Synthetic HTML page with mostly internal links and some social, share and look-alike links"""
+    rng = np.random.default_rng(seed)
+    templates = [
+        '/page/{i}', '/blog/post-{i}', 'https://partner{i}.com/about', 'https://box.com/s/{i}',
+        'https://www.facebook.com/sharer/sharer.php?u=https://a.com/{i}', 'https://twitter.com/intent/tweet?url={i}',
+        'https://www.facebook.com/business{i}/', 'https://www.linkedin.com/company/business{i}',
+        'https://x.com/business{i}', 'https://www.youtube.com/channel/UC{i}', 'mailto:info{i}@a.com',
+    ]
+    # Internal links are by far the most common
+    weights = np.array([30, 30, 8, 2, 2, 2, 1, 1, 1, 1, 2], dtype=float)
+    picks = rng.choice(len(templates), size=links, p=weights / weights.sum())
+    anchors = ''.join(f'<a href="{templates[pick].format(i=i)}">link {i}</a>' for i, pick in enumerate(picks))
+    return f"<html><body>{anchors}</body></html>"
+
+
+def bench_social(link_counts):
+    """Time the social link classifier on parsed pages with many links"""
+    import bs4
+    from enrichment import WebsiteEnricher
+    
+    enricher = WebsiteEnricher(parse_workers=0)
+    print(f"{'links':>8} {'time (ms)':>10} {'per link (us)':>14} {'platforms':>10}")
+    for links in link_counts:
+        soup = bs4.BeautifulSoup(make_link_page(links), 'lxml')
+        start = time.perf_counter()
+        found = enricher._extract_social_links(soup, 'https://a.com/')
+        seconds = time.perf_counter() - start
+        print(f"{links:>8} {seconds * 1000:>10.1f} {seconds / links * 1e6:>14.2f} {len(found):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Excel Sorter benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    fuzzy = subparsers.add_parser('fuzzy', help='Fuzzy duplicate grouping scaling')
+    fuzzy.add_argument('--rows', type=int, nargs='+', default=[10000, 50000, 100000, 300000])
+
+    memory = subparsers.add_parser('memory', help='Peak memory of the default and low-memory modes')
+    memory.add_argument('--rows', type=int, default=1000000)
+
+    write = subparsers.add_parser('write', help='Write throughput of the output formats')
+    write.add_argument('--rows', type=int, default=200000)
+
+    csv_parser = subparsers.add_parser('csv', help='CSV parse throughput')
+    csv_parser.add_argument('--mb', type=int, default=1024, help='Size of the generated CSV file')
+
+    startup = subparsers.add_parser('startup', help='Import and startup time of the CLI and GUI')
+    startup.add_argument('--runs', type=int, default=5)
+    startup.add_argument('--exe', help='Frozen executable built from run_excel_sorter.spec')
+
+    social = subparsers.add_parser('social', help='Social link classification on pages with many links')
+    social.add_argument('--links', type=int, nargs='+', default=[1000, 5000, 20000])
+
+    args = parser.parse_args()
+    if args.benchmark == 'fuzzy':
+        bench_fuzzy(args.rows)
+    elif args.benchmark == 'memory':
+        bench_memory(args.rows)
+    elif args.benchmark == 'write':
+        bench_write(args.rows)
+    elif args.benchmark == 'csv':
+        bench_csv(args.mb)
+    elif args.benchmark == 'startup':
+        bench_startup(args.runs, args.exe)
+    elif args.benchmark == 'social':
+        bench_social(args.links)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1537 @@
+"""
+Website contact enrichment: fetching, parsing and incremental storage
+
+The scraping core behind "Fetch Website Info". It has no GUI dependencies,
+so headless workers (enrichment_queue.py) and the parse worker processes
+can import it without tkinter.
+"""
+
+import re
+import os
+import multiprocessing
+import threading
+import time
+from urllib.parse import urlparse, urlsplit, urljoin
+from collections import defaultdict
+from functools import lru_cache
+import random
+import socket
+import zlib
+import sqlite3
+import hashlib
+import json
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from lazy_import import lazy_import
+from excel_sorter import SCORE_COLUMN, registrable_domain
+
+# Heavy dependencies are imported when a stage first needs them
+pd = lazy_import('pandas')
+phonenumbers = lazy_import('phonenumbers')
+requests = lazy_import('requests')
+bs4 = lazy_import('bs4')
+urllib3 = lazy_import('urllib3')
+
+# HTTP status codes worth retrying; every other 4xx is treated as final
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Contact page keywords and their weight when ranking candidate links
+CONTACT_KEYWORD_WEIGHTS = {
+    'contact us': 10, 'contact': 8, 'get in touch': 7, 'reach us': 6, 'get in contact': 6,
+    'find us': 5, 'about us': 4, 'about': 3, 'reach': 2, 'connect': 2, 'info': 1,
+}
+
+# Content types worth downloading and parsing, anything else is skipped unread
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+
+# Social profile columns added by fetch_website_info_for_df
+SOCIAL_URL_COLUMNS = ['Facebook_URL', 'Instagram_URL', 'LinkedIn_URL', 'Twitter_URL', 'YouTube_URL', 'Pinterest_URL']
+
+# Social platform of each site, matched on the whole host or a parent domain
+# of it (m.facebook.com is Facebook, box.com is not Twitter)
+SOCIAL_PLATFORM_HOSTS = {
+    'facebook.com': 'Facebook',
+    'fb.com': 'Facebook',
+    'twitter.com': 'Twitter',
+    'x.com': 'Twitter',  # Twitter's new domain
+    'linkedin.com': 'LinkedIn',
+    'instagram.com': 'Instagram',
+    'youtube.com': 'YouTube',
+    'pinterest.com': 'Pinterest',
+}
+
+# First path segments (lowercase) of share buttons, intents, posts and other
+# pages of a platform that are not the business's profile
+SOCIAL_NON_PROFILE_PATHS = {
+    'Facebook': {'sharer', 'sharer.php', 'share', 'share.php', 'dialog', 'plugins', 'tr', 'l.php',
+                 'login', 'login.php', 'policies', 'privacy', 'help', 'events', 'watch', 'photo.php',
+                 'photo', 'photos', 'permalink.php', 'story.php', 'hashtag', 'marketplace', 'gaming',
+                 'reel', 'reels', 'video.php', 'videos', 'media', 'search', 'home.php', 'notes',
+                 'fundraisers', 'business', 'ads', 'legal', 'about', 'settings', 'messages'},
+    'Twitter': {'intent', 'share', 'home', 'search', 'hashtag', 'i', 'login', 'privacy', 'tos'},
+    'LinkedIn': {'sharing', 'sharearticle', 'share', 'cws', 'login', 'legal'},
+    'Instagram': {'p', 'reel', 'explore', 'accounts', 'legal'},
+    'YouTube': {'watch', 'embed', 'results', 'redirect', 'share', 'shorts', 'playlist'},
+    'Pinterest': {'pin', 'search'},
+}
+
+# Path segments of a profile URL by platform and first path segment (None
+# for any other), so links to posts cut down to their profile, e.g.
+# twitter.com/<handle>/status/<id> and linkedin.com/company/<name>/about
+SOCIAL_PROFILE_SEGMENTS = {
+    'Facebook': {'pages': 3, 'people': 3, 'groups': 2, None: 1},
+    'Twitter': {None: 1},
+    'LinkedIn': {None: 2},
+    'Instagram': {None: 1},
+    'YouTube': {'channel': 2, 'c': 2, 'user': 2, None: 1},
+    'Pinterest': {None: 1},
+}
+
+# Error of rows whose scrape was stopped by a cancelled job
+CANCELLED_ERROR = 'Cancelled'
+
+# Error of rows whose first request was refused because the page budget was spent
+BUDGET_SPENT_ERROR = 'Page budget spent'
+
+# Budgeted fetches: column marking the rows left unfetched when the time
+# limit or page budget ran out, and the leads fetched before estimating
+FETCH_STATUS_COLUMN = 'Fetch_Status'
+NOT_REACHED_STATUS = 'Not reached'
+BUDGET_SAMPLE_LEADS = 10
+
+# Sites fetched by a dry run to measure latency, page count and failure rate
+DRY_RUN_SAMPLE_SITES = 20
+
+# Incremental enrichment results, stored in the folder of the enriched file
+ENRICHMENT_STORE_FILENAME = 'enrichment_cache.sqlite'
+
+# HTML parse processes: started only for runs with at least this many rows
+# to fetch (smaller runs parse inline); the environment variable overrides
+# the default number of processes (one per CPU core but one)
+PARSE_POOL_MIN_ROWS = 50
+PARSE_WORKERS_ENV = 'EXCEL_SORTER_PARSE_WORKERS'
+
+# Link targets that are never HTML pages worth scraping
+NON_HTML_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.zip', '.rar',
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.mp3', '.mp4', '.mov', '.avi',
+)
+
+
+class HostCircuitBreaker:
+    """Stop sending requests to hosts that keep failing"""
+    def __init__(self, failure_threshold=3, reset_timeout=300):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = defaultdict(int)
+        self._opened_at = {}
+        self._lock = threading.Lock()
+    
+    def allow(self, host):
+        """Return True if a request to this host may be attempted"""
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at >= self.reset_timeout:
+                # Half-open: let one request through, a single failure re-opens
+                del self._opened_at[host]
+                self._failures[host] = self.failure_threshold - 1
+                return True
+            return False
+    
+    def record_success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+    
+    def record_failure(self, host):
+        """Record a failure, returns True if the circuit just opened"""
+        with self._lock:
+            self._failures[host] += 1
+            if self._failures[host] >= self.failure_threshold and host not in self._opened_at:
+                self._opened_at[host] = time.monotonic()
+                return True
+            return False
+
+
+class HostRateLimiter:
+    """Token bucket rate limiter keyed by host"""
+    def __init__(self, rate=1.0, burst=2):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._buckets = {}  # host -> (tokens, last refill time)
+        self._lock = threading.Lock()
+    
+    def acquire(self, host):
+        """Block until a request to host is allowed, returns the seconds waited"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            # Take the token now (possibly going negative) so concurrent callers queue up
+            tokens -= 1
+            self._buckets[host] = (tokens, now)
+            wait = -tokens / self.rate if tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+@lru_cache(maxsize=4096)
+def social_domain(host):
+    """Key of SOCIAL_PLATFORM_HOSTS for a lowercase host, the host itself or a parent domain, else None"""
+    while host:
+        if host in SOCIAL_PLATFORM_HOSTS:
+            return host
+        host = host.partition('.')[2]
+    return None
+
+
+def canonical_social_link(href):
+    """(platform, canonical profile URL) for a link to a social profile, else None
+    
+    The profile URL is https on the platform's main domain, without query,
+    fragment or trailing slash, and links to a post or subpage of a profile
+    are cut down to the profile. The path keeps its case (YouTube channel
+    ids are case-sensitive). Share buttons, intents and posts without a
+    profile in their path are not profiles.
+    """
+    href = href.strip()
+    # Relative links stay on the page's own site
+    if not href[:8].lower().startswith(('http://', 'https://', '//')):
+        return None
+    try:
+        parts = urlsplit(href)
+        host = parts.hostname
+    except ValueError:
+        return None
+    domain = social_domain(host) if host else None
+    if domain is None:
+        return None
+    platform = SOCIAL_PLATFORM_HOSTS[domain]
+    
+    segments = [segment for segment in parts.path.split('/') if segment]
+    first_segment = segments[0].lower() if segments else ''
+    if not first_segment or first_segment in SOCIAL_NON_PROFILE_PATHS[platform]:
+        return None
+    profile_segments = SOCIAL_PROFILE_SEGMENTS[platform]
+    count = profile_segments.get(first_segment, profile_segments[None])
+    if len(segments) < count:
+        return None
+    url = f"https://{domain}/{'/'.join(segments[:count])}"
+    if first_segment == 'profile.php':
+        # Numeric Facebook profiles are only identified by their id parameter
+        profile_id = next((value for key, _, value in (pair.partition('=') for pair in parts.query.split('&'))
+                           if key == 'id' and value), None)
+        if profile_id is None:
+            return None
+        url += f"?id={profile_id}"
+    return platform, url
+
+
+def permanent_connection_error(error):
+    """Whether a connection error is a failed DNS lookup or a refused connection
+    
+    Follows the chain of wrapped errors (requests wraps urllib3, which wraps
+    the socket error). A temporary DNS failure (EAI_AGAIN) is not permanent.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, socket.gaierror):
+            return error.errno != socket.EAI_AGAIN
+        if isinstance(error, ConnectionRefusedError):
+            return True
+        error = (getattr(error, 'reason', None) or error.__cause__ or error.__context__
+                 or next((arg for arg in error.args if isinstance(arg, BaseException)), None))
+    return False
+
+
+@lru_cache(maxsize=None)
+def counting_http_adapter_class():
+    """CountingHTTPAdapter class, defined on first use so requests is imported lazily"""
+    class CountingHTTPAdapter(requests.adapters.HTTPAdapter):
+        """HTTPAdapter that counts the connections it opens and the requests it sends"""
+        def __init__(self, *args, **kwargs):
+            self.connections_opened = 0
+            self.requests_sent = 0
+            self._counter_lock = threading.Lock()
+            super().__init__(*args, **kwargs)
+        
+        def _record(self, counter):
+            with self._counter_lock:
+                setattr(self, counter, getattr(self, counter) + 1)
+        
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            adapter = self
+            
+            def counting(pool_class):
+                class CountingPool(pool_class):
+                    def _new_conn(self):
+                        adapter._record('connections_opened')
+                        return super()._new_conn()
+                    
+                    def urlopen(self, *args, **kwargs):
+                        adapter._record('requests_sent')
+                        return super().urlopen(*args, **kwargs)
+                return CountingPool
+            
+            self.poolmanager.pool_classes_by_scheme = {
+                scheme: counting(pool_class)
+                for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+            }
+    return CountingHTTPAdapter
+
+
+class SessionManager:
+    """One requests.Session shared by all worker threads
+    
+    Connection pools are sized for the number of threads that may talk to
+    the same host at once, so keep-alive connections are reused instead of
+    being opened and thrown away. The session headers are never changed
+    after construction; per-request headers are passed to get() instead.
+    """
+    def __init__(self, headers, pool_size=10, pool_hosts=10, verify=False):
+        if not verify:
+            # Disable SSL warnings
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        self.session = requests.Session()
+        self.session.verify = verify
+        self.session.headers.update(headers)
+        self.adapter = counting_http_adapter_class()(pool_connections=pool_hosts, pool_maxsize=pool_size)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+    
+    def get(self, url, headers=None, **kwargs):
+        return self.session.get(url, headers=headers, **kwargs)
+    
+    def connection_stats(self):
+        """Return (connections opened, requests that reused an open connection)"""
+        opened = self.adapter.connections_opened
+        return opened, max(0, self.adapter.requests_sent - opened)
+
+
+class CancellationToken:
+    """Cooperative cancel and pause switch shared by the GUI and a running job
+    
+    Jobs call wait_if_paused() before every network request and unit of
+    work, so pausing stops new requests at once and cancelling lets the
+    requests in flight finish before the job saves what it has.
+    """
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._resumed = threading.Event()
+        self._resumed.set()
+    
+    def cancel(self):
+        self._cancelled.set()
+        self._resumed.set()  # Paused workers wake up and see the cancellation
+    
+    def pause(self):
+        self._resumed.clear()
+    
+    def resume(self):
+        self._resumed.set()
+    
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+    
+    @property
+    def paused(self):
+        return not self._resumed.is_set()
+    
+    def wait_if_paused(self):
+        """Block while paused, returns False once the job is cancelled"""
+        self._resumed.wait()
+        return not self.cancelled
+    
+    def sleep(self, seconds):
+        """Sleep that ends early on cancel, returns False if cancelled"""
+        return not self._cancelled.wait(seconds)
+
+
+class ScrapeResult:
+    """Result of scraping one website
+    
+    A slotted record with tuples instead of a dict of lists, so results
+    waiting to be written stay small. to_dict/from_dict convert it to and
+    from the JSON form kept by EnrichmentStore and the work queue.
+    """
+    __slots__ = ('website', 'emails', 'phone_numbers', 'social_links', 'error', 'retryable')
+    
+    def __init__(self, website=None, emails=(), phone_numbers=(), social_links=None, error=None,
+                 retryable=False):
+        self.website = website
+        self.emails = tuple(emails)
+        self.phone_numbers = tuple(phone_numbers)
+        self.social_links = tuple((social_links or {}).items())
+        self.error = error
+        # Whether the error may go away on a later attempt (timeouts, 5xx, open circuit)
+        self.retryable = retryable
+    
+    @property
+    def status(self):
+        return 'Success' if self.error is None else 'Error'
+    
+    def to_dict(self):
+        if self.error is not None:
+            return {'error': self.error, 'website': self.website}
+        return {
+            'emails': list(self.emails),
+            'phone_numbers': list(self.phone_numbers),
+            'social_links': dict(self.social_links),
+            'status': self.status,
+            'website': self.website,
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Result stored with to_dict (or a dict with some of its keys)"""
+        return cls(data.get('website'), data.get('emails', ()), data.get('phone_numbers', ()),
+                   data.get('social_links'), data.get('error'))
+
+
+class EnrichmentStore:
+    """Scrape results from earlier runs, keyed by website fingerprint (SQLite file)
+    
+    Lets a re-exported lead list skip websites that were enriched recently
+    and only scrape new, changed or expired ones.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS enriched_sites ('
+            'fingerprint TEXT PRIMARY KEY, website TEXT, enriched_at REAL, result TEXT)'
+        )
+        self.conn.commit()
+    
+    @staticmethod
+    def fingerprint(url):
+        """Stable key for a website value, ignoring case, www. and trailing slashes"""
+        parsed = urlparse(str(url).strip())
+        host = parsed.netloc.lower()
+        if host.startswith('www.'):
+            host = host[4:]
+        normalized = f"{host}{parsed.path.rstrip('/')}?{parsed.query}"
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    
+    def get(self, url):
+        """Return (stored result or None, time it was enriched or None)"""
+        row = self.conn.execute(
+            'SELECT enriched_at, result FROM enriched_sites WHERE fingerprint = ?',
+            (self.fingerprint(url),)
+        ).fetchone()
+        if row is None:
+            return None, None
+        return (json.loads(row[1]) if row[1] else None), row[0]
+    
+    def put(self, url, result=None):
+        """Record that a site was enriched now, with its result if there is one"""
+        self.conn.execute(
+            'INSERT OR REPLACE INTO enriched_sites (fingerprint, website, enriched_at, result) VALUES (?, ?, ?, ?)',
+            (self.fingerprint(url), url, time.time(), json.dumps(result) if result else None)
+        )
+    
+    def commit(self):
+        self.conn.commit()
+    
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class WebsiteEnricher:
+    """Fills contact columns (emails, phones, social profiles) by scraping each row's website
+    
+    Loading, sorting and saving files is left to excel_sorter.ExcelSorter.
+    """
+    def __init__(self, log_callback=None, requests_per_second=1.0, burst=2,
+                 max_workers=8, parse_workers=None):
+        self.log = log_callback if log_callback else print
+        # Static pool of common desktop browser User-Agent strings to avoid fake-useragent dependency
+        self.USER_AGENTS = [
+            # Chrome (Windows)
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+            # Edge (Windows)
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0',
+            # Firefox (Windows)
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0',
+            # Chrome (Mac)
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+            # Safari (Mac)
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15',
+        ]
+        # Retry/backoff settings for _fetch_page_bytes
+        self.backoff_base = 1.0
+        self.backoff_max = 30.0
+        self.circuit_breaker = HostCircuitBreaker()
+        # Per network thread: whether its last failed fetch may succeed later
+        self._fetch_outcome = threading.local()
+        # Politeness limit per host (requests/sec and burst size), 0 disables it
+        self.rate_limiter = HostRateLimiter(requests_per_second, burst)
+        # Contact page crawl: how many candidates to try, how many at once,
+        # and which result fields end the crawl once they are filled
+        self.max_contact_pages = 3
+        self.contact_page_workers = 2
+        self.required_contact_fields = ('emails', 'phone_numbers')
+        # Download limits: decoded bytes kept per page and total seconds spent reading it
+        self.max_page_bytes = 2 * 1024 * 1024
+        self.max_download_seconds = 30
+        # Network threads fetching rows, and processes parsing the downloaded HTML
+        # (None means default_parse_workers(), 0 parses inline in the network threads)
+        self.max_workers = max_workers
+        self.parse_workers = default_parse_workers() if parse_workers is None else parse_workers
+        self._parse_pool = None
+        # Incremental mode: optional EnrichmentStore of earlier results,
+        # websites enriched within refresh_after_days are not scraped again
+        self.enrichment_store = None
+        self.refresh_after_days = 30
+        # Budget mode: fetch the best leads first and stop queueing rows once
+        # time_limit seconds have passed or page_budget requests were sent
+        self.time_limit = None
+        self.page_budget = None
+        # Requests left of page_budget during a budgeted run (None: no limit),
+        # taken by every request so rows in flight cannot overshoot the budget
+        self._pages_left = None
+        # host -> [requests, seconds], the observed latency used for estimates
+        self.host_latency = defaultdict(lambda: [0, 0.0])
+        # Checked by the fetch loop and each request; the GUI replaces it with
+        # the token of its Pause/Cancel buttons
+        self.cancel_token = CancellationToken()
+        # Counters reported in the run summary
+        self.fetch_stats = defaultdict(int)
+        self._stats_lock = threading.Lock()
+        # Every network thread may be fetching contact pages from the same host,
+        # and pools for the hosts of all in-flight rows should stay cached
+        self.http = SessionManager(
+            {
+                'Accept-Language': 'en-US,en;q=0.5',
+                'Accept-Encoding': 'gzip, deflate',  # Only encodings _read_limited can bound
+                'Connection': 'keep-alive',
+                'Upgrade-Insecure-Requests': '1',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
+            },
+            pool_size=max(1, max_workers) * self.contact_page_workers,
+            pool_hosts=max(10, max(1, max_workers) * 4),
+            verify=False  # Disable SSL verification
+        )
+        self.session = self.http.session
+    
+    def _is_valid_url(self, url):
+        """Check if the URL is valid"""
+        if not url or pd.isna(url) or not isinstance(url, str):
+            return False
+        return url.startswith(('http://', 'https://'))
+        
+    def _count(self, key, amount=1):
+        """Increment a fetch statistics counter"""
+        with self._stats_lock:
+            self.fetch_stats[key] += amount
+    
+    def _retry_after_seconds(self, response):
+        """Parse the Retry-After header (seconds or HTTP date)"""
+        value = response.headers.get('Retry-After') if response is not None else None
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError, OverflowError):
+            return None
+    
+    def _backoff_delay(self, attempt, response=None):
+        """Exponential backoff with full jitter, Retry-After wins when present"""
+        retry_after = self._retry_after_seconds(response)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    def _get_page_content(self, url, timeout=10, max_retries=2):
+        """Get page content as text"""
+        page = self._fetch_page_bytes(url, timeout, max_retries)
+        if page is None:
+            return None
+        content, encoding = page
+        return content.decode(encoding or 'utf-8', errors='replace')
+    
+    def _fetch_page_bytes(self, url, timeout=10, max_retries=2):
+        """Download a page, retrying only errors that may succeed later
+        
+        Returns (raw bytes, charset from the headers or None) or None on failure.
+        """
+        host = urlparse(url).netloc.lower()
+        self._fetch_outcome.retryable = False
+        self._fetch_outcome.budget_spent = False
+        for attempt in range(max_retries):
+            if not self.circuit_breaker.allow(host):
+                self._fetch_outcome.retryable = True
+                self._count('circuit_open_skips')
+                self.log(f"Skipping {url}: too many recent failures for {host}")
+                return None
+            
+            if not self._spend_page():
+                self._fetch_outcome.retryable = True
+                self._fetch_outcome.budget_spent = True
+                return None
+            
+            waited = self.rate_limiter.acquire(host)
+            if waited:
+                self._count('throttled_seconds', waited)
+            
+            # Paused jobs send no new requests, cancelled ones stop here
+            if not self.cancel_token.wait_if_paused():
+                self._fetch_outcome.retryable = True
+                return None
+            
+            response = None
+            self._count('requests')
+            started = time.monotonic()
+            try:
+                # Rotate a realistic User-Agent for each request
+                headers = {'User-Agent': random.choice(self.USER_AGENTS)}
+                response = self.http.get(url, headers=headers, timeout=timeout,
+                                         allow_redirects=True, stream=True)
+                response.raise_for_status()
+                
+                content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                if content_type and content_type not in HTML_CONTENT_TYPES:
+                    self.circuit_breaker.record_success(host)
+                    self._count('skipped_content_type')
+                    self.log(f"Skipping {url}: not an HTML page ({content_type})")
+                    return None
+                
+                body = self._read_limited(response, url, timeout)
+                # Only a completed body read counts as a healthy host
+                self.circuit_breaker.record_success(host)
+                if body is None:
+                    return None
+                # Only trust an explicit charset, otherwise let the parser sniff <meta> tags
+                has_charset = 'charset' in response.headers.get('Content-Type', '').lower()
+                return body, (response.encoding if has_charset else None)
+            except requests.HTTPError as e:
+                status = response.status_code
+                retryable = status in RETRYABLE_STATUS_CODES
+                # A missing page says nothing about the health of the host
+                if status not in (404, 410):
+                    self._record_host_failure(host)
+                error = e
+            except requests.Timeout as e:
+                retryable = True
+                self._record_host_failure(host)
+                error = e
+            except requests.ConnectionError as e:
+                # Reset or dropped connections may work on another attempt, unknown
+                # hosts and refused connections will not
+                retryable = not permanent_connection_error(e)
+                self._record_host_failure(host)
+                error = e
+            except requests.RequestException as e:
+                # Bad URLs, redirect loops etc. will not fix themselves
+                retryable = False
+                self._record_host_failure(host)
+                error = e
+            except (urllib3.exceptions.HTTPError, OSError) as e:
+                # Raised by the streamed body read: the server stalled or dropped
+                # the connection mid-body, which may work on another attempt
+                retryable = True
+                self._record_host_failure(host)
+                error = e
+            
+            finally:
+                if response is not None:
+                    response.close()
+                self._record_latency(host, time.monotonic() - started)
+            
+            self._count('wasted_attempts')
+            self._fetch_outcome.retryable = retryable
+            if not retryable or attempt == max_retries - 1:
+                if not retryable:
+                    self._count('non_retryable_errors')
+                self.log(f"Failed to fetch {url}: {str(error)}")
+                return None
+            
+            delay = self._backoff_delay(attempt, response)
+            if delay > self.backoff_max:
+                self.log(f"Failed to fetch {url}: server asked to retry after {delay:.0f}s")
+                return None
+            self._count('retries')
+            if not self.cancel_token.sleep(delay):
+                return None
+        return None
+    
+    def _spend_page(self):
+        """Take one request from the page budget, False once it is spent"""
+        with self._stats_lock:
+            if self._pages_left is None:
+                return True
+            if self._pages_left <= 0:
+                return False
+            self._pages_left -= 1
+            return True
+    
+    def last_fetch_retryable(self):
+        """Whether the last failed _fetch_page_bytes call of this thread may succeed later"""
+        return getattr(self._fetch_outcome, 'retryable', False)
+    
+    def _read_limited(self, response, url, timeout=10):
+        """Read a streamed response body, stopping at max_page_bytes of decoded data
+        
+        Reading also stops (keeping what was read) after max_download_seconds,
+        which bounds every socket read, so a server trickling bytes cannot hold
+        a thread longer. A read that stalls for timeout seconds before that
+        raises urllib3's ReadTimeoutError.
+        """
+        encoding = response.headers.get('Content-Encoding', 'identity').strip().lower()
+        if encoding in ('gzip', 'x-gzip', 'deflate'):
+            # Decompress ourselves so the output size is bounded, not just the input
+            decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS)
+        elif encoding in ('', 'identity'):
+            decompressor = None
+        else:
+            self._count('skipped_content_type')
+            self.log(f"Skipping {url}: unsupported content encoding ({encoding})")
+            return None
+        
+        deadline = time.monotonic() + self.max_download_seconds
+        # read1 returns after a single socket read (urllib3 2), older versions
+        # fill the whole amount, so they read small chunks
+        read1 = getattr(response.raw, 'read1', None)
+        chunks = []
+        size = 0
+        truncated = False
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                truncated = True
+                break
+            self._set_read_timeout(response, min(timeout, remaining))
+            try:
+                if read1 is not None:
+                    chunk = read1(64 * 1024, decode_content=False)
+                else:
+                    chunk = response.raw.read(8 * 1024, decode_content=False)
+            except (urllib3.exceptions.ReadTimeoutError, socket.timeout):
+                if remaining < timeout:
+                    truncated = True  # Download time used up, keep what was read
+                    break
+                raise
+            if not chunk:
+                break
+            self._count('bytes_downloaded', len(chunk))
+            if decompressor is not None:
+                try:
+                    chunk = decompressor.decompress(chunk, self.max_page_bytes - size + 1)
+                except zlib.error:
+                    self.log(f"Could not decompress {url}, keeping what was read")
+                    truncated = True
+                    break
+                if decompressor.unconsumed_tail:
+                    truncated = True
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > self.max_page_bytes:
+                truncated = True
+            if truncated:
+                break
+        
+        if truncated:
+            self._count('truncated_responses')
+        else:
+            # Fully read, so the keep-alive connection can go back to the pool
+            response.raw.release_conn()
+        return b''.join(chunks)[:self.max_page_bytes]
+    
+    def _set_read_timeout(self, response, seconds):
+        """Timeout of the next socket read of a streamed response (when the socket is reachable)"""
+        connection = getattr(response.raw, 'connection', None) or getattr(response.raw, '_connection', None)
+        sock = getattr(connection, 'sock', None)
+        if sock is not None:
+            sock.settimeout(max(0.01, seconds))
+    
+    def _record_latency(self, host, seconds):
+        with self._stats_lock:
+            latency = self.host_latency[host]
+            latency[0] += 1
+            latency[1] += seconds
+    
+    def _record_host_failure(self, host):
+        if self.circuit_breaker.record_failure(host):
+            self._count('circuits_opened')
+            self.log(f"Circuit opened for {host} after repeated failures")
+    
+    def log_fetch_summary(self):
+        """Log the fetch statistics collected during the run"""
+        stats = self.fetch_stats
+        self.log("\nFetch statistics:")
+        self.log(f"- Requests sent: {stats['requests']}")
+        self.log(f"- Wasted attempts: {stats['wasted_attempts']} "
+                 f"({stats['retries']} retried, {stats['non_retryable_errors']} not retryable)")
+        self.log(f"- Requests skipped by circuit breaker: {stats['circuit_open_skips']} "
+                 f"({stats['circuits_opened']} hosts tripped)")
+        self.log(f"- Downloaded: {stats['bytes_downloaded'] / (1024 * 1024):.1f} MB, "
+                 f"{stats['skipped_content_type']} non-HTML responses skipped, "
+                 f"{stats['truncated_responses']} responses truncated")
+        self.log(f"- Pages parsed: {stats['pages_parsed']} "
+                 f"({stats['pages_parsed_in_pool']} in parse worker processes)")
+        self.log(f"- Contact pages skipped once details were found: {stats['contact_pages_skipped']}")
+        self.log(f"- Time spent throttled by per-host rate limit: {stats['throttled_seconds']:.1f}s")
+        if self.enrichment_store is not None:
+            self.log(f"- Incremental: {stats['incremental_reused']} rows filled from earlier runs, "
+                     f"{stats['incremental_adopted']} rows kept their existing details")
+        opened, reused = self.http.connection_stats()
+        self.log(f"- Connections opened: {opened}, requests on reused keep-alive connections: {reused}")
+    
+    def _extract_emails(self, text):
+        """Extract email addresses from text"""
+        if not text:
+            return set()
+        # Improved email pattern to find more variations
+        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+        emails = set()
+        for match in re.finditer(email_pattern, text, re.IGNORECASE):
+            email = match.group(0).strip()
+            if '.' in email.split('@')[-1]:  # Must have a dot in the domain part
+                emails.add(email)
+        return emails
+    
+    def _extract_phone_numbers(self, text, default_region='US'):
+        """Extract and validate phone numbers from text"""
+        if not text:
+            return set()
+            
+        # First, try to find phone numbers using common patterns
+        phone_patterns = [
+            r'\+?\d{1,4}?[-.\s]?\(?\d{1,4}?\)?[-.\s]?\d{1,4}[-.\s]?\d{1,4}[-.\s]?\d{1,9}',  # International
+            r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}',  # US/Canada
+            r'\d{3}[-.\s]?\d{3}[-.\s]?\d{4}'  # US/Canada without area code
+        ]
+        
+        found_numbers = set()
+        for pattern in phone_patterns:
+            for match in re.finditer(pattern, text):
+                try:
+                    phone = match.group(0)
+                    # Clean up the phone number
+                    phone = re.sub(r'[^\d+]', '', phone)
+                    if phone.startswith('00'):
+                        phone = '+' + phone[2:]
+                    elif phone.startswith('1') and len(phone) == 11 and not phone.startswith('+1'):
+                        phone = '+1' + phone[1:]
+                    elif not phone.startswith('+'):
+                        phone = '+1' + phone  # Default to US/Canada
+                        
+                    # Parse and validate the phone number
+                    parsed = phonenumbers.parse(phone, None)
+                    if phonenumbers.is_valid_number(parsed):
+                        formatted = phonenumbers.format_number(
+                            parsed, 
+                            phonenumbers.PhoneNumberFormat.INTERNATIONAL
+                        )
+                        found_numbers.add(formatted)
+                except Exception:
+                    continue
+        
+        return found_numbers
+    
+    def _extract_social_links(self, soup, base_url):
+        """Extract social media profile links from the page (the last one per platform wins)"""
+        social_links = {}
+        
+        # Each href is parsed once and its host looked up in SOCIAL_PLATFORM_HOSTS
+        for a in soup.find_all('a', href=True):
+            link = canonical_social_link(a['href'])
+            if link is None:
+                continue
+            if not a.get_text(strip=True):
+                continue  # Skip empty links
+            platform, url = link
+            social_links[platform] = url
+        
+        return social_links
+    
+    def _same_site(self, url, base_url):
+        """Check whether url points at the same site as base_url (ignoring www.)"""
+        def strip_www(netloc):
+            netloc = netloc.lower()
+            return netloc[4:] if netloc.startswith('www.') else netloc
+        return strip_www(urlparse(url).netloc) == strip_www(urlparse(base_url).netloc)
+    
+    def _score_contact_link(self, text, path):
+        """Score a link by how likely it is to lead to contact details"""
+        score = 0
+        for keyword, weight in CONTACT_KEYWORD_WEIGHTS.items():
+            if keyword in text:
+                score = max(score, weight + 1)  # Visible text is a stronger signal
+            elif keyword.replace(' ', '-') in path or keyword.replace(' ', '') in path:
+                score = max(score, weight)
+        return score
+    
+    def _find_contact_page_links(self, soup, base_url):
+        """Find links to contact, about, or info pages, best candidates first"""
+        base_page = base_url.split('#')[0].rstrip('/')
+        scores = {}
+        
+        # Check all links on the page
+        for a in soup.find_all('a', href=True):
+            href = a.get('href', '').strip()
+            if not href or href.startswith('#'):
+                continue
+            full_url = urljoin(base_url, href).split('#')[0]
+            parsed = urlparse(full_url)
+            
+            # Only same-site HTML pages (skips mailto:, tel:, javascript:, files, other sites)
+            if parsed.scheme not in ('http', 'https') or not self._same_site(full_url, base_url):
+                continue
+            path = parsed.path.lower()
+            if path.endswith(NON_HTML_EXTENSIONS) or full_url.rstrip('/') == base_page:
+                continue
+            
+            text = a.get_text(' ', strip=True).lower()
+            score = self._score_contact_link(text, path)
+            if score > scores.get(full_url, 0):
+                scores[full_url] = score
+        
+        ranked = sorted(scores, key=lambda link: scores[link], reverse=True)
+        return ranked[:self.max_contact_pages]
+    
+    def _extract_mailto_emails(self, soup):
+        """Extract email addresses from mailto: links"""
+        emails = set()
+        for a in soup.find_all('a', href=True):
+            if 'mailto:' in a['href'].lower():
+                email = a['href'].split(':', 1)[1].split('?')[0].strip()
+                if '@' in email and '.' in email:
+                    emails.add(email)
+        return emails
+    
+    def _contact_fields_filled(self, emails, phones):
+        """Check whether the crawl has found everything it is looking for"""
+        found = {'emails': emails, 'phone_numbers': phones}
+        return all(found.get(field) for field in self.required_contact_fields)
+    
+    def parse_page(self, content, encoding, url, kind='home'):
+        """Parse a downloaded page and extract what it contains
+        
+        This is the CPU-bound part of scraping (HTML parsing, regex scans and
+        phone validation) and runs in the parse process pool. kind is 'home'
+        for the page in the website column, 'contact' for contact pages and
+        'facebook_about' for a Facebook about page.
+        """
+        soup = bs4.BeautifulSoup(content, 'lxml', from_encoding=encoding)
+        
+        if kind == 'facebook_about':
+            # Look for contact information sections
+            emails = set()
+            contact_sections = soup.find_all(['div', 'section'], class_=re.compile(r'(?i)contact|info|details'))
+            for section in contact_sections:
+                emails.update(self._extract_emails(section.get_text(' ')))
+            return {'emails': emails, 'phone_numbers': set()}
+        
+        # Extract emails and phone numbers from the page text
+        text = soup.get_text(' ')
+        result = {
+            'emails': self._extract_emails(text) | self._extract_mailto_emails(soup),
+            'phone_numbers': self._extract_phone_numbers(text),
+        }
+        if kind == 'contact':
+            return result
+        
+        result['social_links'] = self._extract_social_links(soup, url)
+        
+        # Check if this is a social media profile
+        platform = SOCIAL_PLATFORM_HOSTS.get(social_domain(urlparse(url).hostname or ''))
+        
+        # Special handling for social media profiles
+        if platform == 'Facebook':
+            emails, about_link = self._extract_facebook_info(soup, url)
+            result['emails'].update(emails)
+            result['about_link'] = about_link
+        elif platform in ('Instagram', 'LinkedIn'):
+            # For Instagram and LinkedIn, look for bio/description
+            bio_section = soup.find('div', class_=re.compile(r'(?i)bio|description|about'))
+            if bio_section:
+                result['emails'].update(self._extract_emails(bio_section.get_text(' ')))
+        else:
+            # For regular websites, rank the contact pages worth visiting
+            result['contact_links'] = self._find_contact_page_links(soup, url)
+        
+        return result
+    
+    def _parse(self, page, url, kind):
+        """Parse a page in the process pool if there is one, otherwise inline"""
+        content, encoding = page
+        self._count('pages_parsed')
+        pool = self._parse_pool
+        if pool is not None:
+            try:
+                page_info = pool.submit(_parse_page_in_worker, content, encoding, url, kind).result()
+                self._count('pages_parsed_in_pool')
+                return page_info
+            except BrokenProcessPool:
+                self.log("Parse worker pool stopped unexpectedly, parsing in this process instead")
+                self._parse_pool = None
+                shutdown_parse_pool(pool)
+        return self.parse_page(content, encoding, url, kind)
+    
+    def _parse_worker_settings(self):
+        """Settings parse workers need to behave like this instance"""
+        return {'max_contact_pages': self.max_contact_pages}
+    
+    def _start_parse_pool(self, row_count):
+        """Use the shared parse process pool for a run of row_count rows
+        
+        Small runs parse inline unless a pool from an earlier run is still up.
+        """
+        if self.parse_workers and self._parse_pool is None:
+            self._parse_pool = shared_parse_pool(self.parse_workers, self._parse_worker_settings(),
+                                                 start=row_count >= PARSE_POOL_MIN_ROWS)
+    
+    def _shutdown_parse_pool(self):
+        # The pool stays up for the next run, shutdown_parse_pool() stops it
+        self._parse_pool = None
+    
+    def _scrape_contact_page(self, contact_link):
+        """Fetch one contact page and return the emails and phones on it"""
+        page = self._fetch_page_bytes(contact_link)
+        if page is None:
+            return set(), set()
+        result = self._parse(page, contact_link, 'contact')
+        return result['emails'], result['phone_numbers']
+    
+    def _crawl_contact_pages(self, contact_links, emails, phones):
+        """Fetch contact pages concurrently until the configured fields are filled"""
+        if not contact_links:
+            return
+        if self._contact_fields_filled(emails, phones):
+            self._count('contact_pages_skipped', len(contact_links))
+            return
+        
+        with ThreadPoolExecutor(max_workers=self.contact_page_workers) as executor:
+            futures = {executor.submit(self._scrape_contact_page, link): link for link in contact_links}
+            for future in as_completed(futures):
+                try:
+                    page_emails, page_phones = future.result()
+                    emails.update(page_emails)
+                    phones.update(page_phones)
+                except Exception as e:
+                    self.log(f"Error checking contact page {futures[future]}: {str(e)}")
+                
+                if self._contact_fields_filled(emails, phones):
+                    # Lower ranked pages that have not started yet are not needed
+                    skipped = sum(1 for f in futures if f.cancel())
+                    self._count('contact_pages_skipped', skipped)
+                    break
+    
+    def _extract_facebook_info(self, soup, base_url):
+        """Extract emails from a Facebook page's intro and find its About page"""
+        emails = set()
+        about_link = None
+        
+        try:
+            # Try to find the intro section
+            intro_section = soup.find('div', {'id': 'intro_container_id'}) or \
+                          soup.find('div', class_=re.compile(r'(?i)intro|about|bio|description'))
+            
+            if intro_section:
+                intro_text = intro_section.get_text(' ')
+                emails.update(self._extract_emails(intro_text))
+            
+            # Look for the 'About' section
+            about_links = [a['href'] for a in soup.find_all('a', href=True) 
+                         if 'about' in a.get('href', '').lower() 
+                         and 'profile.php' not in a.get('href', '')]
+            
+            if about_links:
+                about_link = urljoin(base_url, about_links[0])
+            
+        except Exception as e:
+            self.log(f"Error extracting Facebook info: {str(e)}")
+        
+        return emails, about_link
+    
+    def scrape_website_info(self, url):
+        """Scrape contact information from a website"""
+        if not self._is_valid_url(url):
+            return ScrapeResult(url, error='Invalid URL')
+        
+        self.log(f"Scraping: {url}")
+        
+        try:
+            # Get the main page content
+            page = self._fetch_page_bytes(url)
+            if not page:
+                if self.cancel_token.cancelled:
+                    return ScrapeResult(url, error=CANCELLED_ERROR)
+                if getattr(self._fetch_outcome, 'budget_spent', False):
+                    return ScrapeResult(url, error=BUDGET_SPENT_ERROR, retryable=True)
+                return ScrapeResult(url, error='Could not fetch page content',
+                                    retryable=self.last_fetch_retryable())
+            
+            page_info = self._parse(page, url, 'home')
+            emails = page_info['emails']
+            phones = page_info['phone_numbers']
+            
+            if page_info.get('about_link'):
+                # Facebook keeps contact details on the About page
+                about_page = self._fetch_page_bytes(page_info['about_link'])
+                if about_page:
+                    emails.update(self._parse(about_page, page_info['about_link'], 'facebook_about')['emails'])
+            else:
+                # Check the best ranked contact pages unless the
+                # homepage already had everything we need
+                self._crawl_contact_pages(page_info.get('contact_links', []), emails, phones)
+            
+            # Format the results
+            return ScrapeResult(url, sorted(emails), sorted(phones), page_info['social_links'])
+            
+        except Exception as e:
+            self.log(f"Error scraping {url}: {str(e)}")
+            return ScrapeResult(url, error=str(e))
+    
+    def fetch_website_info_for_df(self, df, website_column='website'):
+        """Fetch website information for all websites in the dataframe"""
+        if website_column not in df.columns:
+            self.log(f"Error: Column '{website_column}' not found in the dataframe")
+            return df
+            
+        self.prepare_contact_columns(df)
+        
+        # With a time limit or page budget the best leads go first, and rows
+        # left over when it runs out are marked in a Fetch_Status column
+        budgeted = self.time_limit is not None or self.page_budget is not None
+        rows = df[website_column].items()
+        if budgeted:
+            df[FETCH_STATUS_COLUMN] = ''
+            self.log(self.describe_budget())
+            rows = self.priority_order(df, website_column)
+        started = time.monotonic()
+        requests_before = self.fetch_stats['requests']
+        
+        # Rows are fetched by a pool of network threads while the parse pool
+        # does the HTML work. At most two rows per thread are queued so memory
+        # stays bounded no matter how large the file is.
+        total_rows = len(df)
+        max_pending = max(1, self.max_workers) * 2
+        processed = 0
+        scraped = 0
+        not_reached = []
+        stop_reason = None
+        estimated = not budgeted
+        pending = {}
+        
+        def collect(done):
+            nonlocal processed, scraped, stop_reason
+            for future in done:
+                idx, url = pending.pop(future)
+                result = future.result()
+                if result.error == CANCELLED_ERROR:
+                    continue  # Stopped before anything was fetched, the row stays as it was
+                if result.error == BUDGET_SPENT_ERROR:
+                    # Queued before the budget ran out, but none of its requests fit
+                    stop_reason = stop_reason or 'page budget'
+                    not_reached.append(idx)
+                    continue
+                self.apply_scrape_result(df, idx, url, result)
+                # After a cancel or once the page budget is spent a contact page crawl
+                # may have been cut short, so those results are kept in the file but
+                # not stored as complete
+                if (self.enrichment_store is not None and result.error is None
+                        and not self.cancel_token.cancelled and self._pages_left != 0):
+                    self.enrichment_store.put(url, result.to_dict())
+                processed += 1
+                scraped += 1
+                # Log progress
+                if processed % 5 == 0 or processed == total_rows:
+                    self.log(f"Processed {processed}/{total_rows} rows")
+        
+        self._start_parse_pool(total_rows)
+        self._pages_left = self.page_budget
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                for position, (idx, url) in enumerate(rows):
+                    # Stop queueing rows while paused, and for good once cancelled
+                    if not self.cancel_token.wait_if_paused():
+                        break
+                    
+                    if not self._is_valid_url(url):
+                        self.log(f"Skipping invalid URL at row {idx + 2}: {url}")
+                        processed += 1
+                        continue
+                    
+                    # Reused results cost no requests, so they are applied even after the budget ran out
+                    if self.enrichment_store is not None and self._reuse_enrichment(df, idx, url):
+                        processed += 1
+                        continue
+                    
+                    if budgeted and stop_reason is None:
+                        pages_used = self.fetch_stats['requests'] - requests_before
+                        if not estimated and scraped >= BUDGET_SAMPLE_LEADS:
+                            estimated = True
+                            self.log_budget_estimate(rows[position:], time.monotonic() - started, pages_used, scraped)
+                        stop_reason = self._budget_stop_reason(time.monotonic() - started, pages_used,
+                                                               scraped, len(pending))
+                        if stop_reason is not None:
+                            self.log(f"The {stop_reason} is used up, no further rows are fetched")
+                    if stop_reason is not None:
+                        not_reached.append(idx)
+                        continue
+                    
+                    if len(pending) >= max_pending:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending[executor.submit(self.scrape_website_info, url)] = (idx, url)
+                
+                # Rows in flight finish (quickly once cancelled) before anything is saved
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            
+            if not_reached:
+                df.loc[not_reached, FETCH_STATUS_COLUMN] = NOT_REACHED_STATUS
+                self.log(f"{len(not_reached)} rows were not reached before the {stop_reason} ran out, "
+                         f"they are marked '{NOT_REACHED_STATUS}' in the {FETCH_STATUS_COLUMN} column")
+            if budgeted:
+                self.log(f"Budget used: {time.monotonic() - started:.0f}s, "
+                         f"{self.fetch_stats['requests'] - requests_before} pages for {scraped} leads")
+            if self.cancel_token.cancelled:
+                self.log(f"Cancelled: {processed} of {total_rows} rows done, "
+                         f"the other {total_rows - processed} were not fetched")
+        finally:
+            self._pages_left = None
+            self._shutdown_parse_pool()
+            if self.enrichment_store is not None:
+                self.enrichment_store.commit()
+        
+        return df
+    
+    def priority_order(self, df, website_column):
+        """(index, url) pairs of the rows, highest value leads first
+        
+        Rows are ranked by the Lead_Score column of a scored file, or else by
+        reviews; without either column they keep their file order.
+        """
+        if SCORE_COLUMN in df.columns:
+            rank_column = SCORE_COLUMN
+        else:
+            rank_column = next((col for col in df.columns if 'review' in str(col).lower()), None)
+        if rank_column is None:
+            self.log("No reviews or Lead_Score column found, fetching rows in file order")
+            return list(df[website_column].items())
+        
+        self.log(f"Fetching the leads with the highest '{rank_column}' first")
+        value = pd.to_numeric(df[rank_column], errors='coerce').fillna(-1)
+        order = value.sort_values(ascending=False, kind='stable').index
+        return list(df.loc[order, website_column].items())
+    
+    def describe_budget(self):
+        limits = []
+        if self.time_limit is not None:
+            limits.append(f"{self.time_limit / 60:g} minutes")
+        if self.page_budget is not None:
+            limits.append(f"{self.page_budget} pages")
+        return f"Budget: {' and '.join(limits)}"
+    
+    def _mean_latency(self):
+        """Mean seconds per request over all hosts, None before any request"""
+        with self._stats_lock:
+            count = sum(requests for requests, _ in self.host_latency.values())
+            seconds = sum(seconds for _, seconds in self.host_latency.values())
+        return seconds / count if count else None
+    
+    def _budget_stop_reason(self, elapsed, pages_used, scraped, in_flight):
+        """'time limit' or 'page budget' once another lead would not fit, else None"""
+        pages_per_lead = pages_used / scraped if scraped else 1.0
+        if (self.page_budget is not None
+                and pages_used + (in_flight + 1) * pages_per_lead > self.page_budget):
+            return 'page budget'
+        if self.time_limit is not None:
+            lead_seconds = pages_per_lead * (self._mean_latency() or 0)
+            if elapsed + lead_seconds > self.time_limit:
+                return 'time limit'
+        return None
+    
+    def estimate_leads_in_budget(self, urls, elapsed, pages_used, scraped):
+        """How many of the urls (in order) fit in what is left of the budget
+        
+        Each lead is expected to take as many requests as the leads fetched
+        so far, each as long as the observed latency of its host (the mean
+        of all hosts for hosts not seen yet), with max_workers leads fetched
+        at a time. Returns (leads, pages per lead, seconds per lead).
+        """
+        pages_per_lead = pages_used / scraped
+        mean_latency = self._mean_latency() or 0
+        with self._stats_lock:
+            latency = {host: seconds / requests for host, (requests, seconds) in self.host_latency.items()
+                       if requests}
+        
+        pages_left = self.page_budget - pages_used if self.page_budget is not None else float('inf')
+        # Seconds of network thread time, the threads fetch in parallel
+        seconds_left = ((self.time_limit - elapsed) * max(1, self.max_workers)
+                        if self.time_limit is not None else float('inf'))
+        leads = 0
+        for url in urls:
+            lead_seconds = pages_per_lead * latency.get(urlparse(url).netloc.lower(), mean_latency)
+            pages_left -= pages_per_lead
+            seconds_left -= lead_seconds
+            if pages_left < 0 or seconds_left < 0:
+                break
+            leads += 1
+        return leads, pages_per_lead, pages_per_lead * mean_latency
+    
+    def log_budget_estimate(self, rows, elapsed, pages_used, scraped):
+        """Log how many of the remaining rows' leads are expected to fit in the budget"""
+        remaining = [url for _, url in rows if self._is_valid_url(url)]
+        leads, pages_per_lead, lead_seconds = self.estimate_leads_in_budget(
+            remaining, elapsed, pages_used, scraped)
+        self.log(f"Estimate from the first {scraped} leads: {pages_per_lead:.1f} pages and "
+                 f"{lead_seconds:.1f}s per lead, about {leads} of the remaining {len(remaining)} "
+                 f"leads fit in the budget")
+    
+    def profile_enrichment(self, df, website_column, sample_sites=DRY_RUN_SAMPLE_SITES):
+        """Dry run of fetch_website_info_for_df: log what a fetch would cost
+        
+        Counts the valid URLs, their domains and the rows the enrichment
+        store would fill, then fetches a small random sample of sites (one
+        per host, results are discarded) to measure the requests, bytes,
+        seconds and failures per site. These are projected onto all rows to
+        fetch under the current max_workers and per-host rate limit.
+        Returns a dict of the counts and projections.
+        """
+        df = df.copy()
+        self.prepare_contact_columns(df)
+        
+        urls = [(idx, url) for idx, url in df[website_column].items() if self._is_valid_url(url)]
+        hosts = defaultdict(list)
+        domains = set()
+        cache_hits = 0
+        for idx, url in urls:
+            if self.enrichment_store is not None and self._reuse_enrichment(df, idx, url, dry_run=True):
+                cache_hits += 1
+                continue
+            host = urlparse(url).netloc.lower()
+            hosts[host].append(url)
+            domains.add(registrable_domain(host))
+        to_fetch = len(urls) - cache_hits
+        
+        self.log(f"\nDry run for {len(df)} rows:")
+        self.log(f"- Valid website URLs: {len(urls)}")
+        if self.enrichment_store is not None:
+            self.log(f"- Filled from earlier results (incremental): {cache_hits}")
+        else:
+            self.log("- Incremental mode is off, every valid URL would be fetched")
+        self.log(f"- To fetch: {to_fetch} URLs on {len(hosts)} hosts ({len(domains)} domains)")
+        profile = {'rows': len(df), 'valid_urls': len(urls), 'cache_hits': cache_hits,
+                   'to_fetch': to_fetch, 'hosts': len(hosts), 'domains': len(domains)}
+        if not to_fetch:
+            return profile
+        
+        # One site per host, so the sample is not slowed down by the rate limit
+        sample = random.Random(0).sample(sorted(hosts), min(sample_sites, len(hosts)))
+        sample = [hosts[host][0] for host in sample]
+        self.log(f"Fetching a sample of {len(sample)} sites...")
+        requests_before = self.fetch_stats['requests']
+        bytes_before = self.fetch_stats['bytes_downloaded']
+        
+        def timed_scrape(url):
+            started = time.monotonic()
+            result = self.scrape_website_info(url)
+            return result, time.monotonic() - started
+        
+        self._start_parse_pool(len(sample))
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                outcomes = [(result, seconds) for result, seconds in executor.map(timed_scrape, sample)
+                            if result.error != CANCELLED_ERROR]
+        finally:
+            self._shutdown_parse_pool()
+        if not outcomes:
+            self.log("Dry run cancelled before any site was fetched")
+            return profile
+        
+        sampled = len(outcomes)
+        requests_per_site = (self.fetch_stats['requests'] - requests_before) / sampled
+        bytes_per_site = (self.fetch_stats['bytes_downloaded'] - bytes_before) / sampled
+        seconds_per_site = sum(seconds for _, seconds in outcomes) / sampled
+        failure_rate = sum(1 for result, _ in outcomes if result.error is not None) / sampled
+        self.log(f"Sample of {sampled} sites: {requests_per_site:.1f} requests, "
+                 f"{bytes_per_site / 1024:.0f} KB and {seconds_per_site:.1f}s per site, "
+                 f"{failure_rate:.0%} failed")
+        
+        # The network threads share the work, but each host is limited to
+        # rate requests per second however many threads there are
+        seconds = to_fetch * seconds_per_site / max(1, self.max_workers)
+        busiest_host = max(hosts, key=lambda host: len(hosts[host]))
+        if self.rate_limiter.rate > 0:
+            seconds = max(seconds, len(hosts[busiest_host]) * requests_per_site / self.rate_limiter.rate)
+        profile.update({
+            'requests_per_site': requests_per_site, 'bytes_per_site': bytes_per_site,
+            'seconds_per_site': seconds_per_site, 'failure_rate': failure_rate,
+            'projected_seconds': seconds, 'projected_requests': to_fetch * requests_per_site,
+            'projected_bytes': to_fetch * bytes_per_site,
+        })
+        rate = f"{self.rate_limiter.rate:g} requests/s per host" if self.rate_limiter.rate > 0 else "no rate limit"
+        self.log(f"Projection with {max(1, self.max_workers)} threads and {rate}:")
+        self.log(f"- Time: about {format_duration(seconds)} "
+                 f"(busiest host: {busiest_host}, {len(hosts[busiest_host])} URLs)")
+        self.log(f"- Requests: about {profile['projected_requests']:.0f}")
+        self.log(f"- Download: about {profile['projected_bytes'] / (1024 * 1024):.0f} MB")
+        self.log(f"- Sites expected to fail: about {to_fetch * failure_rate:.0f}")
+        return profile
+    
+    def prepare_contact_columns(self, df):
+        """Add the contact info columns if they don't exist"""
+        new_columns = ['Email_Addresses', 'Phone_Numbers'] + SOCIAL_URL_COLUMNS
+        
+        # Initialize new columns with empty values, blank cells of a
+        # re-exported file are read back as NaN
+        for col in new_columns:
+            if col not in df.columns:
+                df[col] = ''
+            else:
+                df[col] = df[col].astype(object).where(df[col].notna(), '')
+    
+    def find_website_column(self, df):
+        """Return the first column that looks like it holds website URLs"""
+        website_columns = [col for col in df.columns if 'website' in col.lower() or 'url' in col.lower()]
+        return website_columns[0] if website_columns else None
+    
+    def _reuse_enrichment(self, df, idx, url, dry_run=False):
+        """Incremental mode: fill a row from earlier results instead of scraping it
+        
+        Returns True if the row needs no scraping: its website was enriched
+        within refresh_after_days, or the site has no record yet but the row
+        already has contact details (adopted into the store as enriched now).
+        With dry_run nothing is filled, stored or counted.
+        """
+        cached, enriched_at = self.enrichment_store.get(url)
+        if enriched_at is not None:
+            if time.time() - enriched_at > self.refresh_after_days * 86400:
+                return False  # Expired, scrape again
+            if dry_run:
+                return True
+            if cached:
+                self.apply_scrape_result(df, idx, url, ScrapeResult.from_dict(cached))
+            self._count('incremental_reused')
+            return True
+        
+        emails = df.at[idx, 'Email_Addresses']
+        phones = df.at[idx, 'Phone_Numbers']
+        if emails != '' or phones != '':
+            if dry_run:
+                return True
+            existing = {
+                'emails': [e for e in str(emails).split(', ') if e],
+                'phone_numbers': [p for p in str(phones).split(' | ') if p],
+                'social_links': {col[:-len('_URL')]: df.at[idx, col] for col in SOCIAL_URL_COLUMNS
+                                 if df.at[idx, col] != ''},
+            }
+            self.enrichment_store.put(url, existing)
+            self._count('incremental_adopted')
+            return True
+        return False
+    
+    def apply_scrape_result(self, df, idx, url, result):
+        """Write one ScrapeResult into its row"""
+        # Update the row with scraped data
+        if result.error is not None:
+            self.log(f"Error processing {url}: {result.error}")
+            return
+            
+        # Update emails (an empty result keeps what the row already had)
+        if result.emails:
+            df.at[idx, 'Email_Addresses'] = ', '.join(result.emails)
+        
+        # Update phone numbers
+        if result.phone_numbers:
+            df.at[idx, 'Phone_Numbers'] = ' | '.join(result.phone_numbers)
+        
+        # Update social media links
+        for platform, link in result.social_links:
+            col_name = f"{platform}_URL"
+            if col_name in df.columns:
+                df.at[idx, col_name] = link
+
+
+def format_duration(seconds):
+    """Rounded duration like '2h 05m', '14m' or '40s'"""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+# Parse process pool shared by the runs of this process, with the
+# (workers, settings) it was started with
+_parse_pool = None
+_parse_pool_key = None
+_parse_pool_lock = threading.Lock()
+
+def default_parse_workers():
+    """Parse processes used when none are given
+    
+    EXCEL_SORTER_PARSE_WORKERS if it is set, otherwise one per CPU core but
+    one, which is left to the network threads and the window.
+    """
+    configured = os.environ.get(PARSE_WORKERS_ENV, '').strip()
+    if configured:
+        try:
+            return max(0, int(configured))
+        except ValueError:
+            pass
+    return max(1, (os.cpu_count() or 1) - 1)
+
+def shared_parse_pool(workers, settings, start=True):
+    """The parse process pool for these settings, None if it is not running and start is False
+    
+    Workers are spawned, not forked: forking a process running Tk and
+    network threads can copy locks held by other threads and hang.
+    """
+    global _parse_pool, _parse_pool_key
+    key = (workers, tuple(sorted(settings.items())))
+    with _parse_pool_lock:
+        if _parse_pool is not None and _parse_pool_key != key:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+        if _parse_pool is None and start:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_parse_worker,
+                initargs=(settings,)
+            )
+            _parse_pool_key = key
+        return _parse_pool
+
+def shutdown_parse_pool(pool=None):
+    """Stop the shared parse pool (only if it is still pool, when given)"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None or (pool is not None and _parse_pool is not pool):
+            return
+        _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
+
+# Parse pool workers keep one WebsiteEnricher per process for its extraction methods
+_parse_worker_enricher = None
+
+def _init_parse_worker(settings):
+    global _parse_worker_enricher
+    _parse_worker_enricher = WebsiteEnricher(log_callback=lambda message: None, parse_workers=0)
+    for name, value in settings.items():
+        setattr(_parse_worker_enricher, name, value)
+
+def _parse_page_in_worker(content, encoding, url, kind):
+    return _parse_worker_enricher.parse_page(content, encoding, url, kind)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Shared work queue for running one "Fetch Website Info" job across many processes
+
+The rows to enrich are stored in an SQLite file (which can live on shared
+storage). Any number of worker processes, on one machine or several, lease
+a few rows at a time, scrape them and write the results back. Rows leased
+by a worker that crashed become available again once their lease expires.
+When the queue is drained, the results are assembled into the output file.
+
+Usage:
+    python enrichment_queue.py create leads.xlsx --queue leads_job.sqlite
+    python enrichment_queue.py work --queue leads_job.sqlite --processes 4
+    python enrichment_queue.py status --queue leads_job.sqlite
+    python enrichment_queue.py assemble --queue leads_job.sqlite
+
+Note: SQLite locking on network shares depends on the file server. The
+queue uses the default rollback journal (WAL does not work over network
+filesystems), so keep the queue file on storage with working file locks.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from enrichment import ScrapeResult, WebsiteEnricher
+from excel_sorter import ExcelSorter, output_format_of, save_output
+
+
+class WorkQueue:
+    """Durable queue of (row id, url) items with leases (SQLite file)"""
+    def __init__(self, db_path, busy_timeout=60):
+        self.db_path = db_path
+        # isolation_level=None: transactions are started explicitly below
+        self.conn = sqlite3.connect(db_path, timeout=busy_timeout, isolation_level=None)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS items ('
+            'row_id INTEGER PRIMARY KEY, url TEXT NOT NULL, '
+            "status TEXT NOT NULL DEFAULT 'pending', lease_owner TEXT, lease_expires REAL, "
+            'attempts INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS items_status ON items (status, lease_expires)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def set_meta(self, key, value):
+        self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def get_meta(self, key):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def add_items(self, items):
+        """Add (row id, url) pairs, items already in the queue are kept as they are"""
+        self.conn.execute('BEGIN IMMEDIATE')
+        self.conn.executemany('INSERT OR IGNORE INTO items (row_id, url) VALUES (?, ?)', items)
+        self.conn.execute('COMMIT')
+
+    def lease(self, worker_id, batch_size=5, lease_seconds=600):
+        """Take up to batch_size pending or expired items, returns [(row id, url)]"""
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock, so two workers never lease the same rows
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = self.conn.execute(
+                "SELECT row_id, url FROM items WHERE status = 'pending' "
+                "OR (status = 'leased' AND lease_expires < ?) ORDER BY row_id LIMIT ?",
+                (now, batch_size)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE items SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                'attempts = attempts + 1 WHERE row_id = ?',
+                [(worker_id, now + lease_seconds, row_id) for row_id, _ in rows]
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return rows
+
+    def complete(self, row_id, worker_id, result):
+        """Store the result of a leased item"""
+        self.conn.execute(
+            "UPDATE items SET status = 'done', result = ?, error = NULL, lease_owner = NULL "
+            "WHERE row_id = ? AND status = 'leased' AND lease_owner = ?",
+            (json.dumps(result), row_id, worker_id)
+        )
+
+    def fail(self, row_id, worker_id, error, retryable=True, max_attempts=3):
+        """Return a leased item to the queue, or mark it failed
+        
+        Errors that will not go away (e.g. 404, DNS failures) fail the item
+        at once, the others after max_attempts.
+        """
+        self.conn.execute(
+            "UPDATE items SET status = CASE WHEN ? OR attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = ?, lease_owner = NULL WHERE row_id = ? AND status = 'leased' AND lease_owner = ?",
+            (not retryable, max_attempts, error, row_id, worker_id)
+        )
+
+    def counts(self):
+        """Number of items per status"""
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        counts.update(self.conn.execute('SELECT status, COUNT(*) FROM items GROUP BY status').fetchall())
+        return counts
+
+    def results(self):
+        """Yield (row id, result dict) for finished items"""
+        for row_id, result in self.conn.execute(
+                "SELECT row_id, result FROM items WHERE status = 'done' ORDER BY row_id"):
+            yield row_id, json.loads(result)
+
+    def close(self):
+        self.conn.close()
+
+
+def create_job(file_path, queue_path):
+    """Load a lead file and put its valid website URLs in a new queue"""
+    df = ExcelSorter().load_file(file_path)
+    if df is None:
+        return False
+
+    enricher = WebsiteEnricher()
+    website_column = enricher.find_website_column(df)
+    if website_column is None:
+        print("Error: No column containing 'website' or 'URL' found in the file")
+        return False
+
+    # Row ids are positions, the file is loaded again the same way by assemble_job
+    items = [(position, url) for position, url in enumerate(df[website_column])
+             if enricher._is_valid_url(url)]
+
+    queue = WorkQueue(queue_path)
+    queue.set_meta('source_file', os.path.abspath(file_path))
+    queue.set_meta('website_column', website_column)
+    queue.add_items(items)
+    print(f"Queued {len(items)} of {len(df)} rows from {file_path} in {queue_path}")
+    queue.close()
+    return True
+
+
+def run_worker(queue_path, threads=4, batch_size=5, lease_seconds=600, requests_per_second=1.0,
+               poll_seconds=10):
+    """Lease and scrape items until every item is done or failed
+    
+    While other workers still hold leases, keeps polling every poll_seconds:
+    their rows come back once the lease of a stopped worker expires.
+    """
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    queue = WorkQueue(queue_path)
+    # This process is one of many workers, so HTML is parsed inline
+    enricher = WebsiteEnricher(requests_per_second=requests_per_second, max_workers=threads, parse_workers=0)
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        while True:
+            items = queue.lease(worker_id, batch_size * threads, lease_seconds)
+            if not items:
+                if not queue.counts()['leased']:
+                    break
+                time.sleep(poll_seconds)
+                continue
+            futures = [executor.submit(enricher.scrape_website_info, url) for _, url in items]
+            for (row_id, url), future in zip(items, futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # One broken row must not stop the worker and strand its other leases
+                    queue.fail(row_id, worker_id, str(e))
+                    continue
+                if result.error is None:
+                    queue.complete(row_id, worker_id, result.to_dict())
+                    done += 1
+                else:
+                    queue.fail(row_id, worker_id, result.error, result.retryable)
+
+    print(f"Worker {worker_id} finished, {done} rows enriched")
+    queue.close()
+    return done
+
+
+def run_workers(queue_path, processes, **worker_options):
+    """Run several local worker processes against one queue"""
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(queue_path,), kwargs=worker_options)
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return all(worker.exitcode == 0 for worker in workers)
+
+
+def assemble_job(queue_path, output_path=None):
+    """Write the source file with the results of all finished items"""
+    queue = WorkQueue(queue_path)
+    counts = queue.counts()
+    if counts['pending'] or counts['leased']:
+        print(f"Warning: {counts['pending'] + counts['leased']} rows are not finished yet, "
+              "they are written without contact info")
+
+    file_path = queue.get_meta('source_file')
+    website_column = queue.get_meta('website_column')
+    df = ExcelSorter().load_file(file_path)
+    if df is None:
+        queue.close()
+        return False
+
+    enricher = WebsiteEnricher()
+    enricher.prepare_contact_columns(df)
+    for row_id, result in queue.results():
+        idx = df.index[row_id]
+        enricher.apply_scrape_result(df, idx, df.at[idx, website_column], ScrapeResult.from_dict(result))
+    queue.close()
+
+    if not output_path:
+        # CSV and xlsx sources keep their format, other Excel files (.xls can't be written) become xlsx
+        base = os.path.splitext(file_path)[0]
+        output_path = f"{base}_With_Contact_Info.{output_format_of(file_path)}"
+    output_paths = save_output(df, output_path)
+    print(f"Saved {counts['done']} enriched rows to: {', '.join(output_paths)}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared work queue for website info enrichment')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create = subparsers.add_parser('create', help='Queue the websites of a lead file')
+    create.add_argument('file', help='Input file (Excel or CSV)')
+    create.add_argument('--queue', required=True, help='Queue file (SQLite)')
+
+    work = subparsers.add_parser('work', help='Lease and scrape queued rows until none are left')
+    work.add_argument('--queue', required=True, help='Queue file (SQLite)')
+    work.add_argument('--processes', type=int, default=1, help='Worker processes to start on this machine')
+    work.add_argument('--threads', type=int, default=4, help='Network threads per worker process')
+    work.add_argument('--batch-size', type=int, default=5, help='Rows leased per thread at a time')
+    work.add_argument('--lease-seconds', type=int, default=600,
+                      help='Seconds before rows of an unresponsive worker are handed out again')
+    work.add_argument('--rate', type=float, default=1.0,
+                      help='Requests per second per host from this machine, shared by its worker processes')
+
+    status = subparsers.add_parser('status', help='Show queue progress')
+    status.add_argument('--queue', required=True, help='Queue file (SQLite)')
+
+    assemble = subparsers.add_parser('assemble', help='Write the output file from finished rows')
+    assemble.add_argument('--queue', required=True, help='Queue file (SQLite)')
+    assemble.add_argument('--output', help='Output file (default: <input>_With_Contact_Info)')
+
+    args = parser.parse_args()
+
+    if args.command == 'create':
+        success = create_job(args.file, args.queue)
+    elif args.command == 'work':
+        success = run_workers(args.queue, args.processes, threads=args.threads,
+                              batch_size=args.batch_size, lease_seconds=args.lease_seconds,
+                              requests_per_second=args.rate / max(args.processes, 1))
+    elif args.command == 'status':
+        queue = WorkQueue(args.queue)
+        print(', '.join(f"{status}: {count}" for status, count in queue.counts().items()))
+        queue.close()
+        success = True
+    else:
+        success = assemble_job(args.queue, args.output)
+
+    if not success:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -1,14 +1,318 @@
-import pandas as pd
 import re
 import os
 import sys
 from urllib.parse import urlparse
-from collections import defaultdict
 import argparse
+import csv
+import io
+import json
+import math
+import sqlite3
+import time
+import zlib
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
+
+from lazy_import import lazy_import
+
+# Imported when first used, so --help and the GUI start without waiting for them
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+# Optional, gives Arrow-backed strings in low-memory mode (checked without importing it)
+HAS_PYARROW = find_spec('pyarrow') is not None
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+SEPARATOR_LABEL = 'Repeated Businesses'
+
+# Output sections: rows without a website, businesses with a unique domain, repeated businesses
+SECTIONS = ('empty', 'single', 'repeated')
+
+# Columns used as extra lead keys when present (matched case-insensitively
+# anywhere in the header, the whole word keywords only as a word of it, so
+# "Tel." and "Tel_No" are phone columns but "Hotel Name" is not)
+PHONE_COLUMN_KEYWORDS = ['phone', 'tel']
+WHOLE_WORD_COLUMN_KEYWORDS = {'tel'}
+NAME_COLUMN_KEYWORDS = ['business', 'name', 'title', 'company']
+
+ADDRESS_COLUMN_KEYWORDS = ['address', 'street', 'location']
+
+# Contact channels counted for the contact completeness of a lead score, a
+# channel is filled when any column containing its keyword has a value
+# (e.g. the Email_Addresses and *_URL columns added by Fetch Website Info)
+CONTACT_COLUMN_KEYWORDS = ['email', 'phone', 'facebook', 'instagram', 'linkedin', 'twitter', 'youtube', 'pinterest']
+
+# Lead score weights, overridable from a JSON config file with the same keys.
+# Each component is scaled to 0..1: reviews (log-scaled), rating (out of 5),
+# contact completeness and repeated group size (log-scaled)
+DEFAULT_SCORE_WEIGHTS = {'reviews': 1.0, 'rating': 0.5, 'contact': 0.3, 'group_size': 0.2}
+
+SCORE_COLUMN = 'Lead_Score'
+
+# Output file formats; xlsx outputs are split across sheets (or files) at
+# Excel's row limit, the other formats are written in chunks
+OUTPUT_FORMATS = ('xlsx', 'csv', 'parquet', 'jsonl')
+EXCEL_MAX_ROWS = 1048576 - 1  # Data rows per sheet, one row is the header
+WRITE_CHUNK_ROWS = 100000
+
+# CSV ingestion: bytes sampled to detect the encoding, delimiter and column
+# types, and the file size from which parsing is split across processes
+CSV_SAMPLE_BYTES = 1024 * 1024
+CSV_PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+CSV_DELIMITERS = ',;\t|'
+
+# Column with the worksheet each row came from, when several sheets are loaded
+SHEET_COLUMN = 'Source_Sheet'
+
+# Canonical lead columns and the headers mapped onto them when files are
+# combined (compared lowercase, with underscores and dashes as spaces); a
+# JSON file with the same layout adds aliases or canonical columns
+DEFAULT_COLUMN_ALIASES = {
+    'Business Name': ['business name', 'business', 'name', 'company', 'company name', 'title'],
+    'Website': ['website', 'website url', 'url', 'site', 'web', 'homepage'],
+    'Phone': ['phone', 'phone number', 'telephone', 'tel'],
+    'Address': ['address', 'full address', 'street address', 'location'],
+    'Reviews': ['reviews', 'review count', 'reviews count', 'number of reviews', 'total reviews'],
+    'Rating': ['rating', 'average rating', 'stars', 'star rating'],
+}
+# Canonical column of each required column, found like find_columns when no alias matches
+CANONICAL_REQUIRED_COLUMNS = {'reviews': 'Reviews', 'website': 'Website', 'rating': 'Rating'}
+
+# Legal suffixes ignored when comparing business names
+NAME_SUFFIXES = {'inc', 'llc', 'ltd', 'co', 'corp', 'corporation', 'company', 'pllc', 'pc', 'the'}
+
+# Lead index domains: sites of businesses on these platforms share the
+# platform's domain, so they are not used as a key (registrable domains)
+PROFILE_PLATFORM_DOMAINS = {
+    'facebook.com', 'fb.com', 'instagram.com', 'linkedin.com', 'twitter.com', 'x.com', 'youtube.com',
+    'pinterest.com', 'tiktok.com', 'yelp.com', 'google.com', 'goo.gl', 'g.page', 'linktr.ee',
+}
+# Website builders giving each business its own subdomain, keyed on the full host
+SUBDOMAIN_PLATFORM_DOMAINS = {
+    'wordpress.com', 'blogspot.com', 'wixsite.com', 'weebly.com', 'squarespace.com', 'godaddysites.com',
+    'business.site', 'square.site', 'myshopify.com', 'github.io', 'netlify.app', 'webflow.io',
+}
+
+# Parsed website -> domain entries kept between files (cleared when full)
+DOMAIN_CACHE_SIZE = 1000000
+
+# Watch mode: input files picked up from the watched folder, and the file in
+# the output folder recording which versions of them were already processed
+WATCH_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+WATCH_STATE_FILE = '.excel_sorter_watch.json'
+
+
+class LeadIndex:
+    """Persistent index of leads seen in previous runs (SQLite file)
+    
+    Stores one row per (kind, key) where kind is 'domain', 'phone' or 'name',
+    so checking a new file costs one indexed lookup per key.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS lead_keys ('
+            'kind TEXT NOT NULL, key TEXT NOT NULL, source TEXT, first_seen TEXT, '
+            'PRIMARY KEY (kind, key)) WITHOUT ROWID'
+        )
+        self.conn.commit()
+    
+    def add(self, kind, keys, source=None):
+        """Add keys of one kind, keeping the first source they were seen in"""
+        first_seen = datetime.now().isoformat(timespec='seconds')
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO lead_keys (kind, key, source, first_seen) VALUES (?, ?, ?, ?)',
+            ((kind, key, source, first_seen) for key in keys)
+        )
+        self.conn.commit()
+    
+    def lookup(self, kind, keys, batch_size=500):
+        """Return the subset of keys already in the index"""
+        keys = list(keys)
+        found = set()
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(
+                f'SELECT key FROM lead_keys WHERE kind = ? AND key IN ({placeholders})',
+                [kind] + batch
+            )
+            found.update(row[0] for row in rows)
+        return found
+    
+    def count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM lead_keys').fetchone()[0]
+    
+    def close(self):
+        self.conn.close()
+
+
+class FuzzyDeduplicator:
+    """Group rows that describe the same business without an exact domain match
+    
+    Rows are linked when they share a domain or a normalized phone number, or
+    when their business names are similar. Similar names are found with
+    MinHash signatures and LSH banding, so only rows that land in the same
+    band bucket are compared and the work grows roughly linearly with the
+    number of rows. Linked rows are merged with union-find.
+    """
+    PRIME = (1 << 31) - 1
+    
+    def __init__(self, name_threshold=0.7, address_threshold=0.4, num_perm=32, bands=8, seed=1):
+        self.name_threshold = name_threshold
+        self.address_threshold = address_threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, self.PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, self.PRIME, size=num_perm).astype(np.uint64)
+        self.comparisons = 0
+    
+    @staticmethod
+    def shingles(text, size=3):
+        """Character shingles of a normalized string"""
+        if not text:
+            return frozenset()
+        text = f" {text} "
+        return frozenset(text[i:i + size] for i in range(max(1, len(text) - size + 1)))
+    
+    @staticmethod
+    def jaccard(a, b):
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+    
+    def signatures(self, shingle_sets):
+        """MinHash signatures (rows x num_perm) for rows that have shingles"""
+        lengths = np.fromiter((len(s) for s in shingle_sets), dtype=np.int64, count=len(shingle_sets))
+        hashes = np.fromiter(
+            (zlib.crc32(sh.encode('utf-8')) for s in shingle_sets for sh in s),
+            dtype=np.uint64, count=int(lengths.sum())
+        )
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        signatures = np.empty((len(shingle_sets), self.num_perm), dtype=np.uint64)
+        for i in range(self.num_perm):
+            permuted = (self._a[i] * hashes + self._b[i]) % self.PRIME
+            signatures[:, i] = np.minimum.reduceat(permuted, offsets)
+        return signatures
+    
+    def group_ids(self, domains, phones, names, addresses=None):
+        """Return a group number for each row (aligned lists/Series of keys)"""
+        n = len(names)
+        parent = list(range(n))
+        
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        def union(i, j):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+        
+        # Blocking on exact keys: every row joins the first row with the same key
+        for keys in (domains, phones):
+            first_seen = {}
+            for i, key in enumerate(keys):
+                if key is None or (isinstance(key, float) and np.isnan(key)):
+                    continue
+                if key in first_seen:
+                    union(first_seen[key], i)
+                else:
+                    first_seen[key] = i
+        
+        # LSH on business names
+        name_sets = [self.shingles(name) if isinstance(name, str) else frozenset() for name in names]
+        address_sets = [self.shingles(a) if isinstance(a, str) else frozenset()
+                        for a in (addresses if addresses is not None else [None] * n)]
+        rows = np.array([i for i, s in enumerate(name_sets) if s], dtype=np.int64)
+        if len(rows) > 1:
+            signatures = self.signatures([name_sets[i] for i in rows])
+            band_size = self.num_perm // self.bands
+            for band in range(self.bands):
+                band_values = signatures[:, band * band_size:(band + 1) * band_size]
+                # Collapse the band into one key per row and bucket equal keys together
+                keys = np.zeros(len(rows), dtype=np.uint64)
+                for column in band_values.T:
+                    keys = keys * np.uint64(1000003) + column
+                order = np.argsort(keys, kind='stable')
+                sorted_keys = keys[order]
+                is_bucket_start = np.ones(len(sorted_keys), dtype=bool)
+                is_bucket_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+                bucket_start = np.maximum.accumulate(
+                    np.where(is_bucket_start, np.arange(len(sorted_keys)), 0))
+                # Compare each bucket member with its predecessor and with the
+                # bucket's first member, which keeps large buckets linear
+                for pos in np.flatnonzero(~is_bucket_start):
+                    i = int(rows[order[pos]])
+                    for j in {int(rows[order[pos - 1]]), int(rows[order[bucket_start[pos]]])}:
+                        if find(i) != find(j) and self._similar(i, j, name_sets, address_sets):
+                            union(i, j)
+        
+        return [find(i) for i in range(n)]
+    
+    def _similar(self, i, j, name_sets, address_sets):
+        self.comparisons += 1
+        if self.jaccard(name_sets[i], name_sets[j]) < self.name_threshold:
+            return False
+        # Same name at clearly different addresses is a different branch
+        if address_sets[i] and address_sets[j]:
+            return self.jaccard(address_sets[i], address_sets[j]) >= self.address_threshold
+        return True
+
 
 class ExcelSorter:
-    def __init__(self):
+    def __init__(self, lead_index=None, split_known=False, fuzzy_dedup=False, low_memory=False,
+                 top_n=None, group_top_n=None, top_groups=None, sections=SECTIONS, score_weights=None,
+                 sheets=None, output_format=None, shard_mode='sheets', column_aliases=None, log_callback=None):
         self.required_columns = ['reviews', 'website', 'rating']
+        self.log = log_callback if log_callback else print
+        # Optional LeadIndex of earlier runs; known leads are flagged
+        # in a Known_Lead column, or written to a separate file if split_known
+        self.lead_index = lead_index
+        self.split_known = split_known
+        # Also group rows with similar names or the same phone number as repeated businesses
+        self.fuzzy_dedup = fuzzy_dedup
+        self.last_fuzzy_comparisons = 0
+        # Trade a little speed for a smaller footprint on very large files
+        self.low_memory = low_memory
+        # Top-N export: rows kept in the empty website and single business
+        # sections, rows kept per repeated group, repeated groups kept (by
+        # their best reviewed row), and which sections are written at all
+        self.top_n = top_n
+        self.group_top_n = group_top_n
+        self.top_groups = top_groups
+        self.sections = tuple(sections)
+        # Weights of the lead score; when set, sections are sorted by a
+        # Lead_Score column instead of by reviews alone
+        self.score_weights = score_weights
+        # Worksheets loaded from Excel files: None for the first sheet only,
+        # 'all' for every sheet, or a list of sheet names
+        self.sheets = sheets
+        # Output format (None keeps xlsx, or the extension given for combined
+        # output) and whether large xlsx outputs are split across 'sheets' or 'files'
+        self.output_format = output_format
+        self.shard_mode = shard_mode
+        # Canonical columns and their aliases, used to unify the files of a combine
+        self.column_aliases = column_aliases or DEFAULT_COLUMN_ALIASES
+        # Domains of websites already parsed, shared by all files of this sorter
+        self.domain_cache = {}
+        self.last_row_count = 0
+        # Last saved result and its first file, shown in the GUI preview
+        self.last_result = None
+        self.last_output = None
+        # Optional CancellationToken (enrichment.py) checked between the files
+        # of a combine; the GUI sets it to the token of its Pause/Cancel buttons
+        self.cancel_token = None
     
     def extract_domain(self, url):
         """Extract domain name from URL"""
@@ -40,6 +344,49 @@ class ExcelSorter:
         except:
             return None
     
+    def lead_domain(self, url):
+        """Domain of a website used as lead index key, e.g. shop.example.co.uk -> example.co.uk
+        
+        Returns None for websites on shared platforms (social profiles,
+        Google sites), and the full host for businesses on a subdomain of a
+        website builder (joesplumbing.wordpress.com).
+        """
+        if pd.isna(url) or str(url).strip() == '':
+            return None
+        url = str(url).strip()
+        if not url.lower().startswith(('http://', 'https://')):
+            url = 'http://' + url
+        try:
+            host = urlparse(url).hostname
+        except ValueError:
+            return None
+        if not host:
+            return None
+        host = host.rstrip('.')
+        if host.startswith('www.'):
+            host = host[4:]
+        domain = registrable_domain(host)
+        if domain in PROFILE_PLATFORM_DOMAINS:
+            return None
+        if domain in SUBDOMAIN_PLATFORM_DOMAINS:
+            return host if host != domain else None
+        return domain
+    
+    def cached_domains(self, websites):
+        """extract_domain for a column, parsing each distinct website only once"""
+        if len(self.domain_cache) > DOMAIN_CACHE_SIZE:
+            self.domain_cache.clear()
+        cache = self.domain_cache
+        domains = {}
+        for url in websites.unique():
+            if pd.isna(url):
+                continue
+            if url not in cache:
+                cache[url] = self.extract_domain(url)
+            domains[url] = cache[url]
+        mapped = websites.map(domains).astype(object)
+        return mapped.where(mapped.notna(), None)
+    
     def find_columns(self, df):
         """Find required columns in dataframe (case insensitive)"""
         column_mapping = {}
@@ -47,18 +394,139 @@ class ExcelSorter:
         
         for required_col in self.required_columns:
             found = False
-            for i, col in enumerate(df_columns_lower):
+            # A column named exactly like the required one wins over partial matches
+            candidates = sorted(enumerate(df_columns_lower), key=lambda item: item[1] != required_col)
+            for i, col in candidates:
                 if required_col in col or col in required_col:
                     column_mapping[required_col] = df.columns[i]
                     found = True
                     break
             
             if not found:
-                print(f"Warning: Column '{required_col}' not found in the data")
+                self.log(f"Warning: Column '{required_col}' not found in the data")
                 return None
         
         return column_mapping
     
+    def find_optional_column(self, df, keywords):
+        """Find the first column whose name contains one of the keywords"""
+        for keyword in keywords:
+            for col in df.columns:
+                if keyword in WHOLE_WORD_COLUMN_KEYWORDS:
+                    if keyword in re.findall(r'[a-z0-9]+', str(col).lower()):
+                        return col
+                elif keyword in str(col).lower():
+                    return col
+        return None
+    
+    def normalize_phone(self, phone):
+        """Reduce a phone number to its last 10 digits"""
+        if pd.isna(phone):
+            return None
+        if isinstance(phone, float) and phone.is_integer():
+            phone = int(phone)  # Numeric cells read back as floats
+        digits = re.sub(r'\D', '', str(phone))
+        return digits[-10:] if len(digits) >= 7 else None
+    
+    def normalize_name(self, name):
+        """Lowercase a business name and drop punctuation and legal suffixes"""
+        if pd.isna(name):
+            return None
+        words = re.sub(r'[^a-z0-9 ]', ' ', str(name).lower()).split()
+        words = [word for word in words if word not in NAME_SUFFIXES]
+        return ' '.join(words) or None
+    
+    def lead_keys(self, df):
+        """Build the lead index keys of each row
+        
+        Returns a dict of kind -> Series of keys (None where a row has no key).
+        Separator rows are left without keys.
+        """
+        column_mapping = self.find_columns(df)
+        if not column_mapping:
+            return {}
+        
+        separator_mask = df[df.columns[0]].astype(str) == SEPARATOR_LABEL
+        websites = df[column_mapping['website']]
+        domains = {url: self.lead_domain(url) for url in websites.dropna().unique()}
+        keys = {'domain': websites.map(domains).astype(object)}
+        
+        phone_col = self.find_optional_column(df, PHONE_COLUMN_KEYWORDS)
+        if phone_col is not None:
+            keys['phone'] = df[phone_col].apply(self.normalize_phone)
+        
+        name_col = self.find_optional_column(df, NAME_COLUMN_KEYWORDS)
+        if name_col is not None and name_col != column_mapping['website']:
+            keys['name'] = df[name_col].apply(self.normalize_name)
+        
+        return {kind: series.mask(separator_mask) for kind, series in keys.items()}
+    
+    def find_known_leads(self, df):
+        """Return a Series naming the lead key each row matched in the index ('' if new)"""
+        known = pd.Series('', index=df.index, dtype=object)
+        for kind, series in self.lead_keys(df).items():
+            present = series.dropna()
+            found = self.lead_index.lookup(kind, present.unique())
+            matched = present[present.isin(found)].index
+            # Keep the first matching key kind as the reason
+            unset = known.loc[matched] == ''
+            known.loc[matched[unset.values]] = kind
+        return known
+    
+    def index_leads(self, df, source):
+        """Add the lead keys of a dataframe to the index"""
+        for kind, series in self.lead_keys(df).items():
+            self.lead_index.add(kind, series.dropna().unique(), source)
+    
+    def build_index(self, input_files):
+        """Add previous output files to the lead index without processing them"""
+        for file_path in input_files:
+            df = self.load_file(file_path)
+            if df is None:
+                continue
+            self.index_leads(df, os.path.basename(file_path))
+            self.log(f"Indexed: {file_path}")
+        self.log(f"Lead index now holds {self.lead_index.count()} keys")
+        return True
+    
+    def separate_known_leads(self, df, source):
+        """Check rows against the lead index before sorting
+        
+        Returns (rows to process, known rows or None). Known rows are only
+        split out when split_known is set, otherwise they stay in place and
+        are marked in a Known_Lead column.
+        """
+        known = self.find_known_leads(df)
+        is_known = known != ''
+        self.log(f"{source}: {is_known.sum()} of {len(df)} rows already in the lead index")
+        if self.split_known:
+            return df[~is_known], df[is_known]
+        df = df.copy()
+        df['Known_Lead'] = known
+        return df, None
+    
+    def save_known_leads(self, known_df, output_file):
+        """Write the leads found in the index to a _Known file next to the output"""
+        if known_df is None or known_df.empty:
+            return
+        base, ext = os.path.splitext(output_file)
+        known_file = f"{base}_Known{ext}"
+        processed_known = self.process_dataframe(known_df)
+        if processed_known is not None:
+            known_files = self.save(processed_known, known_file)
+            self.log(f"Known leads saved: {', '.join(known_files)}")
+    
+    def save(self, df, output_file):
+        """Write an output file in the format given by its extension, returns the files written"""
+        output_files = save_output(df, output_file, shard_mode=self.shard_mode)
+        if output_format_of(output_file) == 'xlsx' and len(df) > EXCEL_MAX_ROWS:
+            parts = -(-len(df) // EXCEL_MAX_ROWS)
+            self.log(f"{len(df)} rows exceed the Excel row limit, split into {parts} "
+                     f"{'files' if len(output_files) > 1 else 'sheets'}")
+        self.last_result = df
+        self.last_output = output_files[0]
+        return output_files
+    
     def process_dataframe(self, df):
         """Process the dataframe according to requirements"""
         # Find required columns
@@ -66,8 +534,11 @@ class ExcelSorter:
         if not column_mapping:
             return None
         
-        # Create working copy
-        df_work = df.copy()
+        # Create working copy (shallow in low-memory mode, columns are only replaced, never modified)
+        if self.low_memory:
+            df_work = self.compact_dataframe(df, column_mapping)
+        else:
+            df_work = df.copy()
         
         # Rename columns for easier processing
         website_col = column_mapping['website']
@@ -75,161 +546,863 @@ class ExcelSorter:
         rating_col = column_mapping['rating']
         
         # Convert reviews to numeric, handling errors
-        df_work[reviews_col] = pd.to_numeric(df_work[reviews_col], errors='coerce').fillna(0)
+        if not self.low_memory:
+            df_work[reviews_col] = pd.to_numeric(df_work[reviews_col], errors='coerce').fillna(0)
         
-        # Step 1: Separate rows with empty websites
+        # Step 1: Find rows with empty websites
         empty_website_mask = df_work[website_col].isna() | (df_work[website_col] == '') | (df_work[website_col] == 'nan')
-        empty_website_rows = df_work[empty_website_mask].copy()
-        non_empty_website_rows = df_work[~empty_website_mask].copy()
         
-        # Step 2: Sort empty website rows by reviews (highest first)
-        empty_website_rows = empty_website_rows.sort_values(by=reviews_col, ascending=False)
+        # Step 2: Give every row a group key, rows sharing a key are repeated businesses
+        # (not needed when only rows without a website are exported, unless
+        # fuzzy matching can put those rows in a group)
+        if not self.fuzzy_dedup and set(self.sections) <= {'empty'}:
+            group_codes = np.full(len(df_work), -1, dtype=np.int64)
+        elif self.fuzzy_dedup:
+            group_codes, _ = pd.factorize(self.fuzzy_group_keys(df_work, column_mapping, empty_website_mask))
+        elif self.low_memory:
+            group_codes = self.domain_codes(df_work[website_col], empty_website_mask)
+        else:
+            group_key = pd.Series(None, index=df_work.index, dtype=object)
+            group_key[~empty_website_mask] = self.cached_domains(df_work.loc[~empty_website_mask, website_col])
+            # Integer codes in order of first appearance (-1 for rows without a key)
+            # replace the key strings from here on
+            group_codes, _ = pd.factorize(group_key)
+            del group_key
+        group_sizes = np.bincount(group_codes[group_codes >= 0])
+        repeated_mask = pd.Series(False, index=df_work.index)
+        repeated_mask[group_codes >= 0] = group_sizes[group_codes[group_codes >= 0]] > 1
         
-        # Step 3: Process non-empty website rows for domain extraction
-        non_empty_website_rows['domain'] = non_empty_website_rows[website_col].apply(self.extract_domain)
+        # Rank by reviews, or by the lead score when scoring is enabled
+        sort_col = reviews_col
+        if self.score_weights:
+            df_work[SCORE_COLUMN] = self.score_leads(df_work, column_mapping, group_codes, group_sizes)
+            sort_col = SCORE_COLUMN
         
-        # Group by domain to find repeating businesses
-        domain_groups = defaultdict(list)
-        single_domain_rows = []
+        # Step 3: Sort empty website rows and single businesses (highest first)
+        sections = []
+        if 'empty' in self.sections:
+            sections.append(self.select_section(df_work, empty_website_mask & ~repeated_mask, sort_col))
+        if 'single' in self.sections:
+            sections.append(self.select_section(df_work, ~empty_website_mask & ~repeated_mask, sort_col))
         
-        for idx, row in non_empty_website_rows.iterrows():
-            domain = row['domain']
-            if domain:
-                domain_groups[domain].append(idx)
-            else:
-                single_domain_rows.append(idx)
+        # Step 4: Add repeated businesses section
+        if 'repeated' in self.sections and repeated_mask.any():
+            repeated_rows = df_work[repeated_mask].assign(_group_order=group_codes[repeated_mask.values])
+            if self.top_groups is not None:
+                # Keep the groups with the best ranked rows, in their usual order
+                best_rows = repeated_rows.groupby('_group_order', sort=False)[sort_col].max()
+                kept_groups = best_rows.nlargest(self.top_groups, keep='first').index
+                repeated_rows = repeated_rows[repeated_rows['_group_order'].isin(kept_groups)]
+            
+            # Groups in order of first appearance, sorted by rank within each group
+            repeated_rows = repeated_rows.sort_values(by=['_group_order', sort_col],
+                                                      ascending=[True, False], kind='stable')
+            if self.group_top_n is not None:
+                repeated_rows = repeated_rows.groupby('_group_order', sort=False).head(self.group_top_n)
+            
+            # Add separator row
+            separator_row = pd.DataFrame([[''] * len(df_work.columns)], columns=df_work.columns)
+            separator_row.iloc[0, 0] = SEPARATOR_LABEL
+            sections.append(separator_row)
+            sections.append(repeated_rows.drop('_group_order', axis=1))
         
-        # Separate repeated and single domain businesses
-        repeated_businesses = []
-        single_businesses = []
+        if not sections:
+            return df_work.iloc[0:0]
         
-        for domain, indices in domain_groups.items():
-            if len(indices) > 1:
-                # Sort repeated businesses by reviews within each domain group
-                domain_rows = non_empty_website_rows.loc[indices].sort_values(by=reviews_col, ascending=False)
-                repeated_businesses.append(domain_rows)
-            else:
-                single_businesses.extend(indices)
+        return pd.concat(sections, ignore_index=True)
+    
+    def select_section(self, df_work, mask, sort_col):
+        """Rows of one section sorted by sort_col, only the best top_n when set
         
-        # Add single domain rows
-        if single_domain_rows:
-            single_businesses.extend(single_domain_rows)
+        With top_n the selection is a partial one (nlargest) on the sort
+        column alone, so only the selected rows are copied and sorted.
+        """
+        if self.top_n is None:
+            return df_work[mask].sort_values(by=sort_col, ascending=False, kind='stable')
+        top_index = df_work.loc[mask, sort_col].nlargest(self.top_n, keep='first').index
+        return df_work.loc[top_index]
+    
+    def score_leads(self, df_work, column_mapping, group_codes, group_sizes):
+        """Weighted lead score of every row, computed on whole columns"""
+        weights = self.score_weights
+        score = np.zeros(len(df_work))
         
-        # Get single business rows and sort by reviews
-        single_business_rows = non_empty_website_rows.loc[single_businesses].sort_values(by=reviews_col, ascending=False)
+        # Reviews, log-scaled so a few very popular businesses don't flatten the rest
+        reviews = np.log1p(np.clip(df_work[column_mapping['reviews']].to_numpy(dtype=np.float64), 0, None))
+        if len(reviews) and reviews.max() > 0:
+            score += weights['reviews'] * reviews / reviews.max()
         
-        # Step 4: Combine all data
-        result_df = pd.concat([empty_website_rows, single_business_rows], ignore_index=True)
+        rating = pd.to_numeric(df_work[column_mapping['rating']], errors='coerce').to_numpy(dtype=np.float64)
+        score += weights['rating'] * np.nan_to_num(np.clip(rating, 0, 5) / 5)
         
-        # Add repeated businesses section
-        if repeated_businesses:
-            # Add separator row
-            separator_row = pd.DataFrame([[''] * len(df.columns)], columns=df.columns)
-            separator_row.iloc[0, 0] = 'Repeated Businesses'
-            
-            result_df = pd.concat([result_df, separator_row], ignore_index=True)
-            
-            # Add repeated business groups
-            for domain_group in repeated_businesses:
-                domain_group_clean = domain_group.drop('domain', axis=1)
-                result_df = pd.concat([result_df, domain_group_clean], ignore_index=True)
+        # Share of the contact channels in the file that the row has a value for
+        channels = []
+        for keyword in CONTACT_COLUMN_KEYWORDS:
+            columns = [col for col in df_work.columns if keyword in str(col).lower()]
+            if columns:
+                channels.append(np.logical_or.reduce([self.filled(df_work[col]) for col in columns]))
+        if channels:
+            score += weights['contact'] * np.mean(channels, axis=0)
+        
+        # Size of the repeated group (1 for rows without a group), log-scaled
+        sizes = np.ones(len(df_work))
+        sizes[group_codes >= 0] = group_sizes[group_codes[group_codes >= 0]]
+        if len(sizes) and sizes.max() > 1:
+            score += weights['group_size'] * np.log(sizes) / np.log(sizes.max())
+        
+        return np.round(score, 4)
+    
+    def filled(self, column):
+        """Boolean array of the cells that have a non-blank value"""
+        filled = column.notna().to_numpy()
+        if column.dtype == object or pd.api.types.is_string_dtype(column):
+            filled = filled & (column.astype(str).str.strip() != '').to_numpy()
+        return filled
+    
+    def domain_codes(self, websites, empty_website_mask):
+        """Domain group codes in order of first appearance without a column of domain strings
+        
+        Each distinct domain is stored once in a dict, rows only get its
+        integer code (-1 for empty or unparseable websites).
+        """
+        codes_by_domain = {}
         
-        # Remove the temporary domain column if it exists
-        if 'domain' in result_df.columns:
-            result_df = result_df.drop('domain', axis=1)
+        def code(url, empty):
+            if empty:
+                return -1
+            domain = self.extract_domain(url)
+            if not domain:
+                return -1
+            return codes_by_domain.setdefault(domain, len(codes_by_domain))
         
-        return result_df
+        return np.fromiter(
+            (code(url, empty) for url, empty in zip(websites, empty_website_mask)),
+            dtype=np.int64, count=len(websites)
+        )
+    
+    def compact_dataframe(self, df, column_mapping):
+        """Low-memory working copy: downcast numbers and store text as Arrow strings"""
+        df_work = df.copy(deep=False)
+        
+        reviews_col = column_mapping['reviews']
+        reviews = pd.to_numeric(df_work[reviews_col], errors='coerce').fillna(0)
+        # Only whole counts are downcast, float32 would change fractional values
+        # (ratings stay float64 for the same reason, they are written out as read)
+        if (reviews % 1 == 0).all():
+            df_work[reviews_col] = pd.to_numeric(reviews, downcast='integer')
+        else:
+            df_work[reviews_col] = reviews
+        
+        if HAS_PYARROW:
+            for col in df_work.columns:
+                if df_work[col].dtype == object:
+                    df_work[col] = df_work[col].astype('string[pyarrow]')
+        return df_work
+    
+    def fuzzy_group_keys(self, df, column_mapping, empty_website_mask):
+        """Group key per row from domain, phone and business name similarity"""
+        website_col = column_mapping['website']
+        domains = pd.Series(None, index=df.index, dtype=object)
+        domains[~empty_website_mask] = df.loc[~empty_website_mask, website_col].apply(self.extract_domain)
+        
+        phone_col = self.find_optional_column(df, PHONE_COLUMN_KEYWORDS)
+        phones = df[phone_col].apply(self.normalize_phone) if phone_col is not None else [None] * len(df)
+        
+        name_col = self.find_optional_column(df, NAME_COLUMN_KEYWORDS)
+        if name_col is None or name_col == website_col:
+            name_col = df.columns[0]
+        names = df[name_col].apply(self.normalize_name)
+        
+        address_col = self.find_optional_column(df, ADDRESS_COLUMN_KEYWORDS)
+        addresses = df[address_col].apply(self.normalize_name).tolist() if address_col is not None else None
+        
+        deduplicator = FuzzyDeduplicator()
+        groups = deduplicator.group_ids(domains.tolist(), list(phones), names.tolist(), addresses)
+        self.last_fuzzy_comparisons = deduplicator.comparisons
+        self.log(f"Fuzzy duplicate check: {deduplicator.comparisons} candidate comparisons for {len(df)} rows")
+        return pd.Series(groups, index=df.index)
     
     def load_file(self, file_path):
         """Load Excel or CSV file"""
         try:
             if file_path.lower().endswith('.csv'):
-                return pd.read_csv(file_path)
+                return read_csv_fast(file_path)
+            elif self.sheets is not None:
+                return self.load_sheets(file_path)
             else:
                 return pd.read_excel(file_path)
         except Exception as e:
-            print(f"Error loading file {file_path}: {str(e)}")
+            self.log(f"Error loading file {file_path}: {str(e)}")
             return None
     
+    def load_sheets(self, file_path):
+        """Load the selected worksheets of a workbook in parallel as one dataframe
+        
+        Each row is tagged with its sheet name. Sheets are mapped onto the
+        canonical lead columns (unify_columns) before they are combined, and
+        sheets without the required columns are skipped after reading only
+        their header row.
+        """
+        with pd.ExcelFile(file_path) as workbook:
+            if self.sheets == 'all':
+                sheet_names = workbook.sheet_names
+            else:
+                missing = [name for name in self.sheets if name not in workbook.sheet_names]
+                if missing:
+                    self.log(f"Warning: Sheets not found in {file_path}: {', '.join(missing)}")
+                sheet_names = [name for name in self.sheets if name in workbook.sheet_names]
+            
+            usable_sheets = []
+            for sheet_name in sheet_names:
+                header = pd.read_excel(workbook, sheet_name=sheet_name, nrows=0)
+                if self.find_columns(unify_columns(header, self.column_aliases)):
+                    usable_sheets.append(sheet_name)
+                else:
+                    self.log(f"Skipping sheet '{sheet_name}' - missing required columns")
+            
+            if not usable_sheets:
+                self.log(f"No sheets with the required columns in {file_path}")
+                return None
+            
+            # Excel parsing is CPU bound, so sheets are split between worker
+            # processes. Opening a workbook is costly (its shared strings are
+            # parsed), so each worker opens it once for its share of the sheets
+            workers = min(len(usable_sheets), os.cpu_count() or 1)
+            if workers == 1:
+                frames = read_sheets(workbook, usable_sheets)
+            else:
+                shares = [usable_sheets[i::workers] for i in range(workers)]
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(read_sheets, [file_path] * workers, shares))
+                frames_by_name = {name: frame for share, share_frames in zip(shares, results)
+                                  for name, frame in zip(share, share_frames)}
+                frames = [frames_by_name[name] for name in usable_sheets]
+        
+        # Sheets written by different people may name the same column differently
+        frames = [unify_columns(frame, self.column_aliases) for frame in frames]
+        for sheet_name, frame in zip(usable_sheets, frames):
+            frame[SHEET_COLUMN] = sheet_name
+            self.log(f"Loaded sheet '{sheet_name}': {len(frame)} rows")
+        return pd.concat(frames, ignore_index=True)
+    
     def process_single_file(self, input_file, output_dir=None):
         """Process a single file"""
-        print(f"Processing: {input_file}")
+        self.log(f"Processing: {input_file}")
         
         # Load file
         df = self.load_file(input_file)
         if df is None:
             return False
+        self.last_row_count = len(df)
+        
+        # Check against earlier runs
+        known_df = None
+        if self.lead_index is not None and self.find_columns(df):
+            df, known_df = self.separate_known_leads(df, input_file)
         
         # Process dataframe
         processed_df = self.process_dataframe(df)
         if processed_df is None:
-            print(f"Could not process {input_file} - missing required columns")
+            self.log(f"Could not process {input_file} - missing required columns")
             return False
         
         # Generate output filename
         base_name = os.path.splitext(os.path.basename(input_file))[0]
-        output_file = f"{base_name}_Cleaned.xlsx"
+        output_file = f"{base_name}_Cleaned.{self.output_format or 'xlsx'}"
         
         if output_dir:
             output_file = os.path.join(output_dir, output_file)
         
         # Save processed file
         try:
-            processed_df.to_excel(output_file, index=False)
-            print(f"Saved: {output_file}")
+            output_files = self.save(processed_df, output_file)
+            self.log(f"Saved: {', '.join(output_files)}")
+            if self.lead_index is not None:
+                self.save_known_leads(known_df, output_file)
+                self.index_leads(processed_df, os.path.basename(output_file))
             return True
         except Exception as e:
-            print(f"Error saving {output_file}: {str(e)}")
+            self.log(f"Error saving {output_file}: {str(e)}")
             return False
     
     def process_multiple_files(self, input_files, output_file="Combined_Cleaned.xlsx"):
         """Process multiple files and combine into one"""
-        print(f"Processing {len(input_files)} files...")
+        self.log(f"Processing {len(input_files)} files...")
         
         all_data = []
         
         for file_path in input_files:
-            print(f"Loading: {file_path}")
+            if self.cancel_token is not None and not self.cancel_token.wait_if_paused():
+                self.log("Cancelled, combining the files loaded so far")
+                break
+            self.log(f"Loading: {file_path}")
             df = self.load_file(file_path)
-            if df is not None:
-                processed_df = self.process_dataframe(df)
-                if processed_df is not None:
-                    all_data.append(processed_df)
-                else:
-                    print(f"Skipping {file_path} - missing required columns")
-            else:
-                print(f"Skipping {file_path} - could not load")
+            if df is None:
+                self.log(f"Skipping {file_path} - could not load")
+                continue
+            # Same columns under the same names and types in every file, so the
+            # combined frame has one reviews and one website column; the rows are
+            # sorted once, after combining
+            df = unify_columns(df, self.column_aliases)
+            if not self.find_columns(df):
+                self.log(f"Skipping {file_path} - missing required columns")
+                continue
+            all_data.append(df)
         
         if not all_data:
-            print("No valid files to process")
+            self.log("No valid files to process")
             return False
         
         # Combine all dataframes
         combined_df = pd.concat(all_data, ignore_index=True)
         
-        # Process the combined data again to handle cross-file duplicates
+        # Check against earlier runs
+        known_df = None
+        if self.lead_index is not None:
+            combined_df, known_df = self.separate_known_leads(combined_df, output_file)
+        
+        # Sort the combined data, duplicates across files are grouped together
         final_df = self.process_dataframe(combined_df)
         
         # Save combined file
+        if self.output_format:
+            output_file = with_format(output_file, self.output_format)
         try:
-            final_df.to_excel(output_file, index=False)
-            print(f"Combined file saved: {output_file}")
+            output_files = self.save(final_df, output_file)
+            self.log(f"Combined file saved: {', '.join(output_files)}")
+            if self.lead_index is not None:
+                self.save_known_leads(known_df, output_file)
+                self.index_leads(final_df, os.path.basename(output_file))
             return True
         except Exception as e:
-            print(f"Error saving combined file: {str(e)}")
+            self.log(f"Error saving combined file: {str(e)}")
+            return False
+
+class FolderWatcher:
+    """Process files dropped into a folder as soon as they are completely written
+    
+    The folder is polled; a file counts as written once its size and
+    modification time have not changed for `settle` seconds and it can be
+    opened. Every file goes through the same ExcelSorter, so its lead index
+    and domain cache stay warm between files. Processed file versions are
+    recorded in the output folder, so a restart only picks up new or
+    changed files.
+    """
+    def __init__(self, sorter, watch_dir, output_dir, interval=5, settle=10):
+        self.sorter = sorter
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir
+        self.interval = interval
+        self.settle = settle
+        self.state_file = os.path.join(output_dir, WATCH_STATE_FILE)
+        self.processed = self.load_state()
+        # path -> (size, mtime, time the file was first seen with them)
+        self.pending = {}
+        self.files_done = 0
+        self.files_failed = 0
+        self.rows_done = 0
+        self.busy_seconds = 0.0
+    
+    def load_state(self):
+        """Processed file versions of earlier runs: path -> [size, mtime_ns]"""
+        try:
+            with open(self.state_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_state(self):
+        # Written to a temporary file first so a crash never leaves half a state file
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.processed, f)
+        os.replace(temp_file, self.state_file)
+    
+    def scan(self):
+        """Input files in the watched folder with their current [size, mtime_ns]"""
+        files = {}
+        for entry in os.scandir(self.watch_dir):
+            # Skip Office lock files (~$name.xlsx), hidden files and partial downloads
+            if entry.name.startswith(('~$', '.')) or not entry.name.lower().endswith(WATCH_EXTENSIONS):
+                continue
+            try:
+                if entry.is_file():
+                    stat = entry.stat()
+                    files[entry.path] = [stat.st_size, stat.st_mtime_ns]
+            except OSError:
+                continue  # Removed while scanning
+        return files
+    
+    def ready_files(self):
+        """Files not processed in their current version that have stopped changing"""
+        now = time.monotonic()
+        files = self.scan()
+        ready = []
+        for path, version in files.items():
+            # Empty files are still being created (or copied)
+            if version[0] == 0 or self.processed.get(path) == version:
+                self.pending.pop(path, None)
+                continue
+            seen = self.pending.get(path)
+            if seen is None or seen[0] != version:
+                self.pending[path] = (version, now)
+            elif now - seen[1] >= self.settle and self.can_open(path):
+                ready.append(path)
+        # Forget files that were removed before they settled
+        for path in list(self.pending):
+            if path not in files:
+                del self.pending[path]
+        return sorted(ready, key=lambda path: files[path][1])
+    
+    def can_open(self, path):
+        # A writer holding the file open exclusively (Windows) makes this fail
+        try:
+            with open(path, 'rb'):
+                return True
+        except OSError:
             return False
+    
+    def process(self, path):
+        """Run one file through the sorter and record its version"""
+        version = self.pending.pop(path)[0]
+        start = time.perf_counter()
+        try:
+            success = self.sorter.process_single_file(path, self.output_dir)
+        except Exception as e:
+            print(f"Error processing {path}: {str(e)}")
+            success = False
+        seconds = time.perf_counter() - start
+        
+        # Failed files are recorded too, they are retried once they change
+        self.processed[path] = version
+        self.save_state()
+        self.busy_seconds += seconds
+        if success:
+            self.files_done += 1
+            rows = self.sorter.last_row_count
+            self.rows_done += rows
+            print(f"Done in {seconds:.1f}s ({rows / max(seconds, 1e-9):,.0f} rows/s), "
+                  f"{len(self.pending)} files waiting")
+        else:
+            self.files_failed += 1
+            print(f"Failed after {seconds:.1f}s, the file is retried when it changes; "
+                  f"{len(self.pending)} files waiting")
+    
+    def run(self, once=False):
+        """Poll the folder until interrupted (or until nothing is left with once=True)"""
+        print(f"Watching {self.watch_dir} (outputs in {self.output_dir}), press Ctrl+C to stop")
+        try:
+            while True:
+                for path in self.ready_files():
+                    self.process(path)
+                if once and not self.pending:
+                    break
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            print()
+        self.print_summary()
+        return self.files_failed == 0
+    
+    def print_summary(self):
+        rate = self.rows_done / self.busy_seconds if self.busy_seconds else 0
+        print(f"Processed {self.files_done} files ({self.rows_done} rows, {rate:,.0f} rows/s), "
+              f"{self.files_failed} failed, {len(self.pending)} still waiting")
+
+def output_format_of(output_file):
+    """Output format implied by a file name (xlsx for unknown extensions)"""
+    ext = os.path.splitext(output_file)[1].lower().lstrip('.')
+    return ext if ext in OUTPUT_FORMATS else 'xlsx'
+
+def with_format(output_file, output_format):
+    """Output file name with the extension of the given format"""
+    return f"{os.path.splitext(output_file)[0]}.{output_format}"
+
+def arrow_safe(df):
+    """Copy of an output frame that Parquet can store
+    
+    The separator row leaves '' in numeric columns and spreadsheets mix
+    numbers and text in one column, so the separator cells become nulls,
+    columns are re-inferred and any column still mixing types is stored as text.
+    """
+    df = df.copy()
+    separator_rows = df.iloc[:, 0] == SEPARATOR_LABEL
+    if separator_rows.any():
+        df.loc[separator_rows, df.columns[1:]] = None
+    df = df.infer_objects()
+    for col in df.columns:
+        if df[col].dtype == object:
+            values = df[col].dropna()
+            if values.map(type).nunique() > 1:
+                df[col] = df[col].map(lambda value: value if pd.isna(value) else str(value))
+    return df
+
+def save_output(df, output_file, output_format=None, shard_mode='sheets'):
+    """Write df as xlsx, csv, parquet or jsonl, returns the list of files written
+    
+    xlsx outputs longer than Excel's row limit are split across numbered
+    sheets of one workbook, or across numbered files (output_Part1.xlsx, ...
+    instead of output_file) with shard_mode='files'.
+    """
+    output_format = output_format or output_format_of(output_file)
+    if output_format == 'csv':
+        df.to_csv(output_file, index=False, chunksize=WRITE_CHUNK_ROWS)
+    elif output_format == 'jsonl':
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for start in range(0, len(df), WRITE_CHUNK_ROWS):
+                lines = df.iloc[start:start + WRITE_CHUNK_ROWS].to_json(
+                    orient='records', lines=True, date_format='iso', force_ascii=False)
+                f.write(lines if lines.endswith('\n') else lines + '\n')
+    elif output_format == 'parquet':
+        arrow_safe(df).to_parquet(output_file, index=False, engine='pyarrow', row_group_size=WRITE_CHUNK_ROWS)
+    elif len(df) <= EXCEL_MAX_ROWS:
+        df.to_excel(output_file, index=False)
+    else:
+        starts = range(0, len(df), EXCEL_MAX_ROWS)
+        if shard_mode == 'files':
+            base, ext = os.path.splitext(output_file)
+            part_files = [f"{base}_Part{part}{ext}" for part in range(1, len(starts) + 1)]
+            for part_file, start in zip(part_files, starts):
+                df.iloc[start:start + EXCEL_MAX_ROWS].to_excel(part_file, index=False)
+            return part_files
+        with pd.ExcelWriter(output_file) as writer:
+            for part, start in enumerate(starts, 1):
+                df.iloc[start:start + EXCEL_MAX_ROWS].to_excel(writer, sheet_name=f"Sheet{part}", index=False)
+    return [output_file]
+
+def registrable_domain(host):
+    """Domain a host is registered under, e.g. shop.example.co.uk -> example.co.uk
+    
+    Approximated without a public suffix list: the last two labels, or three
+    when the second to last is a common second-level label under a country code.
+    """
+    host = host.split(':')[0]
+    labels = host.split('.')
+    if labels[-1].isdigit():
+        return host  # IP address
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in ('co', 'com', 'net', 'org', 'gov', 'ac', 'edu'):
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+def sniff_csv(sample):
+    """Guess the encoding and delimiter of a CSV file from its first bytes"""
+    if sample.startswith((b'\xff\xfe', b'\xfe\xff')):
+        encoding = 'utf-16'
+    elif sample.startswith(b'\xef\xbb\xbf'):
+        encoding = 'utf-8-sig'
+    elif sample[1::2].count(0) > len(sample) // 4:
+        encoding = 'utf-16-le'  # UTF-16 without byte order mark
+    elif sample[0::2].count(0) > len(sample) // 4:
+        encoding = 'utf-16-be'
+    else:
+        # A multi-byte character may be cut at the end of the sample
+        for encoding in ('utf-8', 'cp1252', 'latin-1'):
+            try:
+                sample[:len(sample) - 3].decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+    
+    text = sample.decode(encoding, errors='ignore')
+    try:
+        delimiter = csv.Sniffer().sniff(text[:64 * 1024], delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ','
+    return encoding, delimiter
+
+def csv_chunk_ranges(file_path, chunks, start):
+    """Split a CSV file after byte offset start into ranges that end at row boundaries
+    
+    A newline only ends a row when an even number of quotes precede it, so
+    quoted fields containing newlines are never split.
+    """
+    size = os.path.getsize(file_path)
+    boundaries = [start]
+    with open(file_path, 'rb') as f:
+        position, quotes = start, 0
+        for i in range(1, chunks):
+            target = start + (size - start) * i // chunks
+            if target <= position:
+                continue
+            f.seek(position)
+            quotes += f.read(target - position).count(b'"')
+            position = target
+            # Move on to the next newline that is not inside a quoted field
+            for line in iter(f.readline, b''):
+                quotes += line.count(b'"')
+                position += len(line)
+                if quotes % 2 == 0:
+                    break
+            if boundaries[-1] < position < size:
+                boundaries.append(position)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def parse_csv_range(file_path, start, end, options):
+    """Parse one byte range of a CSV file (module level so worker processes can run it)"""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(data), header=None, **options)
+
+def read_csv_fast(file_path, workers=None):
+    """Read a CSV file with sniffed encoding, delimiter and column types
+    
+    Types are inferred once from a sample: text columns are read as text in
+    every part of the file. With pyarrow installed its multithreaded parser
+    is used; otherwise large files are split into byte ranges parsed in
+    separate processes.
+    """
+    with open(file_path, 'rb') as f:
+        sample = f.read(CSV_SAMPLE_BYTES)
+    encoding, delimiter = sniff_csv(sample)
+    
+    # Column names and types from the rows in the sample (the last one may be cut off)
+    sample_text = sample.decode(encoding, errors='ignore')
+    sample_lines = sample_text.splitlines()
+    if len(sample) == CSV_SAMPLE_BYTES and len(sample_lines) > 2:
+        sample_text = '\n'.join(sample_lines[:-1])
+    try:
+        sample_df = pd.read_csv(io.StringIO(sample_text), sep=delimiter)
+    except pd.errors.ParserError:
+        # Sample ends inside a quoted field, let the parser infer the types
+        return pd.read_csv(file_path, sep=delimiter, encoding=encoding)
+    text_columns = {col: str for col in sample_df.columns if not pd.api.types.is_numeric_dtype(sample_df[col])}
+    options = {'sep': delimiter, 'encoding': encoding, 'dtype': text_columns}
+    
+    if HAS_PYARROW:
+        return pd.read_csv(file_path, engine='pyarrow', **options)
+    
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(file_path)
+    # Byte ranges need an encoding where a newline is the single byte \n
+    if workers == 1 or size < CSV_PARALLEL_MIN_BYTES or encoding.startswith('utf-16'):
+        return pd.read_csv(file_path, **options)
+    
+    # The ranges start after the header row, its column names come from the sample
+    header_end, quotes = 0, 0
+    with open(file_path, 'rb') as f:
+        for line in iter(f.readline, b''):
+            quotes += line.count(b'"')
+            header_end += len(line)
+            if quotes % 2 == 0:
+                break
+    options['names'] = list(sample_df.columns)
+    options['encoding'] = 'utf-8' if encoding == 'utf-8-sig' else encoding
+    
+    ranges = csv_chunk_ranges(file_path, workers * 4, header_end)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(parse_csv_range, [file_path] * len(ranges),
+                                  [start for start, _ in ranges], [end for _, end in ranges],
+                                  [options] * len(ranges)))
+    return pd.concat(parts, ignore_index=True)
+
+def read_sheets(workbook, sheet_names):
+    """Read worksheets of one workbook (module level so worker processes can run it)
+    
+    workbook is an open pd.ExcelFile or a path, which is then opened once.
+    """
+    if isinstance(workbook, str):
+        with pd.ExcelFile(workbook) as opened:
+            return read_sheets(opened, sheet_names)
+    return [pd.read_excel(workbook, sheet_name=sheet_name) for sheet_name in sheet_names]
+
+def parse_sheet_names(text):
+    """ExcelSorter.sheets from 'all' or comma separated sheet names, None when blank"""
+    if not text or not text.strip():
+        return None
+    if text.strip().lower() == 'all':
+        return 'all'
+    return [name.strip() for name in text.split(',') if name.strip()] or None
+
+def column_key(name):
+    """Column name as compared with aliases: lowercase, underscores and dashes as single spaces"""
+    return ' '.join(str(name).lower().replace('_', ' ').replace('-', ' ').split())
+
+def unify_columns(df, column_aliases=None):
+    """Rename a file's columns to the canonical lead columns and type the numeric ones
+    
+    Each canonical column takes the first column matching one of its aliases;
+    a required column without an alias match falls back to the find_columns
+    rule. Other columns keep their names. Reviews and ratings become numbers
+    unless that would lose values (e.g. "4.5 stars").
+    """
+    column_aliases = column_aliases or DEFAULT_COLUMN_ALIASES
+    keys = [column_key(col) for col in df.columns]
+    renames = {}
+    for canonical, aliases in column_aliases.items():
+        for alias in [canonical] + list(aliases):
+            alias = column_key(alias)
+            source = next((col for col, key in zip(df.columns, keys) if key == alias and col not in renames), None)
+            if source is not None:
+                renames[source] = canonical
+                break
+    
+    for required_col, canonical in CANONICAL_REQUIRED_COLUMNS.items():
+        if canonical in renames.values():
+            continue
+        source = next((col for col, key in zip(df.columns, keys)
+                       if col not in renames and (required_col in key or key in required_col)), None)
+        if source is not None:
+            renames[source] = canonical
+    
+    # A column already named like a canonical one it was not mapped to makes way
+    kept = set(renames.values())
+    renames.update({col: f"{col}_Original" for col in df.columns
+                    if col not in renames and col in kept})
+    df = df.rename(columns=renames)
+    
+    for canonical in (CANONICAL_REQUIRED_COLUMNS['reviews'], CANONICAL_REQUIRED_COLUMNS['rating']):
+        if canonical in df.columns and not pd.api.types.is_numeric_dtype(df[canonical]):
+            column = df[canonical]
+            numeric = pd.to_numeric(column, errors='coerce')
+            filled = column.notna() & (column.astype(str).str.strip() != '')
+            if numeric.notna().sum() == filled.sum():
+                df[canonical] = numeric
+    return df
+
+def load_column_aliases(config_file=None):
+    """Canonical columns and aliases, the defaults extended from a JSON config file"""
+    aliases = {canonical: list(names) for canonical, names in DEFAULT_COLUMN_ALIASES.items()}
+    if config_file:
+        with open(config_file, encoding='utf-8') as f:
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError("Column aliases must be an object of canonical column -> list of aliases")
+        for canonical, names in config.items():
+            if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                raise ValueError(f"Aliases of '{canonical}' must be a list of column names")
+            # Configured aliases are tried before the defaults
+            aliases[canonical] = names + aliases.get(canonical, [])
+    return aliases
+
+def load_score_weights(config_file=None):
+    """Lead score weights, the defaults updated from a JSON config file"""
+    weights = dict(DEFAULT_SCORE_WEIGHTS)
+    if config_file:
+        with open(config_file, encoding='utf-8') as f:
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError("Score weights must be an object of weight name -> number")
+        unknown = set(config) - set(DEFAULT_SCORE_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Unknown score weights: {', '.join(sorted(unknown))} "
+                             f"(expected {', '.join(DEFAULT_SCORE_WEIGHTS)})")
+        for key, value in config.items():
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or not math.isfinite(value):
+                raise ValueError(f"Score weight '{key}' must be a number")
+            weights[key] = float(value)
+    return weights
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, None where it cannot be measured"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
 
 def main():
     parser = argparse.ArgumentParser(description='Excel/CSV Sorter Tool')
-    parser.add_argument('files', nargs='+', help='Input files (Excel or CSV)')
+    parser.add_argument('files', nargs='*', help='Input files (Excel or CSV)')
     parser.add_argument('--combine', action='store_true', help='Combine multiple files into one')
     parser.add_argument('--output', help='Output file name (for combine mode) or directory')
+    parser.add_argument('--fuzzy', action='store_true',
+                        help='Also group businesses with similar names or the same phone number')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='Use compact column types to reduce memory on very large files')
+    parser.add_argument('--top', type=positive_int, metavar='N',
+                        help='Keep only the N most reviewed rows of the empty website and single business sections')
+    parser.add_argument('--group-top', type=positive_int, metavar='K',
+                        help='Keep only the K most reviewed rows of each repeated business group')
+    parser.add_argument('--top-groups', type=positive_int, metavar='G',
+                        help='Keep only the G repeated business groups with the most reviewed rows')
+    parser.add_argument('--sections', default=','.join(SECTIONS),
+                        help='Comma separated sections to write: empty, single, repeated (default: all)')
+    parser.add_argument('--score', action='store_true',
+                        help='Rank rows by a lead score (reviews, rating, contact info, group size) instead of reviews')
+    parser.add_argument('--score-config', metavar='FILE',
+                        help='JSON file with lead score weights (implies --score)')
+    parser.add_argument('--column-aliases', metavar='FILE',
+                        help='JSON file of extra column name aliases used to line up the columns of combined files')
+    parser.add_argument('--sheets', metavar='NAMES',
+                        help="Worksheets to load from Excel files: 'all' or comma separated names "
+                             "(default: first sheet)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS,
+                        help='Output format (default: xlsx, or the extension of --output when combining)')
+    parser.add_argument('--shard', choices=['sheets', 'files'], default='sheets',
+                        help='Split xlsx outputs over the Excel row limit across sheets or files (default: sheets)')
+    parser.add_argument('--lead-index', help='SQLite lead index of previous runs to check new leads against')
+    parser.add_argument('--split-known', action='store_true',
+                        help='Write leads already in the index to a separate _Known file instead of flagging them')
+    parser.add_argument('--build-index', action='store_true',
+                        help='Only add the given files (e.g. previous _Cleaned outputs) to the lead index')
+    parser.add_argument('--watch', metavar='DIR',
+                        help='Keep running and process files added to or changed in DIR '
+                             '(outputs go to --output, default: DIR/Cleaned)')
+    parser.add_argument('--interval', type=float, default=5,
+                        help='Seconds between checks of the watched folder (default: 5)')
+    parser.add_argument('--settle', type=float, default=10,
+                        help='Seconds a file must stay unchanged before it is processed (default: 10)')
     
     args = parser.parse_args()
     
-    sorter = ExcelSorter()
+    if not args.files and not args.watch:
+        parser.error('the following arguments are required: files (or --watch DIR)')
+    if args.watch and (args.files or args.combine or args.build_index):
+        parser.error('--watch cannot be combined with input files, --combine or --build-index')
+    if args.watch and not os.path.isdir(args.watch):
+        parser.error(f"--watch folder not found: {args.watch}")
+    if (args.build_index or args.split_known) and not args.lead_index:
+        parser.error('--build-index and --split-known require --lead-index')
+    sections = [section.strip() for section in args.sections.split(',') if section.strip()]
+    if not sections or any(section not in SECTIONS for section in sections):
+        parser.error(f"--sections must be a comma separated list of: {', '.join(SECTIONS)}")
     
-    if args.combine or len(args.files) > 1:
+    if args.format == 'parquet' and not HAS_PYARROW:
+        parser.error('Parquet output requires pyarrow (pip install pyarrow)')
+    
+    sheets = parse_sheet_names(args.sheets)
+    
+    score_weights = None
+    if args.score or args.score_config:
+        try:
+            score_weights = load_score_weights(args.score_config)
+        except (OSError, ValueError) as e:
+            parser.error(f"Cannot load score config: {e}")
+    
+    column_aliases = None
+    if args.column_aliases:
+        try:
+            column_aliases = load_column_aliases(args.column_aliases)
+        except (OSError, ValueError) as e:
+            parser.error(f"Cannot load column aliases: {e}")
+    
+    lead_index = LeadIndex(args.lead_index) if args.lead_index else None
+    sorter = ExcelSorter(lead_index=lead_index, split_known=args.split_known, fuzzy_dedup=args.fuzzy,
+                         low_memory=args.low_memory, top_n=args.top, group_top_n=args.group_top,
+                         top_groups=args.top_groups, sections=sections, score_weights=score_weights,
+                         sheets=sheets, output_format=args.format, shard_mode=args.shard,
+                         column_aliases=column_aliases)
+    
+    if args.watch:
+        output_dir = args.output or os.path.join(args.watch, 'Cleaned')
+        if os.path.abspath(output_dir) == os.path.abspath(args.watch):
+            parser.error('--output must differ from the watched folder, outputs would be processed again')
+        os.makedirs(output_dir, exist_ok=True)
+        success = FolderWatcher(sorter, args.watch, output_dir, args.interval, args.settle).run()
+    elif args.build_index:
+        success = sorter.build_index(args.files)
+    elif args.combine or len(args.files) > 1:
         # Multiple files mode
         output_file = args.output if args.output else "Combined_Cleaned.xlsx"
         success = sorter.process_multiple_files(args.files, output_file)
@@ -238,6 +1411,9 @@ def main():
         output_dir = args.output if args.output and os.path.isdir(args.output) else None
         success = sorter.process_single_file(args.files[0], output_dir)
     
+    if args.low_memory and peak_rss_mb() is not None:
+        print(f"Peak memory: {peak_rss_mb():.0f} MB")
+    
     if success:
         print("Processing completed successfully!")
     else:
@@ -1,20 +1,148 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import pandas as pd
-import re
 import os
+import queue
 import threading
-import time
-import phonenumbers
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse, urljoin
-from collections import defaultdict
-import random
-import urllib3
+import multiprocessing
+from lazy_import import preload
+from excel_sorter import (OUTPUT_FORMATS, HAS_PYARROW, SEPARATOR_LABEL, ExcelSorter, output_format_of,
+                          parse_sheet_names, with_format)
+from enrichment import (CancellationToken, EnrichmentStore, WebsiteEnricher, ENRICHMENT_STORE_FILENAME,
+                        shutdown_parse_pool)
+
+# Imported in the background once the window is shown (the processing and
+# fetching modules import them when a stage first needs them)
+PRELOAD_MODULES = ['pandas', 'openpyxl', 'requests', 'bs4', 'lxml', 'phonenumbers']
+
+# Output format choice that keeps the format of the input file
+SAME_AS_INPUT = 'Same as input'
+
+# Log messages from worker threads are queued and moved into the log box
+# by the Tk thread at this interval (milliseconds)
+LOG_FLUSH_MS = 50
+
+
+class DataFramePreview(ttk.Frame):
+    """Virtualized, read-only table view of a dataframe
+    
+    The Treeview only ever holds the rows that fit in the window. Scrolling
+    moves a row offset and refills those items from the frame, so a million
+    row result is as quick to browse as a small one.
+    """
+    def __init__(self, parent):
+        super().__init__(parent, padding="10")
+        self.df = None
+        self.first_row = 0
+        self.visible_rows = 20
+        self.separator_row = None
+        
+        # Row count and navigation
+        toolbar = ttk.Frame(self)
+        toolbar.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        self.info_var = tk.StringVar(value="Process or fetch a file to preview the result here")
+        ttk.Label(toolbar, textvariable=self.info_var).pack(side=tk.LEFT)
+        self.separator_btn = ttk.Button(toolbar, text="Go to Repeated Businesses",
+                                        command=self.jump_to_separator, state='disabled')
+        self.separator_btn.pack(side=tk.RIGHT)
+        ttk.Button(toolbar, text="Top", command=lambda: self.scroll_to(0), width=6).pack(side=tk.RIGHT, padx=5)
+        
+        self.tree = ttk.Treeview(self, show='headings', selectmode='browse', height=self.visible_rows)
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.tree.tag_configure('separator', background='#fff2cc')
+        
+        # The vertical scrollbar tracks the row offset, not the Treeview items
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        x_scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.tree.xview)
+        x_scrollbar.grid(row=2, column=0, sticky=(tk.W, tk.E))
+        self.tree.configure(xscrollcommand=x_scrollbar.set)
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+        
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll_by(3))
+        self.tree.bind('<Up>', lambda event: self.scroll_by(-1))
+        self.tree.bind('<Down>', lambda event: self.scroll_by(1))
+        self.tree.bind('<Prior>', lambda event: self.scroll_by(-self.visible_rows))
+        self.tree.bind('<Next>', lambda event: self.scroll_by(self.visible_rows))
+        self.tree.bind('<Home>', lambda event: self.scroll_to(0))
+        self.tree.bind('<End>', lambda event: self.scroll_to(self.row_count()))
+    
+    def row_count(self):
+        return 0 if self.df is None else len(self.df)
+    
+    def show(self, df, title):
+        """Preview a new frame from its first row"""
+        self.df = df
+        # Positional column ids, frame columns may repeat or look like Tk's '#n' ids
+        column_ids = ['row'] + [f"c{i}" for i in range(len(df.columns))]
+        self.tree.configure(columns=column_ids)
+        self.tree.heading('row', text='#')
+        self.tree.column('row', width=70, stretch=False, anchor=tk.E)
+        for column_id, col in zip(column_ids[1:], df.columns):
+            self.tree.heading(column_id, text=str(col))
+            self.tree.column(column_id, width=140, stretch=False)
+        
+        separator_rows = (df.iloc[:, 0] == SEPARATOR_LABEL).to_numpy().nonzero()[0] if len(df.columns) else []
+        self.separator_row = int(separator_rows[0]) if len(separator_rows) else None
+        self.separator_btn.configure(state='normal' if self.separator_row is not None else 'disabled')
+        self.info_var.set(f"{title}: {len(df):,} rows")
+        self.scroll_to(0)
+    
+    def clamp(self, row):
+        """First row of the window that shows row, kept within the frame"""
+        return max(0, min(row, self.row_count() - self.visible_rows))
+    
+    def scroll_to(self, row):
+        self.first_row = self.clamp(row)
+        self.render()
+    
+    def scroll_by(self, rows):
+        self.scroll_to(self.first_row + rows)
+        return 'break'
+    
+    def jump_to_separator(self):
+        if self.separator_row is not None:
+            self.scroll_to(self.separator_row)
+            self.tree.selection_set(str(self.separator_row))
+    
+    def on_scrollbar(self, action, amount, unit=None):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'|'pages')"""
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * self.row_count()))
+        elif unit == 'pages':
+            self.scroll_by(int(amount) * self.visible_rows)
+        else:
+            self.scroll_by(int(amount))
+    
+    def on_mousewheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        steps = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self.scroll_by(-3 * steps)
+    
+    def on_resize(self, event):
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        visible_rows = max(1, (event.height - row_height) // row_height)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.scroll_to(self.first_row)
+    
+    def render(self):
+        """Fill the Treeview with the rows of the current window"""
+        self.tree.delete(*self.tree.get_children())
+        total = self.row_count()
+        if total:
+            window = self.df.iloc[self.first_row:self.first_row + self.visible_rows]
+            window = window.astype(object).where(window.notna(), '')
+            for position, values in enumerate(window.itertuples(index=False), self.first_row):
+                tags = ('separator',) if position == self.separator_row else ()
+                self.tree.insert('', tk.END, iid=str(position), values=[position + 1] + list(values), tags=tags)
+            self.scrollbar.set(self.first_row / total, min(1.0, (self.first_row + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
 
-# Disable SSL warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 class ExcelSorterGUI:
     def __init__(self, root):
@@ -26,12 +154,16 @@ class ExcelSorterGUI:
         # Variables
         self.selected_files = []
         self.processing = False
+        self.cancel_token = CancellationToken()
+        self.log_queue = queue.Queue()
         
         # Create GUI
         self.create_widgets()
+        self.root.after(LOG_FLUSH_MS, self._flush_log)
         
         # Center window
         self.center_window()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def center_window(self):
         """Center the window on screen"""
@@ -115,6 +247,41 @@ class ExcelSorterGUI:
         # Initially hide output options
         self.output_frame.grid_remove()
         
+        # Incremental enrichment checkbox
+        self.incremental_var = tk.BooleanVar()
+        incremental_check = ttk.Checkbutton(options_frame,
+                                            text="Fetch only new or stale websites (reuse earlier results)",
+                                            variable=self.incremental_var)
+        incremental_check.grid(row=2, column=0, sticky=tk.W, pady=(10, 0))
+        
+        # Output format (Parquet only when pyarrow is installed)
+        format_frame = ttk.Frame(options_frame)
+        format_frame.grid(row=3, column=0, sticky=tk.W, pady=(10, 0))
+        ttk.Label(format_frame, text="Output format:").grid(row=0, column=0, padx=(0, 10))
+        self.format_var = tk.StringVar(value=SAME_AS_INPUT)
+        formats = [fmt for fmt in OUTPUT_FORMATS if fmt != 'parquet' or HAS_PYARROW]
+        format_combo = ttk.Combobox(format_frame, textvariable=self.format_var, state='readonly',
+                                    values=[SAME_AS_INPUT] + formats, width=15)
+        format_combo.grid(row=0, column=1)
+        
+        # Optional fetch budget, blank means no limit
+        budget_frame = ttk.Frame(options_frame)
+        budget_frame.grid(row=4, column=0, sticky=tk.W, pady=(10, 0))
+        ttk.Label(budget_frame, text="Fetch time limit (minutes):").grid(row=0, column=0, padx=(0, 10))
+        self.time_limit_var = tk.StringVar()
+        ttk.Entry(budget_frame, textvariable=self.time_limit_var, width=8).grid(row=0, column=1, padx=(0, 20))
+        ttk.Label(budget_frame, text="Page budget:").grid(row=0, column=2, padx=(0, 10))
+        self.page_budget_var = tk.StringVar()
+        ttk.Entry(budget_frame, textvariable=self.page_budget_var, width=8).grid(row=0, column=3)
+        
+        # Worksheets read from Excel files, blank for the first sheet only
+        sheets_frame = ttk.Frame(options_frame)
+        sheets_frame.grid(row=5, column=0, sticky=tk.W, pady=(10, 0))
+        ttk.Label(sheets_frame, text="Worksheets ('all' or names separated by commas):").grid(
+            row=0, column=0, padx=(0, 10))
+        self.sheets_var = tk.StringVar(value='all')
+        ttk.Entry(sheets_frame, textvariable=self.sheets_var, width=30).grid(row=0, column=1)
+        
         # Process and Fetch Info buttons
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=3, column=0, columnspan=3, pady=20)
@@ -133,19 +300,39 @@ class ExcelSorterGUI:
                                    width=15)
         self.fetch_btn.pack(side=tk.LEFT, padx=5)
         
+        # Dry run of Fetch Website Info
+        self.estimate_btn = ttk.Button(button_frame, text="Estimate Fetch",
+                                       command=self.estimate_fetch, width=15)
+        self.estimate_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Pause and Cancel buttons for the running job
+        self.pause_btn = ttk.Button(button_frame, text="Pause", command=self.toggle_pause,
+                                    state='disabled', width=10)
+        self.pause_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn = ttk.Button(button_frame, text="Cancel", command=self.cancel_job,
+                                     state='disabled', width=10)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+        
         # Progress bar
         self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
         self.progress.grid(row=4, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
         
-        # Log/Output area
-        log_frame = ttk.LabelFrame(main_frame, text="Processing Log", padding="10")
-        log_frame.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        # Log/Output area and result preview, as tabs
+        self.notebook = ttk.Notebook(main_frame)
+        self.notebook.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        main_frame.rowconfigure(5, weight=1)
+        
+        log_frame = ttk.Frame(self.notebook, padding="10")
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
+        self.notebook.add(log_frame, text="Processing Log")
         
         self.log_text = scrolledtext.ScrolledText(log_frame, height=10, width=70)
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        self.preview = DataFramePreview(self.notebook)
+        self.notebook.add(self.preview, text="Preview")
+        
         # Status bar
         self.status_var = tk.StringVar()
         self.status_var.set("Ready")
@@ -195,10 +382,86 @@ class ExcelSorterGUI:
             self.output_frame.grid_remove()
     
     def log(self, message):
-        """Add message to log"""
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        """Add message to log (safe to call from worker threads, _flush_log shows it)"""
+        self.log_queue.put(message)
+    
+    def _flush_log(self):
+        """Move the queued log messages into the log box, reschedules itself on the Tk thread"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if messages:
+            self.log_text.insert(tk.END, ''.join(f"{message}\n" for message in messages))
+            self.log_text.see(tk.END)
+        self.root.after(LOG_FLUSH_MS, self._flush_log)
+    
+    def start_job(self):
+        """New cancellation token for a job that is starting, enables Pause/Cancel"""
+        self.cancel_token = CancellationToken()
+        self.pause_btn.configure(state='normal', text='Pause')
+        self.cancel_btn.configure(state='normal')
+        return self.cancel_token
+    
+    def end_job(self):
+        self.pause_btn.configure(state='disabled', text='Pause')
+        self.cancel_btn.configure(state='disabled')
+    
+    def finish_job(self):
+        """Re-enable the buttons once a job thread is done (scheduled on the Tk thread with root.after)"""
+        self.processing = False
+        self.process_btn.configure(state='normal', text='Process Files')
+        self.fetch_btn.configure(state='normal', text='Fetch Website Info')
+        self.estimate_btn.configure(state='normal', text='Estimate Fetch')
+        self.end_job()
+        self.progress.stop()
+        self.status_var.set("Ready")
+    
+    def toggle_pause(self):
+        """Pause or resume the running job"""
+        if self.cancel_token.paused:
+            self.cancel_token.resume()
+            self.pause_btn.configure(text='Pause')
+            self.status_var.set("Resumed")
+            self.log("Resumed")
+        else:
+            self.cancel_token.pause()
+            self.pause_btn.configure(text='Resume')
+            self.status_var.set("Paused - no new requests are sent")
+            self.log("Paused, requests already in progress will finish")
+    
+    def cancel_job(self):
+        """Stop the running job, it saves the results it has so far"""
+        self.cancel_token.cancel()
+        self.pause_btn.configure(state='disabled', text='Pause')
+        self.cancel_btn.configure(state='disabled')
+        self.status_var.set("Cancelling - finishing requests in progress...")
+        self.log("Cancelling: finishing requests in progress, then saving the results so far")
+    
+    def on_close(self):
+        """Closing while a job runs cancels it and waits until its results are saved"""
+        if not self.processing:
+            self.root.destroy()
+            return
+        if messagebox.askyesno("Job Running", "A job is still running. Cancel it and close? "
+                                              "Results collected so far are saved first."):
+            self.cancel_job()
+            self._close_when_idle()
+    
+    def _close_when_idle(self):
+        if self.processing:
+            self.root.after(200, self._close_when_idle)
+        else:
+            self.root.destroy()
+    
+    def show_preview(self, df, title):
+        """Show a result frame in the Preview tab (safe to call from worker threads)"""
+        def show():
+            self.preview.show(df, title)
+            self.notebook.select(self.preview)
+        self.root.after(0, show)
     
     def process_files(self):
         """Process selected files"""
@@ -213,12 +476,53 @@ class ExcelSorterGUI:
         self.processing = True
         self.process_btn.configure(state='disabled', text='Processing...')
         self.fetch_btn.configure(state='disabled')
+        self.estimate_btn.configure(state='disabled')
+        self.start_job()
         self.progress.start()
         
         thread = threading.Thread(target=self._process_files_thread)
         thread.daemon = True
         thread.start()
     
+    def selected_output_format(self):
+        """Output format chosen in the options, None to keep the input format"""
+        output_format = self.format_var.get()
+        return None if output_format == SAME_AS_INPUT else output_format
+    
+    def output_path_for(self, path):
+        """Output path with the extension of the chosen output format
+        
+        Without a chosen format CSV and xlsx keep their format, other Excel
+        files (e.g. .xls, which can't be written) are saved as xlsx.
+        """
+        output_format = self.selected_output_format()
+        if output_format:
+            return with_format(path, output_format)
+        if path.lower().endswith(('.csv', '.xlsx')):
+            return path
+        return with_format(path, 'xlsx')
+    
+    def make_sorter(self):
+        """ExcelSorter loading the worksheets chosen in the options
+        
+        Sheets are loaded through ExcelSorter.load_sheets, so their columns are
+        unified and each row is tagged with the sheet it came from.
+        """
+        return ExcelSorter(sheets=parse_sheet_names(self.sheets_var.get()), log_callback=self.log)
+    
+    def fetch_budget(self):
+        """(time limit in seconds, page budget) from the options, None where blank
+        
+        Raises ValueError for values that are not positive numbers.
+        """
+        time_limit = self.time_limit_var.get().strip()
+        page_budget = self.page_budget_var.get().strip()
+        time_limit = float(time_limit) * 60 if time_limit else None
+        page_budget = int(page_budget) if page_budget else None
+        if (time_limit is not None and time_limit <= 0) or (page_budget is not None and page_budget <= 0):
+            raise ValueError("limits must be positive")
+        return time_limit, page_budget
+    
     def _process_files_thread(self):
         """Thread function for processing files"""
         try:
@@ -226,16 +530,24 @@ class ExcelSorterGUI:
                 self.log("No files selected for processing")
                 return
                 
-            sorter = ExcelSorter(log_callback=self.log)
+            sorter = self.make_sorter()
+            sorter.cancel_token = self.cancel_token
             
             if len(self.selected_files) == 1 or not self.combine_var.get():
                 # Process files individually
                 success_count = 0
                 for file_path in self.selected_files:
-                    if sorter.process_single_file(file_path):
+                    if not self.cancel_token.wait_if_paused():
+                        self.log("Cancelled, remaining files were not processed")
+                        break
+                    # Written next to the input as <name>_Cleaned.<format>
+                    sorter.output_format = output_format_of(self.output_path_for(file_path))
+                    if sorter.process_single_file(file_path, output_dir=os.path.dirname(file_path)):
                         success_count += 1
                 
                 self.log(f"\nProcessing complete. Successfully processed {success_count} of {len(self.selected_files)} files.")
+                if sorter.last_result is not None:
+                    self.show_preview(sorter.last_result, os.path.basename(sorter.last_output))
                 
             else:
                 # Combine files
@@ -245,24 +557,23 @@ class ExcelSorterGUI:
                 elif not (output_file.endswith('.xlsx') or output_file.endswith('.xls') or output_file.endswith('.csv')):
                     output_file += ".xlsx"
                 
-                output_path = os.path.join(os.path.dirname(self.selected_files[0]), output_file)
+                output_path = self.output_path_for(
+                    os.path.join(os.path.dirname(self.selected_files[0]), output_file))
                 
                 if sorter.process_multiple_files(self.selected_files, output_path):
-                    self.log(f"\nSuccessfully combined and processed {len(self.selected_files)} files into: {output_path}")
+                    self.log(f"\nSuccessfully combined and processed {len(self.selected_files)} files into: {sorter.last_output}")
+                    self.show_preview(sorter.last_result, os.path.basename(sorter.last_output))
                 else:
                     self.log("\nError combining files. Please check the log for details.")
             
         except Exception as e:
             self.log(f"Error in processing thread: {str(e)}")
         finally:
-            self.processing = False
-            self.process_btn.configure(state='normal', text='Process Files')
-            self.fetch_btn.configure(state='normal')
-            self.progress.stop()
-            self.status_var.set("Ready")
+            self.root.after(0, self.finish_job)
     
-    def _fetch_website_info_thread(self, file_path):
+    def _fetch_website_info_thread(self, file_path, budget=(None, None)):
         """Thread function for fetching website information"""
+        enricher = None
         try:
             if not file_path:
                 self.log("No file selected for fetching website info")
@@ -271,34 +582,40 @@ class ExcelSorterGUI:
             self.log(f"Starting to fetch website information from: {file_path}")
             
             # Load the file
-            sorter = ExcelSorter(log_callback=self.log)
+            sorter = self.make_sorter()
+            enricher = WebsiteEnricher(log_callback=self.log)
+            enricher.cancel_token = self.cancel_token
+            enricher.time_limit, enricher.page_budget = budget
+            if self.incremental_var.get():
+                # Results are kept next to the lead files so weekly re-exports find them
+                store_path = os.path.join(os.path.dirname(file_path), ENRICHMENT_STORE_FILENAME)
+                enricher.enrichment_store = EnrichmentStore(store_path)
+                self.log(f"Incremental mode: reusing results from {store_path}")
             df = sorter.load_file(file_path)
             if df is None:
                 self.log("Error: Could not load the file")
                 return
                 
             # Check if website column exists
-            website_columns = [col for col in df.columns if 'website' in col.lower() or 'url' in col.lower()]
-            if not website_columns:
+            website_column = enricher.find_website_column(df)  # Use the first matching column
+            if website_column is None:
                 self.log("Error: No column containing 'website' or 'URL' found in the file")
                 return
                 
-            website_column = website_columns[0]  # Use the first matching column
             self.log(f"Using column '{website_column}' for website URLs")
             
             # Fetch website information
-            result_df = sorter.fetch_website_info_for_df(df, website_column)
+            result_df = enricher.fetch_website_info_for_df(df, website_column)
+            if self.cancel_token.cancelled:
+                self.log("Job cancelled, saving the results fetched so far")
             
             # Save the result
             base, ext = os.path.splitext(file_path)
-            output_path = f"{base}_With_Contact_Info{ext}"
-            
-            if file_path.endswith('.csv'):
-                result_df.to_csv(output_path, index=False)
-            else:
-                result_df.to_excel(output_path, index=False, engine='openpyxl')
+            output_path = self.output_path_for(f"{base}_With_Contact_Info{ext}")
+            output_paths = sorter.save(result_df, output_path)
                 
-            self.log(f"\nSuccessfully saved results to: {output_path}")
+            self.log(f"\nSuccessfully saved results to: {', '.join(output_paths)}")
+            self.show_preview(result_df, os.path.basename(output_paths[0]))
             self.log("\nSummary of added information:")
             self.log(f"- Email addresses: {len(result_df[result_df['Email_Addresses'] != ''])} rows")
             self.log(f"- Phone numbers: {len(result_df[result_df['Phone_Numbers'] != ''])} rows")
@@ -310,14 +627,69 @@ class ExcelSorterGUI:
                 if count > 0:
                     self.log(f"- {col.replace('_URL', '')} links: {count}")
             
+            enricher.log_fetch_summary()
+            
         except Exception as e:
             self.log(f"Error in fetch website info thread: {str(e)}")
         finally:
-            self.processing = False
-            self.process_btn.configure(state='normal')
-            self.fetch_btn.configure(state='normal', text='Fetch Website Info')
-            self.progress.stop()
-            self.status_var.set("Ready")
+            if enricher is not None and enricher.enrichment_store is not None:
+                enricher.enrichment_store.close()
+            self.root.after(0, self.finish_job)
+    
+    def _estimate_fetch_thread(self, file_path):
+        """Thread function for the fetch dry run"""
+        enricher = None
+        try:
+            enricher = WebsiteEnricher(log_callback=self.log)
+            enricher.cancel_token = self.cancel_token
+            if self.incremental_var.get():
+                store_path = os.path.join(os.path.dirname(file_path), ENRICHMENT_STORE_FILENAME)
+                if os.path.exists(store_path):
+                    enricher.enrichment_store = EnrichmentStore(store_path)
+            df = self.make_sorter().load_file(file_path)
+            if df is None:
+                self.log("Error: Could not load the file")
+                return
+            
+            website_column = enricher.find_website_column(df)
+            if website_column is None:
+                self.log("Error: No column containing 'website' or 'URL' found in the file")
+                return
+            
+            self.log(f"Estimating the cost of fetching website information for: {file_path}")
+            enricher.profile_enrichment(df, website_column)
+            
+        except Exception as e:
+            self.log(f"Error in fetch estimate thread: {str(e)}")
+        finally:
+            if enricher is not None and enricher.enrichment_store is not None:
+                enricher.enrichment_store.close()
+            self.root.after(0, self.finish_job)
+    
+    def estimate_fetch(self):
+        """Handle the Estimate Fetch button click"""
+        if not self.selected_files:
+            messagebox.showwarning("No Files", "Please select a file first.")
+            return
+        
+        if self.processing:
+            return
+        
+        if len(self.selected_files) > 1:
+            messagebox.showinfo("Info", "Please select only one file at a time for estimating a fetch.")
+            return
+        
+        self.processing = True
+        self.process_btn.configure(state='disabled')
+        self.fetch_btn.configure(state='disabled')
+        self.estimate_btn.configure(state='disabled', text='Estimating...')
+        self.start_job()
+        self.progress.start()
+        self.status_var.set("Estimating fetch cost (fetching a small sample)...")
+        
+        thread = threading.Thread(target=self._estimate_fetch_thread, args=(self.selected_files[0],))
+        thread.daemon = True
+        thread.start()
     
     def fetch_website_info(self):
         """Handle the Fetch Website Info button click"""
@@ -332,6 +704,13 @@ class ExcelSorterGUI:
             messagebox.showinfo("Info", "Please select only one file at a time for fetching website information.")
             return
             
+        try:
+            budget = self.fetch_budget()
+        except ValueError:
+            messagebox.showerror("Invalid Budget", "The time limit (minutes) and page budget must be "
+                                                   "positive numbers, or blank for no limit.")
+            return
+        
         # Confirm before proceeding
         if not messagebox.askyesno("Confirm", "This will fetch contact information from the websites in your file. "
                                            "This may take a while. Continue?"):
@@ -341,579 +720,31 @@ class ExcelSorterGUI:
         self.processing = True
         self.process_btn.configure(state='disabled')
         self.fetch_btn.configure(state='disabled', text='Fetching...')
+        self.estimate_btn.configure(state='disabled')
+        self.start_job()
         self.progress.start()
         self.status_var.set("Fetching website information...")
         
         thread = threading.Thread(
             target=self._fetch_website_info_thread,
-            args=(self.selected_files[0],)
+            args=(self.selected_files[0], budget)
         )
         thread.daemon = True
         thread.start()
 
-class ExcelSorter:
-    def __init__(self, log_callback=None):
-        self.required_columns = ['reviews', 'website', 'rating']
-        self.log = log_callback if log_callback else print
-        # Static pool of common desktop browser User-Agent strings to avoid fake-useragent dependency
-        self.USER_AGENTS = [
-            # Chrome (Windows)
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
-            # Edge (Windows)
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0',
-            # Firefox (Windows)
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0',
-            # Chrome (Mac)
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
-            # Safari (Mac)
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15',
-        ]
-        self.session = requests.Session()
-        self.session.verify = False  # Disable SSL verification
-        self.session.headers.update({
-            'User-Agent': random.choice(self.USER_AGENTS),
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
-        })
-    
-    def _is_valid_url(self, url):
-        """Check if the URL is valid"""
-        if not url or pd.isna(url) or not isinstance(url, str):
-            return False
-        return url.startswith(('http://', 'https://'))
-        
-    def extract_domain(self, url):
-        """Extract domain name from URL"""
-        if not self._is_valid_url(url):
-            return None
-        
-        try:
-            # Clean the URL
-            url = str(url).strip()
-            
-            # Add protocol if missing
-            if not url.startswith(('http://', 'https://')):
-                url = 'http://' + url
-            
-            # Parse URL
-            parsed = urlparse(url)
-            domain = parsed.netloc.lower()
-            
-            # Remove www. prefix
-            if domain.startswith('www.'):
-                domain = domain[4:]
-            
-            # Extract main domain name (before first dot)
-            domain_parts = domain.split('.')
-            if len(domain_parts) >= 2:
-                return domain_parts[0]
-            return domain
-        except Exception as e:
-            self.log(f"Error extracting domain from {url}: {str(e)}")
-            return None
-    
-    def _get_page_content(self, url, timeout=10, max_retries=2):
-        """Get page content with retries"""
-        for attempt in range(max_retries):
-            try:
-                # Rotate a realistic User-Agent for each request
-                self.session.headers['User-Agent'] = random.choice(self.USER_AGENTS)
-                response = self.session.get(url, timeout=timeout, allow_redirects=True)
-                response.raise_for_status()
-                return response.text
-            except requests.RequestException as e:
-                if attempt == max_retries - 1:
-                    self.log(f"Failed to fetch {url}: {str(e)}")
-                    return None
-                time.sleep(1)  # Wait before retry
-    
-    def _extract_emails(self, text):
-        """Extract email addresses from text"""
-        if not text:
-            return set()
-        # Improved email pattern to find more variations
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = set()
-        for match in re.finditer(email_pattern, text, re.IGNORECASE):
-            email = match.group(0).strip()
-            if '.' in email.split('@')[-1]:  # Must have a dot in the domain part
-                emails.add(email)
-        return emails
-    
-    def _extract_phone_numbers(self, text, default_region='US'):
-        """Extract and validate phone numbers from text"""
-        if not text:
-            return set()
-            
-        # First, try to find phone numbers using common patterns
-        phone_patterns = [
-            r'\+?\d{1,4}?[-.\s]?\(?\d{1,4}?\)?[-.\s]?\d{1,4}[-.\s]?\d{1,4}[-.\s]?\d{1,9}',  # International
-            r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}',  # US/Canada
-            r'\d{3}[-.\s]?\d{3}[-.\s]?\d{4}'  # US/Canada without area code
-        ]
-        
-        found_numbers = set()
-        for pattern in phone_patterns:
-            for match in re.finditer(pattern, text):
-                try:
-                    phone = match.group(0)
-                    # Clean up the phone number
-                    phone = re.sub(r'[^\d+]', '', phone)
-                    if phone.startswith('00'):
-                        phone = '+' + phone[2:]
-                    elif phone.startswith('1') and len(phone) == 11 and not phone.startswith('+1'):
-                        phone = '+1' + phone[1:]
-                    elif not phone.startswith('+'):
-                        phone = '+1' + phone  # Default to US/Canada
-                        
-                    # Parse and validate the phone number
-                    parsed = phonenumbers.parse(phone, None)
-                    if phonenumbers.is_valid_number(parsed):
-                        formatted = phonenumbers.format_number(
-                            parsed, 
-                            phonenumbers.PhoneNumberFormat.INTERNATIONAL
-                        )
-                        found_numbers.add(formatted)
-                except Exception:
-                    continue
-        
-        return found_numbers
-    
-    def _extract_social_links(self, soup, base_url):
-        """Extract social media links from the page"""
-        social_platforms = {
-            'facebook.com': 'Facebook',
-            'fb.com': 'Facebook',
-            'twitter.com': 'Twitter',
-            'x.com': 'Twitter',  # Twitter's new domain
-            'linkedin.com': 'LinkedIn',
-            'instagram.com': 'Instagram',
-            'youtube.com': 'YouTube',
-            'pinterest.com': 'Pinterest'
-        }
-        
-        social_links = {}
-        
-        # Find all links on the page
-        for a in soup.find_all('a', href=True):
-            if not a.get_text(strip=True):
-                continue  # Skip empty links
-                
-            href = a['href'].lower()
-            
-            # Check for direct social media profile links
-            for domain, platform in social_platforms.items():
-                if domain in href:
-                    full_url = urljoin(base_url, href)
-                    # Clean up the URL
-                    full_url = full_url.split('?')[0]  # Remove query parameters
-                    full_url = full_url.rstrip('/')  # Remove trailing slash
-                    social_links[platform] = full_url
-                    break
-            
-            # Check for social media icons/buttons
-            if 'social' in a.get('class', []) or 'social' in a.get('id', '').lower():
-                for domain, platform in social_platforms.items():
-                    if domain in href:
-                        full_url = urljoin(base_url, href)
-                        social_links[platform] = full_url
-                        break
-        
-        return social_links
-    
-    def _find_contact_page_links(self, soup, base_url):
-        """Find links to contact, about, or info pages"""
-        contact_links = set()
-        
-        # Common contact page patterns
-        contact_keywords = [
-            'contact', 'about', 'info', 'reach', 'connect', 'get in touch',
-            'contact us', 'about us', 'get in contact', 'find us', 'reach us'
-        ]
-        
-        # Check all links on the page
-        for a in soup.find_all('a', href=True):
-            href = a.get('href', '').lower()
-            text = a.get_text(' ', strip=True).lower()
-            
-            # Check if link text or URL contains contact keywords
-            if any(keyword in text or keyword in href for keyword in contact_keywords):
-                full_url = urljoin(base_url, href)
-                contact_links.add(full_url)
-        
-        return list(contact_links)[:3]  # Return first 3 unique contact links
-    
-    def _extract_facebook_info(self, soup, base_url):
-        """Extract information from Facebook pages"""
-        emails = set()
-        
-        try:
-            # Try to find the intro section
-            intro_section = soup.find('div', {'id': 'intro_container_id'}) or \
-                          soup.find('div', class_=re.compile(r'(?i)intro|about|bio|description'))
-            
-            if intro_section:
-                intro_text = intro_section.get_text(' ')
-                emails.update(self._extract_emails(intro_text))
-            
-            # Look for the 'About' section
-            about_links = [a['href'] for a in soup.find_all('a', href=True) 
-                         if 'about' in a.get('href', '').lower() 
-                         and 'profile.php' not in a.get('href', '')]
-            
-            if about_links:
-                about_url = urljoin(base_url, about_links[0])
-                about_content = self._get_page_content(about_url)
-                
-                if about_content:
-                    about_soup = BeautifulSoup(about_content, 'lxml')
-                    
-                    # Look for contact information sections
-                    contact_sections = about_soup.find_all(['div', 'section'], 
-                                                         class_=re.compile(r'(?i)contact|info|details'))
-                    
-                    for section in contact_sections:
-                        section_text = section.get_text(' ')
-                        emails.update(self._extract_emails(section_text))
-            
-            return emails
-            
-        except Exception as e:
-            self.log(f"Error extracting Facebook info: {str(e)}")
-            return emails
-    
-    def scrape_website_info(self, url):
-        """Scrape contact information from a website"""
-        if not self._is_valid_url(url):
-            return {'error': 'Invalid URL'}
-        
-        self.log(f"Scraping: {url}")
-        
-        try:
-            # Get the main page content
-            content = self._get_page_content(url)
-            if not content:
-                return {'error': 'Could not fetch page content'}
-                
-            soup = BeautifulSoup(content, 'lxml')
-            
-            # Extract emails and phone numbers from the main page
-            text = soup.get_text(' ')
-            emails = self._extract_emails(text)
-            phones = self._extract_phone_numbers(text)
-            
-            # Check if this is a social media profile
-            is_facebook = any(domain in url.lower() for domain in ['facebook.com', 'fb.com'])
-            is_instagram = 'instagram.com' in url.lower()
-            is_linkedin = 'linkedin.com' in url.lower()
-            
-            # Special handling for social media profiles
-            if is_facebook:
-                facebook_emails = self._extract_facebook_info(soup, url)
-                emails.update(facebook_emails)
-            elif is_instagram or is_linkedin:
-                # For Instagram and LinkedIn, look for bio/description
-                bio_section = soup.find('div', class_=re.compile(r'(?i)bio|description|about'))
-                if bio_section:
-                    bio_text = bio_section.get_text(' ')
-                    emails.update(self._extract_emails(bio_text))
-            else:
-                # For regular websites, look for contact pages
-                contact_links = self._find_contact_page_links(soup, url)
-                
-                # Check contact pages for more information
-                for contact_link in contact_links:
-                    try:
-                        contact_content = self._get_page_content(contact_link)
-                        if contact_content:
-                            contact_soup = BeautifulSoup(contact_content, 'lxml')
-                            contact_text = contact_soup.get_text(' ')
-                            
-                            # Extract emails and phones from contact page
-                            emails.update(self._extract_emails(contact_text))
-                            phones.update(self._extract_phone_numbers(contact_text))
-                            
-                            # Look for email links
-                            for a in contact_soup.find_all('a', href=True):
-                                if 'mailto:' in a['href'].lower():
-                                    email = a['href'].replace('mailto:', '').strip()
-                                    if '@' in email and '.' in email:
-                                        emails.add(email)
-                    except Exception as e:
-                        self.log(f"Error checking contact page {contact_link}: {str(e)}")
-            
-            # Extract social media links
-            social_links = self._extract_social_links(soup, url)
-            
-            # Format the results
-            result = {
-                'emails': sorted(list(emails)),
-                'phone_numbers': sorted(list(phones)),
-                'social_links': social_links,
-                'status': 'Success',
-                'website': url  # Include the website URL in the result
-            }
-            
-            return result
-            
-        except Exception as e:
-            self.log(f"Error scraping {url}: {str(e)}")
-            return {'error': str(e), 'website': url}
-
-    
-    def find_columns(self, df):
-        """Find required columns in dataframe (case insensitive)"""
-        column_mapping = {}
-        df_columns_lower = [col.lower() for col in df.columns]
-        
-        for required_col in self.required_columns:
-            found = False
-            for i, col in enumerate(df_columns_lower):
-                if required_col in col or col in required_col:
-                    column_mapping[required_col] = df.columns[i]
-                    found = True
-                    break
-            
-            if not found:
-                self.log(f"Warning: Column '{required_col}' not found in the data")
-                return None
-        
-        return column_mapping
-    
-    def process_dataframe(self, df):
-        """Process the dataframe according to requirements"""
-        # Find required columns
-        column_mapping = self.find_columns(df)
-        if not column_mapping:
-            return None
-        
-        # Create working copy
-        df_work = df.copy()
-        
-        # Rename columns for easier processing
-        website_col = column_mapping['website']
-        reviews_col = column_mapping['reviews']
-        rating_col = column_mapping['rating']
-        
-        # Convert reviews to numeric, handling errors
-        df_work[reviews_col] = pd.to_numeric(df_work[reviews_col], errors='coerce').fillna(0)
-        
-        # Step 1: Separate rows with empty websites
-        empty_website_mask = df_work[website_col].isna() | (df_work[website_col] == '') | (df_work[website_col] == 'nan')
-        empty_website_rows = df_work[empty_website_mask].copy()
-        non_empty_website_rows = df_work[~empty_website_mask].copy()
-        
-        # Step 2: Sort empty website rows by reviews (highest first)
-        empty_website_rows = empty_website_rows.sort_values(by=reviews_col, ascending=False)
-        
-        # Step 3: Process non-empty website rows for domain extraction
-        non_empty_website_rows['domain'] = non_empty_website_rows[website_col].apply(self.extract_domain)
-        
-        # Group by domain to find repeating businesses
-        domain_groups = defaultdict(list)
-        single_domain_rows = []
-        
-        for idx, row in non_empty_website_rows.iterrows():
-            domain = row['domain']
-            if domain:
-                domain_groups[domain].append(idx)
-            else:
-                single_domain_rows.append(idx)
-        
-        # Separate repeated and single domain businesses
-        repeated_businesses = []
-        single_businesses = []
-        
-        for domain, indices in domain_groups.items():
-            if len(indices) > 1:
-                # Sort repeated businesses by reviews within each domain group
-                domain_rows = non_empty_website_rows.loc[indices].sort_values(by=reviews_col, ascending=False)
-                repeated_businesses.append(domain_rows)
-            else:
-                single_businesses.extend(indices)
-        
-        # Add single domain rows
-        if single_domain_rows:
-            single_businesses.extend(single_domain_rows)
-        
-        # Get single business rows and sort by reviews
-        single_business_rows = non_empty_website_rows.loc[single_businesses].sort_values(by=reviews_col, ascending=False)
-        
-        # Step 4: Combine all data
-        result_df = pd.concat([empty_website_rows, single_business_rows], ignore_index=True)
-        
-        # Add repeated businesses section
-        if repeated_businesses:
-            # Add separator row
-            separator_row = pd.DataFrame([[''] * len(df.columns)], columns=df.columns)
-            separator_row.iloc[0, 0] = 'Repeated Businesses'
-            
-            result_df = pd.concat([result_df, separator_row], ignore_index=True)
-            
-            # Add repeated business groups
-            for domain_group in repeated_businesses:
-                domain_group_clean = domain_group.drop('domain', axis=1)
-                result_df = pd.concat([result_df, domain_group_clean], ignore_index=True)
-        
-        # Remove the temporary domain column if it exists
-        if 'domain' in result_df.columns:
-            result_df = result_df.drop('domain', axis=1)
-        
-        return result_df
-    
-    def load_file(self, file_path):
-        """Load Excel or CSV file"""
-        try:
-            if file_path.lower().endswith('.csv'):
-                return pd.read_csv(file_path)
-            else:
-                return pd.read_excel(file_path)
-        except Exception as e:
-            self.log(f"Error loading file {file_path}: {str(e)}")
-            return None
-    
-    def process_single_file(self, input_file, output_dir=None):
-        """Process a single file"""
-        try:
-            self.log(f"Processing file: {input_file}")
-            df = self.load_file(input_file)
-            if df is None:
-                return False
-                
-            # Process the dataframe
-            processed_df = self.process_dataframe(df)
-            
-            # Save the result
-            if output_dir:
-                os.makedirs(output_dir, exist_ok=True)
-                output_path = os.path.join(output_dir, f"Cleaned_{os.path.basename(input_file)}")
-            else:
-                base, ext = os.path.splitext(input_file)
-                output_path = f"{base}_Cleaned{ext}"
-                
-            if input_file.endswith('.csv'):
-                processed_df.to_csv(output_path, index=False)
-            else:
-                processed_df.to_excel(output_path, index=False, engine='openpyxl')
-                
-            self.log(f"Saved cleaned file to: {output_path}")
-            return True
-            
-        except Exception as e:
-            self.log(f"Error processing file {input_file}: {str(e)}")
-            return False
-            
-    def fetch_website_info_for_df(self, df, website_column='website'):
-        """Fetch website information for all websites in the dataframe"""
-        if website_column not in df.columns:
-            self.log(f"Error: Column '{website_column}' not found in the dataframe")
-            return df
-            
-        # Add new columns if they don't exist
-        new_columns = {
-            'Email_Addresses': [],
-            'Phone_Numbers': [],
-            'Facebook_URL': [],
-            'Instagram_URL': [],
-            'LinkedIn_URL': [],
-            'Twitter_URL': [],
-            'YouTube_URL': [],
-            'Pinterest_URL': []
-        }
-        
-        # Initialize new columns with empty values
-        for col in new_columns.keys():
-            if col not in df.columns:
-                df[col] = ''
-        
-        # Process each row
-        total_rows = len(df)
-        for idx, row in df.iterrows():
-            url = row[website_column]
-            if not self._is_valid_url(url):
-                self.log(f"Skipping invalid URL at row {idx + 2}: {url}")
-                for col in new_columns.keys():
-                    new_columns[col].append('')
-                continue
-                
-            # Scrape website info
-            result = self.scrape_website_info(url)
-            
-            # Update the row with scraped data
-            if 'error' in result:
-                self.log(f"Error processing {url}: {result['error']}")
-                for col in new_columns.keys():
-                    new_columns[col].append('')
-                continue
-                
-            # Update emails
-            emails = result.get('emails', [])
-            df.at[idx, 'Email_Addresses'] = ', '.join(emails) if emails else ''
-            
-            # Update phone numbers
-            phones = result.get('phone_numbers', [])
-            df.at[idx, 'Phone_Numbers'] = ' | '.join(phones) if phones else ''
-            
-            # Update social media links
-            social_links = result.get('social_links', {})
-            for platform, url in social_links.items():
-                col_name = f"{platform}_URL"
-                if col_name in df.columns:
-                    df.at[idx, col_name] = url
-            
-            # Log progress
-            if (idx + 1) % 5 == 0 or (idx + 1) == total_rows:
-                self.log(f"Processed {idx + 1}/{total_rows} rows")
-            
-            # Be nice to servers
-            time.sleep(1)
-        
-        return df
-    
-    def process_multiple_files(self, input_files, output_file="Combined_Cleaned.xlsx"):
-        """Process multiple files and combine into one"""
-        self.log(f"Processing {len(input_files)} files...")
-        
-        all_data = []
-        
-        for file_path in input_files:
-            self.log(f"Loading: {os.path.basename(file_path)}")
-            df = self.load_file(file_path)
-            if df is not None:
-                processed_df = self.process_dataframe(df)
-                if processed_df is not None:
-                    all_data.append(processed_df)
-                else:
-                    self.log(f"Skipping {file_path} - missing required columns")
-            else:
-                self.log(f"Skipping {file_path} - could not load")
-        
-        if not all_data:
-            self.log("No valid files to process")
-            return False
-        
-        # Combine all dataframes
-        combined_df = pd.concat(all_data, ignore_index=True)
-        
-        # Process the combined data again to handle cross-file duplicates
-        final_df = self.process_dataframe(combined_df)
-        
-        # Save combined file
-        try:
-            final_df.to_excel(output_file, index=False)
-            self.log(f"✓ Combined file saved: {output_file}")
-            return True
-        except Exception as e:
-            self.log(f"Error saving combined file: {str(e)}")
-            return False
 
 def main():
     root = tk.Tk()
     app = ExcelSorterGUI(root)
+    # Load the processing and fetching dependencies while the user picks files
+    root.after(100, preload, PRELOAD_MODULES)
+    if os.environ.get('EXCEL_SORTER_STARTUP_CHECK'):
+        # Close as soon as the window is drawn (used to time startup)
+        root.after_idle(root.destroy)
     root.mainloop()
+    # Parse workers are kept between fetch runs
+    shutdown_parse_pool()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
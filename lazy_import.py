@@ -0,0 +1,46 @@
+"""
+Deferred imports for heavy dependencies
+
+pandas, requests, bs4 and friends take most of the startup time of the
+GUI and the CLI. A module returned by lazy_import() is only imported when
+one of its attributes is first used, so the window (or --help) comes up
+without waiting for stages that may never run.
+"""
+
+import importlib
+import threading
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access"""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        # Only called for attributes not set in __init__, i.e. the module's own
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """Return a LazyModule for the module name"""
+    return LazyModule(name)
+
+
+def preload(names):
+    """Import modules in a background thread, e.g. once the window is shown"""
+    def run():
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass  # Reported when the stage that needs the module runs
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
@@ -6,19 +6,35 @@ Double-click this file to run the application
 
 import sys
 import os
+import multiprocessing
+from importlib.util import find_spec
 
 # Add current directory to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
-try:
-    from excel_sorter_gui import main
-    main()
-except ImportError as e:
-    print(f"Error importing required modules: {e}")
-    print("Please install required dependencies:")
-    print("pip install pandas openpyxl xlsxwriter")
-    input("Press Enter to exit...")
-except Exception as e:
-    print(f"Error running application: {e}")
-    input("Press Enter to exit...")
+# Imported lazily by the application, so only checked for here
+REQUIRED_MODULES = ['pandas', 'openpyxl', 'requests', 'bs4', 'lxml', 'phonenumbers']
+
+def run():
+    try:
+        missing = [name for name in REQUIRED_MODULES if find_spec(name) is None]
+        if missing:
+            raise ImportError(f"No module named {', '.join(missing)}")
+        from excel_sorter_gui import main
+        main()
+    except ImportError as e:
+        print(f"Error importing required modules: {e}")
+        print("Please install required dependencies:")
+        print("pip install -r requirements.txt")
+        input("Press Enter to exit...")
+    except Exception as e:
+        print(f"Error running application: {e}")
+        input("Press Enter to exit...")
+
+# Parse worker processes are spawned and import this script again (as
+# __mp_main__), so the window may only be opened by the main process
+if __name__ == "__main__":
+    # Needed for the parse worker processes when running as a frozen executable
+    multiprocessing.freeze_support()
+    run()
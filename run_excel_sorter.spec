@@ -1,38 +1,78 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
 
+# Imported lazily (lazy_import.py), so the analysis can't find them on its own
+lazy_modules = [
+    'pandas', 'numpy', 'openpyxl', 'xlsxwriter', 'requests', 'urllib3',
+    'bs4', 'lxml', 'lxml.etree', 'phonenumbers',
+]
+
+# Set EXCEL_SORTER_ONEDIR=1 for a one-folder build without UPX: it starts much
+# faster, because a one-file executable unpacks everything to a temporary
+# folder on every start (and UPX-compressed libraries are unpacked on load)
+onedir = os.environ.get('EXCEL_SORTER_ONEDIR') == '1'
 
 a = Analysis(
     ['run_excel_sorter.py'],
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=lazy_modules,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Optional pandas extras the application never uses
+    excludes=['matplotlib', 'scipy', 'IPython', 'jinja2', 'pytest', 'sqlalchemy', 'tables'],
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='run_excel_sorter',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-)
+if onedir:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='run_excel_sorter',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='run_excel_sorter',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='run_excel_sorter',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
@@ -0,0 +1,74 @@
+"""read_csv_fast reads the same dataframe as pd.read_csv, whole or in byte ranges"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import excel_sorter
+from excel_sorter import csv_chunk_ranges, read_csv_fast
+
+
+def lead_rows(count):
+    rows = []
+    for i in range(count):
+        # Notes span several lines and contain delimiters and escaped quotes
+        notes = '\n'.join(f'Visit {j}; said "call later", ok\tthanks' for j in range(i % 4 + 1))
+        rows.append([f'Café Müller {i}', f'https://cafe{i}.example' if i % 3 else '', i * 7, 3.5 + i % 3 / 2,
+                     notes, '€ 1.000' if i % 2 else 'Straße'])
+    return pd.DataFrame(rows, columns=['Business Name', 'Website', 'Reviews', 'Rating', 'Notes', 'Price'])
+
+
+class ReadCsvFastTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'leads.csv')
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def write(self, df, encoding, sep):
+        df.to_csv(self.path, index=False, encoding=encoding, sep=sep)
+        return pd.read_csv(self.path, encoding=encoding, sep=sep)
+    
+    def test_encodings_and_delimiters(self):
+        for encoding, sep in [('utf-16', ','), ('cp1252', ';'), ('utf-8', '\t'), ('utf-8-sig', ','),
+                              ('cp1252', '|')]:
+            with self.subTest(encoding=encoding, sep=sep):
+                expected = self.write(lead_rows(20), encoding, sep)
+                pd.testing.assert_frame_equal(read_csv_fast(self.path, workers=1), expected)
+    
+    def test_byte_ranges_match_a_single_read(self):
+        for encoding, sep in [('utf-8', ','), ('cp1252', ';'), ('utf-8-sig', '\t')]:
+            with self.subTest(encoding=encoding, sep=sep):
+                expected = self.write(lead_rows(60), encoding, sep)
+                with mock.patch.object(excel_sorter, 'CSV_PARALLEL_MIN_BYTES', 0):
+                    pd.testing.assert_frame_equal(read_csv_fast(self.path, workers=2), expected)
+    
+    def test_chunk_boundaries_move_out_of_quoted_fields(self):
+        self.write(lead_rows(60), 'utf-8', ',')
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        header_end = data.index(b'\n') + 1
+        chunks = 16
+        size = len(data)
+        targets = [header_end + (size - header_end) * i // chunks for i in range(1, chunks)]
+        # Most targets fall inside a quoted multi-line field
+        self.assertTrue(any(data[:target].count(b'"') % 2 for target in targets))
+        
+        ranges = csv_chunk_ranges(self.path, chunks, header_end)
+        self.assertEqual(ranges[0][0], header_end)
+        self.assertEqual(ranges[-1][1], size)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[start - 1:start], b'\n')
+            self.assertEqual(data[:start].count(b'"') % 2, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+"""WorkQueue transitions and job assembly against a temporary SQLite queue"""
+
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import enrichment_queue
+from enrichment import ScrapeResult
+from enrichment_queue import WorkQueue
+
+
+class WorkQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue_path = os.path.join(self.tmp.name, 'job.sqlite')
+        self.queue = WorkQueue(self.queue_path)
+        self.queue.add_items([(0, 'http://a.example'), (1, 'http://b.example'), (2, 'http://c.example')])
+    
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+    
+    def test_lease_is_exclusive_until_it_expires(self):
+        self.assertEqual(len(self.queue.lease('w1', batch_size=2, lease_seconds=600)), 2)
+        self.assertEqual([row_id for row_id, _ in self.queue.lease('w2', batch_size=5)], [2])
+        self.assertEqual(self.queue.lease('w2', batch_size=5), [])
+        
+        self.queue.conn.execute("UPDATE items SET lease_expires = ? WHERE lease_owner = 'w1'", (time.time() - 1,))
+        self.assertEqual([row_id for row_id, _ in self.queue.lease('w2', batch_size=5)], [0, 1])
+        # The stopped worker's late results are ignored
+        self.queue.complete(0, 'w1', {'emails': []})
+        self.assertEqual(self.queue.counts()['done'], 0)
+    
+    def test_complete_and_fail_transitions(self):
+        self.queue.lease('w1', batch_size=3)
+        self.queue.complete(0, 'w1', {'emails': ['a@a.example']})
+        self.queue.fail(1, 'w1', 'Read timed out')
+        self.queue.fail(2, 'w1', '404 Client Error', retryable=False)
+        self.assertEqual(self.queue.counts(), {'pending': 1, 'leased': 0, 'done': 1, 'failed': 1})
+        self.assertEqual(list(self.queue.results()), [(0, {'emails': ['a@a.example']})])
+    
+    def test_retryable_errors_fail_after_max_attempts(self):
+        for attempt in range(3):
+            self.assertEqual([row_id for row_id, _ in self.queue.lease('w1', batch_size=1)], [0])
+            self.queue.fail(0, 'w1', 'Read timed out', max_attempts=3)
+        self.assertEqual(self.queue.counts()['failed'], 1)
+
+
+class JobTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, 'leads.csv')
+        self.queue_path = os.path.join(self.tmp.name, 'job.sqlite')
+        pd.DataFrame({
+            'Name': ['A', 'B', 'C', 'D'],
+            'Website': ['http://a.example', '', 'http://c.example', 'http://d.example'],
+        }).to_csv(self.source, index=False)
+        self.assertTrue(enrichment_queue.create_job(self.source, self.queue_path))
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_worker_survives_errors_and_job_assembles(self):
+        def scrape(enricher, url):
+            if url == 'http://c.example':
+                raise RuntimeError('parser crashed')
+            if url == 'http://d.example':
+                return ScrapeResult(url, error='Could not fetch page content')
+            return ScrapeResult(url, ['info@a.example'], ['+1 512-555-0100'])
+        
+        with mock.patch.object(enrichment_queue.WebsiteEnricher, 'scrape_website_info', scrape):
+            self.assertEqual(enrichment_queue.run_worker(self.queue_path, threads=2), 1)
+        
+        queue = WorkQueue(self.queue_path)
+        self.assertEqual(queue.counts(), {'pending': 0, 'leased': 0, 'done': 1, 'failed': 2})
+        # The crashed row went back to the queue until max_attempts, the final error failed at once
+        attempts = dict(queue.conn.execute('SELECT url, attempts FROM items').fetchall())
+        self.assertEqual(attempts['http://c.example'], 3)
+        self.assertEqual(attempts['http://d.example'], 1)
+        queue.close()
+        
+        output = os.path.join(self.tmp.name, 'leads_enriched.csv')
+        self.assertTrue(enrichment_queue.assemble_job(self.queue_path, output))
+        df = pd.read_csv(output, keep_default_na=False)
+        self.assertEqual(len(df), 4)
+        self.assertEqual(df.loc[0, 'Email_Addresses'], 'info@a.example')
+        self.assertEqual(df.loc[2, 'Email_Addresses'], '')
+    
+    def test_worker_waits_for_leases_of_other_workers(self):
+        queue = WorkQueue(self.queue_path)
+        queue.lease('other', batch_size=3, lease_seconds=0.3)
+        queue.close()
+        
+        scrape = lambda enricher, url: ScrapeResult(url, ['info@example.com'])
+        with mock.patch.object(enrichment_queue.WebsiteEnricher, 'scrape_website_info', scrape):
+            # The other worker never reports back, its rows are leased again once the lease expires
+            self.assertEqual(enrichment_queue.run_worker(self.queue_path, poll_seconds=0.1), 3)
+    
+    def test_default_output_is_written_as_xlsx(self):
+        # An .xls source can't be written back, the enriched copy becomes xlsx
+        queue = WorkQueue(self.queue_path)
+        queue.set_meta('source_file', os.path.join(self.tmp.name, 'leads.xls'))
+        queue.close()
+        with mock.patch.object(enrichment_queue.ExcelSorter, 'load_file', return_value=pd.read_csv(self.source)), \
+                mock.patch.object(enrichment_queue, 'save_output', return_value=['saved']) as save:
+            self.assertTrue(enrichment_queue.assemble_job(self.queue_path))
+        self.assertEqual(save.call_args[0][1], os.path.join(self.tmp.name, 'leads_With_Contact_Info.xlsx'))
+
+
+class CountingSiteHandler(http.server.BaseHTTPRequestHandler):
+    """Home pages listing an email address, counting the requests for each"""
+    protocol_version = 'HTTP/1.1'
+    hits = Counter()
+    hits_lock = threading.Lock()
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_GET(self):
+        with self.hits_lock:
+            self.hits[self.path] += 1
+        body = f'<html><body><a href="mailto:info{self.path.strip("/")}@example.com">Mail</a></body></html>'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class WorkerProcessesTest(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), CountingSiteHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        CountingSiteHandler.hits.clear()
+        
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, 'leads.csv')
+        self.queue_path = os.path.join(self.tmp.name, 'job.sqlite')
+        host = f"127.0.0.1:{self.server.server_address[1]}"
+        pd.DataFrame({
+            'Name': [f'Lead {i}' for i in range(12)],
+            'Website': [f'http://{host}/site{i}' for i in range(12)],
+        }).to_csv(self.source, index=False)
+        self.assertTrue(enrichment_queue.create_job(self.source, self.queue_path))
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+    
+    def test_each_row_is_scraped_once_by_concurrent_processes(self):
+        # The local server stands in for the websites, so the worker processes
+        # need no patching whichever way they are started
+        self.assertTrue(enrichment_queue.run_workers(self.queue_path, processes=3, threads=2, batch_size=1,
+                                                     requests_per_second=0, poll_seconds=0.1))
+        
+        self.assertEqual(CountingSiteHandler.hits, Counter({f'/site{i}': 1 for i in range(12)}))
+        queue = WorkQueue(self.queue_path)
+        self.assertEqual(queue.counts(), {'pending': 0, 'leased': 0, 'done': 12, 'failed': 0})
+        self.assertEqual(queue.conn.execute('SELECT MAX(attempts) FROM items').fetchone()[0], 1)
+        results = dict(queue.results())
+        queue.close()
+        self.assertEqual(sorted(results), list(range(12)))
+        self.assertEqual(results[5]['emails'], ['infosite5@example.com'])
+
+
+if __name__ == '__main__':
+    unittest.main()
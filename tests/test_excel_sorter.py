@@ -0,0 +1,375 @@
+"""Sorting, grouping and scoring of lead dataframes"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import excel_sorter
+from excel_sorter import (DEFAULT_SCORE_WEIGHTS, SCORE_COLUMN, SEPARATOR_LABEL, SHEET_COLUMN, ExcelSorter,
+                          FuzzyDeduplicator, load_column_aliases, load_score_weights, parse_sheet_names,
+                          positive_int, unify_columns)
+
+
+def leads(rows):
+    return pd.DataFrame(rows, columns=['Business Name', 'Website', 'Reviews', 'Rating'])
+
+
+class LowMemoryTest(unittest.TestCase):
+    def test_values_are_written_as_read(self):
+        df = leads([
+            ['Alpha', '', 12, 1.249576],
+            ['Beta', 'https://beta.example', 7, 4.2],
+            ['Gamma', 'https://gamma.example', 3.5, 4.123456789],
+        ])
+        normal = ExcelSorter().process_dataframe(df)
+        compact = ExcelSorter(low_memory=True).process_dataframe(df)
+        
+        self.assertEqual(list(compact['Rating']), [1.249576, 4.2, 4.123456789])
+        self.assertEqual(list(compact['Reviews']), [12, 7, 3.5])
+        pd.testing.assert_frame_equal(compact, normal, check_dtype=False)
+
+
+
+class LeadScoreTest(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Business Name': ['Alpha', 'Alpha Downtown', 'Beta'],
+            'Website': ['https://a.example', 'https://www.a.example/contact', 'https://b.example'],
+            'Reviews': [0, 99, 9],
+            'Rating': [5, 2.5, None],
+            'Email': ['info@a.example', '', ''],
+            'Phone': ['', '512-555-0100', None],
+        })
+        self.tmp = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def scores(self, weights):
+        result = ExcelSorter(score_weights=weights).process_dataframe(self.df)
+        result = result[result['Business Name'] != SEPARATOR_LABEL]
+        return dict(zip(result['Business Name'], result[SCORE_COLUMN]))
+    
+    def config(self, config):
+        config_file = os.path.join(self.tmp.name, 'weights.json')
+        with open(config_file, 'w', encoding='utf-8') as f:
+            f.write(config if isinstance(config, str) else json.dumps(config))
+        return config_file
+    
+    def test_score_formula(self):
+        # reviews log1p(r) / log1p(99): 0, 1, 0.5; rating / 5: 1, 0.5, 0 (missing);
+        # contact share of email and phone: 0.5, 0.5, 0; group size log2: 1, 1, 0
+        self.assertEqual(self.scores(DEFAULT_SCORE_WEIGHTS), {
+            'Alpha': round(0.5 + 0.3 * 0.5 + 0.2, 4),
+            'Alpha Downtown': round(1.0 + 0.5 * 0.5 + 0.3 * 0.5 + 0.2, 4),
+            'Beta': 0.5,
+        })
+    
+    def test_rows_are_ranked_by_score(self):
+        result = ExcelSorter(score_weights=DEFAULT_SCORE_WEIGHTS).process_dataframe(self.df)
+        self.assertEqual(list(result['Business Name']), ['Beta', SEPARATOR_LABEL, 'Alpha Downtown', 'Alpha'])
+    
+    def test_partial_override_keeps_the_other_defaults(self):
+        weights = load_score_weights(self.config({'rating': 2, 'group_size': 0}))
+        self.assertEqual(weights, {'reviews': 1.0, 'rating': 2.0, 'contact': 0.3, 'group_size': 0.0})
+        self.assertEqual(self.scores(weights)['Alpha'], round(2.0 + 0.3 * 0.5, 4))
+        self.assertEqual(load_score_weights(), DEFAULT_SCORE_WEIGHTS)
+    
+    def test_invalid_weights_are_rejected(self):
+        for config in ({'reviewz': 1}, {'rating': '2'}, {'rating': True}, {'rating': None}, [1, 2],
+                       '{"rating": NaN}', '{"rating": Infinity}'):
+            with self.subTest(config=config):
+                with self.assertRaises(ValueError):
+                    load_score_weights(self.config(config))
+
+
+class PhoneColumnTest(unittest.TestCase):
+    def phone_column(self, columns):
+        df = pd.DataFrame(columns=columns)
+        return ExcelSorter().find_optional_column(df, excel_sorter.PHONE_COLUMN_KEYWORDS)
+    
+    def test_tel_is_matched_as_a_word(self):
+        self.assertIsNone(self.phone_column(['Hotel Name', 'Website', 'Intel Score', 'Hostel']))
+        for header in ('Tel', 'TEL.', 'Tel_No', 'Tel Number', 'Fax/Tel'):
+            with self.subTest(header=header):
+                self.assertEqual(self.phone_column(['Hotel Name', header]), header)
+    
+    def test_phone_is_matched_anywhere(self):
+        self.assertEqual(self.phone_column(['Hotel Name', 'Telephone']), 'Telephone')
+        self.assertEqual(self.phone_column(['Tel', 'Phone_Number']), 'Phone_Number')
+
+
+class TopNTest(unittest.TestCase):
+    """Top-N selections match a full sort followed by head, ties included"""
+    
+    def setUp(self):
+        # Few distinct review counts, so most rows tie with others
+        rng = np.random.default_rng(3)
+        count = 300
+        self.df = leads([
+            [f'Business {i}', '' if i % 5 == 0 else f'https://site{rng.integers(0, 150)}.example/p{i}',
+             int(rng.integers(0, 6)), float(rng.integers(1, 6))]
+            for i in range(count)
+        ])
+    
+    def process(self, **options):
+        return ExcelSorter(**options).process_dataframe(self.df).reset_index(drop=True)
+    
+    def repeated_groups(self, result):
+        """Rows of the repeated section split into groups (lists of business names)"""
+        repeated = result.iloc[1:]
+        domains = repeated['Website'].str.extract(r'//([^/]+)/')[0]
+        return [list(group['Business Name']) for _, group in repeated.groupby(domains, sort=False)]
+    
+    def test_top_n_matches_sorted_head(self):
+        for low_memory in (False, True):
+            for section in ('empty', 'single'):
+                full = self.process(sections=(section,), low_memory=low_memory)
+                for top_n in (1, 5, 17, 1000):
+                    with self.subTest(low_memory=low_memory, section=section, top_n=top_n):
+                        top = self.process(sections=(section,), low_memory=low_memory, top_n=top_n)
+                        pd.testing.assert_frame_equal(top, full.head(top_n))
+    
+    def test_group_top_matches_sorted_head_of_each_group(self):
+        full_groups = self.repeated_groups(self.process(sections=('repeated',)))
+        for group_top_n in (1, 2, 3):
+            with self.subTest(group_top_n=group_top_n):
+                groups = self.repeated_groups(self.process(sections=('repeated',), group_top_n=group_top_n))
+                self.assertEqual(groups, [group[:group_top_n] for group in full_groups])
+    
+    def test_top_groups_keeps_the_best_groups_in_order(self):
+        full = self.process(sections=('repeated',))
+        full_groups = self.repeated_groups(full)
+        reviews = dict(zip(full['Business Name'], full['Reviews']))
+        best = [reviews[group[0]] for group in full_groups]
+        for top_groups in (1, 4, 10):
+            with self.subTest(top_groups=top_groups):
+                # Highest best row first, earlier groups first among ties
+                ranked = sorted(range(len(full_groups)), key=lambda g: -best[g])[:top_groups]
+                groups = self.repeated_groups(self.process(sections=('repeated',), top_groups=top_groups))
+                self.assertEqual(groups, [full_groups[g] for g in sorted(ranked)])
+    
+    def test_counts_must_be_positive(self):
+        self.assertEqual(positive_int('3'), 3)
+        for value in ('0', '-2', 'abc', '1.5'):
+            with self.subTest(value=value):
+                with self.assertRaises(argparse.ArgumentTypeError):
+                    positive_int(value)
+
+
+class FuzzyDeduplicatorTest(unittest.TestCase):
+    def group_ids(self, rows, addresses=None):
+        """Group ids of (domain, phone, business name) rows, keys normalized like fuzzy_group_keys"""
+        sorter = ExcelSorter()
+        domains = [domain for domain, _, _ in rows]
+        phones = [sorter.normalize_phone(phone) for _, phone, _ in rows]
+        names = [sorter.normalize_name(name) for _, _, name in rows]
+        if addresses is not None:
+            addresses = [sorter.normalize_name(address) for address in addresses]
+        return FuzzyDeduplicator().group_ids(domains, phones, names, addresses)
+    
+    def test_same_phone_links_different_names(self):
+        groups = self.group_ids([
+            (None, '(512) 555-0100', 'Acme Roofing'),
+            (None, '512.555.0100', 'Lone Star Roof Repair'),
+            (None, '512-555-0199', 'Hill Country Gutters'),
+        ])
+        self.assertEqual(groups[0], groups[1])
+        self.assertNotEqual(groups[0], groups[2])
+    
+    def test_similar_names_without_addresses(self):
+        groups = self.group_ids([
+            (None, None, 'Green Valley Dental'),
+            (None, None, 'Green Valley Dental Care'),
+            (None, None, 'Smith Plumbing Co'),
+            (None, None, 'Smith Plumbing'),
+            (None, None, 'Riverside Bakery'),
+        ])
+        self.assertEqual(groups[0], groups[1])
+        self.assertEqual(groups[2], groups[3])
+        self.assertEqual(len(set(groups)), 3)
+    
+    def test_similar_names_at_the_same_address(self):
+        groups = self.group_ids([
+            (None, None, 'Green Valley Dental'),
+            (None, None, 'Green Valley Dental Care'),
+        ], addresses=['12 Main Street, Austin TX', '12 Main St, Austin TX'])
+        self.assertEqual(groups[0], groups[1])
+    
+    def test_similar_names_at_different_addresses_stay_separate(self):
+        groups = self.group_ids([
+            (None, None, 'Green Valley Dental'),
+            (None, None, 'Green Valley Dental Care'),
+        ], addresses=['12 Main Street, Austin TX', '900 Elm Avenue, Dallas TX'])
+        self.assertNotEqual(groups[0], groups[1])
+    
+    def test_links_merge_transitively(self):
+        # 0-1 share a domain, 1-2 a phone number and 2-3 a similar name
+        groups = self.group_ids([
+            ('acme.example', None, 'Acme Roofing'),
+            ('acme.example', '512-555-0100', 'Acme Roofing Austin'),
+            (None, '(512) 555-0100', 'Lone Star Roof Repair'),
+            (None, None, 'Lone Star Roof Repairs'),
+            ('other.example', '512-555-0199', 'Hill Country Gutters'),
+        ])
+        self.assertEqual(len({groups[0], groups[1], groups[2], groups[3]}), 1)
+        self.assertNotEqual(groups[0], groups[4])
+        # Every row points at the lowest row of its group
+        self.assertEqual(groups, [0, 0, 0, 0, 4])
+    
+    def test_fuzzy_groups_in_the_output(self):
+        df = pd.DataFrame({
+            'Business Name': ['Acme Roofing', 'Riverside Bakery', 'Acme Roofing LLC', 'Hill Country Gutters'],
+            'Website': ['https://acme.example', '', 'https://acmeroofs.example', ''],
+            'Phone': ['512-555-0100', '', '', '512-555-0100'],
+            'Reviews': [10, 5, 20, 1],
+            'Rating': [4.5, 4.0, 4.1, 3.0],
+        })
+        result = ExcelSorter(fuzzy_dedup=True).process_dataframe(df)
+        separator = result.index[result['Business Name'] == SEPARATOR_LABEL][0]
+        self.assertEqual(list(result['Business Name'][:separator]), ['Riverside Bakery'])
+        self.assertEqual(list(result['Business Name'][separator + 1:]),
+                         ['Acme Roofing LLC', 'Acme Roofing', 'Hill Country Gutters'])
+
+
+class UnifyColumnsTest(unittest.TestCase):
+    def test_aliases_are_renamed(self):
+        df = unify_columns(pd.DataFrame({
+            'Company_Name': ['Alpha'], 'Homepage': ['https://alpha.example'], 'TELEPHONE': ['512'],
+            'full-address': ['12 Main St'], 'Number of Reviews': [3], 'Star Rating': [4.5], 'Notes': ['x'],
+        }))
+        self.assertEqual(list(df.columns),
+                         ['Business Name', 'Website', 'Phone', 'Address', 'Reviews', 'Rating', 'Notes'])
+    
+    def test_required_columns_fall_back_to_find_columns_rule(self):
+        df = unify_columns(pd.DataFrame({'Shop': ['Alpha'], 'Google Reviews': [3], 'Website Link': ['a'],
+                                         'Avg Rating': [4.5]}))
+        self.assertEqual(list(df.columns), ['Shop', 'Reviews', 'Website', 'Rating'])
+    
+    def test_reviews_and_ratings_become_numbers(self):
+        df = unify_columns(pd.DataFrame({'Name': ['a', 'b', 'c'], 'Reviews': ['12', '', None],
+                                         'Rating': [' 4.5', '3', None]}))
+        self.assertTrue(pd.api.types.is_numeric_dtype(df['Reviews']))
+        self.assertEqual(df['Reviews'].iloc[0], 12)
+        self.assertTrue(df['Reviews'].iloc[1:].isna().all())
+        self.assertEqual(list(df['Rating'].iloc[:2]), [4.5, 3])
+    
+    def test_text_that_is_not_a_number_is_kept(self):
+        df = unify_columns(pd.DataFrame({'Name': ['a', 'b'], 'Reviews': ['12', '3'],
+                                         'Rating': ['4.5 stars', '4']}))
+        self.assertTrue(pd.api.types.is_numeric_dtype(df['Reviews']))
+        self.assertEqual(list(df['Rating']), ['4.5 stars', '4'])
+    
+    def test_first_alias_wins_when_several_columns_match(self):
+        # Both phone columns map to Phone: the better alias wins, whatever the column order
+        df = unify_columns(pd.DataFrame({'Tel': ['1'], 'Phone Number': ['2'], 'Company': ['x'], 'Name': ['y']}))
+        self.assertEqual(list(df.columns), ['Tel', 'Phone', 'Company', 'Business Name'])
+        self.assertEqual(df['Phone'].iloc[0], '2')
+        
+        # A column already named like the canonical column it lost to makes way
+        df = unify_columns(pd.DataFrame({'phone': ['1'], 'Phone': ['2'], 'Website': ['a']}))
+        self.assertEqual(list(df.columns), ['Phone', 'Phone_Original', 'Website'])
+        self.assertEqual(df['Phone'].iloc[0], '1')
+    
+    def test_tel_only_matches_a_whole_header(self):
+        df = unify_columns(pd.DataFrame({'Hotel Name': ['x'], 'Website': ['a'], 'Tel': ['1']}))
+        self.assertEqual(list(df.columns), ['Hotel Name', 'Website', 'Phone'])
+        df = unify_columns(pd.DataFrame({'Hotel Name': ['x'], 'Motel Tel Number': ['1']}))
+        self.assertNotIn('Phone', df.columns)
+    
+    def test_custom_aliases(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config_file = os.path.join(tmp, 'aliases.json')
+            with open(config_file, 'w', encoding='utf-8') as f:
+                json.dump({'Reviews': ['Bewertungen'], 'Website': ['Webseite'], 'Category': ['Branche']}, f)
+            aliases = load_column_aliases(config_file)
+        
+        self.assertEqual(aliases['Reviews'][0], 'Bewertungen')
+        self.assertIn('review count', aliases['Reviews'])
+        self.assertEqual(aliases['Category'], ['Branche'])
+        df = unify_columns(pd.DataFrame({'Firma': ['x'], 'Webseite': ['a'], 'Bewertungen': ['5'],
+                                         'Branche': ['Cafe'], 'Rating': [4]}), aliases)
+        self.assertEqual(list(df.columns), ['Firma', 'Website', 'Reviews', 'Category', 'Rating'])
+        self.assertEqual(df['Reviews'].iloc[0], 5)
+    
+    def test_invalid_alias_config(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config_file = os.path.join(tmp, 'aliases.json')
+            for config in (['Reviews'], {'Reviews': 'Bewertungen'}, {'Reviews': ['Bewertungen', 3]}):
+                with self.subTest(config=config):
+                    with open(config_file, 'w', encoding='utf-8') as f:
+                        json.dump(config, f)
+                    with self.assertRaises(ValueError):
+                        load_column_aliases(config_file)
+    
+    def test_defaults_without_config(self):
+        aliases = load_column_aliases()
+        aliases['Phone'].append('mobile')
+        self.assertNotIn('mobile', load_column_aliases()['Phone'])
+
+
+class SheetLoadingTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.workbook = os.path.join(self.tmp.name, 'city_leads.xlsx')
+        with pd.ExcelWriter(self.workbook) as writer:
+            leads([['Alpha', 'https://alpha.example', 12, 4.5],
+                   ['Beta', '', 3, 4.0]]).to_excel(writer, sheet_name='Austin', index=False)
+            pd.DataFrame({'Company': ['Gamma'], 'URL': ['https://gamma.example'], 'Review Count': ['7'],
+                          'Stars': ['3.5']}).to_excel(writer, sheet_name='Dallas', index=False)
+            pd.DataFrame({'Note': ['call back on Monday']}).to_excel(writer, sheet_name='Notes', index=False)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def load(self, sheets):
+        messages = []
+        df = ExcelSorter(sheets=sheets, log_callback=messages.append).load_file(self.workbook)
+        return df, messages
+    
+    def test_all_sheets_are_unified_and_tagged(self):
+        df, messages = self.load('all')
+        self.assertEqual(list(df[SHEET_COLUMN]), ['Austin', 'Austin', 'Dallas'])
+        self.assertEqual(list(df['Business Name']), ['Alpha', 'Beta', 'Gamma'])
+        self.assertEqual(list(df['Website'].fillna('')), ['https://alpha.example', '', 'https://gamma.example'])
+        self.assertEqual(list(df['Reviews']), [12, 3, 7])
+        self.assertEqual(list(df['Rating']), [4.5, 4.0, 3.5])
+        self.assertIn("Skipping sheet 'Notes' - missing required columns", messages)
+    
+    def test_sheets_are_read_in_parallel_in_workbook_order(self):
+        with mock.patch('excel_sorter.os.cpu_count', return_value=2):
+            df, _ = self.load('all')
+        self.assertEqual(list(df[SHEET_COLUMN]), ['Austin', 'Austin', 'Dallas'])
+        self.assertEqual(list(df['Business Name']), ['Alpha', 'Beta', 'Gamma'])
+    
+    def test_selected_sheets(self):
+        df, messages = self.load(['Dallas', 'Houston'])
+        self.assertEqual(list(df[SHEET_COLUMN]), ['Dallas'])
+        self.assertTrue(any('Houston' in message for message in messages))
+        
+        df, messages = self.load(['Notes'])
+        self.assertIsNone(df)
+    
+    def test_first_sheet_by_default(self):
+        df, _ = self.load(None)
+        self.assertEqual(list(df['Business Name']), ['Alpha', 'Beta'])
+        self.assertNotIn(SHEET_COLUMN, df.columns)
+    
+    def test_parse_sheet_names(self):
+        self.assertIsNone(parse_sheet_names(''))
+        self.assertIsNone(parse_sheet_names(' , '))
+        self.assertEqual(parse_sheet_names(' ALL '), 'all')
+        self.assertEqual(parse_sheet_names('Austin, Dallas ,'), ['Austin', 'Dallas'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""Download error handling of the enrichment fetcher against a local server"""
+
+import http.server
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+
+import requests
+import urllib3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enrichment import WebsiteEnricher, permanent_connection_error
+
+
+class StallingHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_GET(self):
+        if self.path == '/reset':
+            # Nothing at all, the connection is closed before the status line
+            self.close_connection = True
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', '100000')
+        self.end_headers()
+        if self.path == '/stall':
+            # Part of the body, then nothing
+            self.wfile.write(b'<p>' + b'a' * 1000)
+            self.wfile.flush()
+            time.sleep(3)
+        elif self.path == '/drop':
+            # Part of the body, then the connection is closed
+            self.wfile.write(b'<p>' + b'a' * 1000)
+            self.wfile.flush()
+            self.close_connection = True
+        elif self.path == '/trickle':
+            # One byte at a time, never reaching the read timeout
+            try:
+                for _ in range(200):
+                    self.wfile.write(b'a')
+                    self.wfile.flush()
+                    time.sleep(0.05)
+            except OSError:
+                pass
+
+
+class FetchErrorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StallingHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.host = f"127.0.0.1:{cls.server.server_address[1]}"
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+    
+    def make_enricher(self):
+        enricher = WebsiteEnricher(log_callback=lambda message: None, requests_per_second=0, parse_workers=0)
+        enricher.backoff_base = 0.01
+        return enricher
+    
+    def test_stalled_body_is_a_retryable_host_failure(self):
+        enricher = self.make_enricher()
+        self.assertIsNone(enricher._fetch_page_bytes(f"http://{self.host}/stall", timeout=0.5))
+        self.assertEqual(enricher.fetch_stats['requests'], 2)
+        self.assertEqual(enricher.fetch_stats['retries'], 1)
+        self.assertEqual(enricher.fetch_stats['wasted_attempts'], 2)
+        self.assertEqual(enricher.circuit_breaker._failures[self.host], 2)
+    
+    def test_dropped_connection_is_a_retryable_host_failure(self):
+        enricher = self.make_enricher()
+        self.assertIsNone(enricher._fetch_page_bytes(f"http://{self.host}/drop", timeout=2))
+        self.assertEqual(enricher.fetch_stats['wasted_attempts'], 2)
+        self.assertEqual(enricher.circuit_breaker._failures[self.host], 2)
+    
+    def test_closed_connection_is_retried(self):
+        enricher = self.make_enricher()
+        self.assertIsNone(enricher._fetch_page_bytes(f"http://{self.host}/reset", timeout=2))
+        self.assertEqual(enricher.fetch_stats['requests'], 2)
+        self.assertEqual(enricher.fetch_stats['retries'], 1)
+        self.assertTrue(enricher.last_fetch_retryable())
+    
+    def test_refused_connection_is_not_retried(self):
+        probe = socket.socket()
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+        probe.close()
+        enricher = self.make_enricher()
+        self.assertIsNone(enricher._fetch_page_bytes(f"http://127.0.0.1:{port}/", timeout=2))
+        self.assertEqual(enricher.fetch_stats['requests'], 1)
+        self.assertEqual(enricher.fetch_stats['non_retryable_errors'], 1)
+        self.assertFalse(enricher.last_fetch_retryable())
+    
+    def test_only_dns_failures_and_refusals_are_permanent(self):
+        def wrapped(cause):
+            # The chain requests builds: ConnectionError(MaxRetryError(reason=NewConnectionError))
+            try:
+                raise urllib3.exceptions.NewConnectionError(None, 'failed') from cause
+            except urllib3.exceptions.NewConnectionError as reason:
+                return requests.ConnectionError(urllib3.exceptions.MaxRetryError(None, '/', reason))
+        
+        unknown_host = socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+        self.assertTrue(permanent_connection_error(wrapped(unknown_host)))
+        self.assertTrue(permanent_connection_error(wrapped(ConnectionRefusedError(111, 'refused'))))
+        dns_busy = socket.gaierror(socket.EAI_AGAIN, 'Temporary failure in name resolution')
+        self.assertFalse(permanent_connection_error(wrapped(dns_busy)))
+        self.assertFalse(permanent_connection_error(wrapped(ConnectionResetError(104, 'reset'))))
+        self.assertFalse(permanent_connection_error(requests.ConnectionError('Connection aborted')))
+    
+    def test_trickling_body_stops_at_download_deadline(self):
+        enricher = self.make_enricher()
+        enricher.max_download_seconds = 0.5
+        started = time.monotonic()
+        page = enricher._fetch_page_bytes(f"http://{self.host}/trickle", timeout=5)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertIsNotNone(page)
+        self.assertGreater(len(page[0]), 0)
+        self.assertEqual(enricher.fetch_stats['truncated_responses'], 1)
+        self.assertEqual(enricher.fetch_stats['wasted_attempts'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
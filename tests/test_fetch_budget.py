@@ -0,0 +1,73 @@
+"""The page budget of a budgeted fetch is a hard cap on the requests sent"""
+
+import http.server
+import os
+import sys
+import threading
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enrichment import FETCH_STATUS_COLUMN, NOT_REACHED_STATUS, WebsiteEnricher
+
+
+class SiteHandler(http.server.BaseHTTPRequestHandler):
+    """Home pages linking to contact pages, none of which list an email address"""
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_GET(self):
+        if self.path.endswith('/'):
+            body = ''.join(f'<a href="{self.path}{page}">{page}</a>' for page in ('contact', 'about', 'impressum'))
+        else:
+            body = '<p>Nothing here</p>'
+        body = f'<html><body>{body}</body></html>'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PageBudgetTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+    
+    def fetch(self, page_budget, rows=30):
+        df = pd.DataFrame({
+            'Website': [f"{self.base}/site{i}/" for i in range(rows)],
+            'Reviews': list(range(rows)),
+        })
+        enricher = WebsiteEnricher(log_callback=lambda message: None, requests_per_second=0,
+                                   max_workers=4, parse_workers=0)
+        enricher.page_budget = page_budget
+        return enricher, enricher.fetch_website_info_for_df(df, 'Website')
+    
+    def test_requests_never_exceed_the_budget(self):
+        for page_budget in (1, 3, 12, 25):
+            enricher, result = self.fetch(page_budget)
+            self.assertLessEqual(enricher.fetch_stats['requests'], page_budget)
+            self.assertGreater(enricher.fetch_stats['requests'], 0)
+            # Every row is either fetched or marked as not reached
+            self.assertGreater((result[FETCH_STATUS_COLUMN] == NOT_REACHED_STATUS).sum(), 0)
+    
+    def test_budget_is_released_after_the_run(self):
+        enricher, _ = self.fetch(2)
+        enricher.page_budget = None
+        self.assertIsNotNone(enricher._fetch_page_bytes(f"{self.base}/site0/"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+"""Watch mode: settle delay, reprocessing of changed files and state kept across restarts"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_sorter import WATCH_STATE_FILE, FolderWatcher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeSorter:
+    """Records the files it is given, failing the ones listed in fail"""
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+        self.last_row_count = 10
+    
+    def process_single_file(self, path, output_dir):
+        self.calls.append(path)
+        return path not in self.fail
+
+
+class FolderWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output_dir = self.tmp.name
+        self.clock = FakeClock()
+        # The watched folder only exists as the file versions scan() reports
+        self.files = {}
+        # Only excel_sorter sees the fake clock, other threads keep the real one
+        fake_time = mock.Mock(wraps=time, monotonic=self.clock.monotonic, sleep=self.clock.sleep)
+        for target, fake in (('excel_sorter.time', fake_time),
+                             ('excel_sorter.FolderWatcher.scan', lambda watcher: dict(self.files)),
+                             ('excel_sorter.FolderWatcher.can_open', lambda watcher, path: True),
+                             ('sys.stdout', io.StringIO())):
+            patcher = mock.patch(target, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def watcher(self, sorter=None, settle=10):
+        return FolderWatcher(sorter or FakeSorter(), '/watched', self.output_dir, interval=5, settle=settle)
+    
+    def poll(self, watcher, after=0):
+        """Process the files that are ready `after` seconds from now"""
+        self.clock.sleep(after)
+        ready = watcher.ready_files()
+        for path in ready:
+            watcher.process(path)
+        return ready
+    
+    def test_files_wait_until_they_stop_changing(self):
+        watcher = self.watcher()
+        self.files['/watched/a.csv'] = [100, 1]
+        self.assertEqual(self.poll(watcher), [])
+        self.assertEqual(self.poll(watcher, after=9), [])
+        
+        # Still being written: the settle delay starts again
+        self.files['/watched/a.csv'] = [200, 2]
+        self.assertEqual(self.poll(watcher, after=1), [])
+        self.assertEqual(self.poll(watcher, after=9), [])
+        self.assertEqual(self.poll(watcher, after=1), ['/watched/a.csv'])
+        self.assertEqual(self.poll(watcher, after=20), [])
+    
+    def test_empty_locked_and_removed_files_are_not_processed(self):
+        watcher = self.watcher()
+        self.files['/watched/empty.csv'] = [0, 1]
+        self.files['/watched/locked.xlsx'] = [100, 1]
+        self.files['/watched/gone.csv'] = [100, 1]
+        self.poll(watcher)
+        del self.files['/watched/gone.csv']
+        with mock.patch('excel_sorter.FolderWatcher.can_open', lambda watcher, path: path != '/watched/locked.xlsx'):
+            self.assertEqual(self.poll(watcher, after=30), [])
+            self.assertEqual(set(watcher.pending), {'/watched/locked.xlsx'})
+        # Readable once the writer lets go of it
+        self.assertEqual(self.poll(watcher, after=5), ['/watched/locked.xlsx'])
+    
+    def test_files_are_processed_oldest_first(self):
+        watcher = self.watcher()
+        self.files.update({'/watched/b.csv': [100, 5], '/watched/a.csv': [100, 9], '/watched/c.xls': [100, 1]})
+        self.poll(watcher)
+        self.assertEqual(self.poll(watcher, after=10), ['/watched/c.xls', '/watched/b.csv', '/watched/a.csv'])
+    
+    def test_changed_files_are_processed_again(self):
+        sorter = FakeSorter()
+        watcher = self.watcher(sorter)
+        self.files['/watched/a.csv'] = [100, 1]
+        self.poll(watcher)
+        self.poll(watcher, after=10)
+        
+        self.files['/watched/a.csv'] = [100, 2]
+        self.assertEqual(self.poll(watcher, after=1), [])
+        self.assertEqual(self.poll(watcher, after=10), ['/watched/a.csv'])
+        self.assertEqual(sorter.calls, ['/watched/a.csv', '/watched/a.csv'])
+        self.assertEqual((watcher.files_done, watcher.rows_done), (2, 20))
+    
+    def test_failed_files_are_retried_only_once_changed(self):
+        sorter = FakeSorter(fail={'/watched/a.csv'})
+        watcher = self.watcher(sorter)
+        self.files['/watched/a.csv'] = [100, 1]
+        self.poll(watcher)
+        self.poll(watcher, after=10)
+        self.assertEqual(self.poll(watcher, after=30), [])
+        self.assertEqual(watcher.files_failed, 1)
+        
+        self.files['/watched/a.csv'] = [120, 2]
+        self.poll(watcher)
+        self.assertEqual(self.poll(watcher, after=10), ['/watched/a.csv'])
+    
+    def test_processed_versions_survive_a_restart(self):
+        self.files.update({'/watched/a.csv': [100, 1], '/watched/b.csv': [100, 1]})
+        watcher = self.watcher()
+        self.poll(watcher)
+        self.poll(watcher, after=10)
+        with open(os.path.join(self.output_dir, WATCH_STATE_FILE), encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {'/watched/a.csv': [100, 1], '/watched/b.csv': [100, 1]})
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, WATCH_STATE_FILE + '.tmp')))
+        
+        # Only the file changed while the watcher was stopped is processed after the restart
+        self.files['/watched/b.csv'] = [150, 2]
+        sorter = FakeSorter()
+        restarted = self.watcher(sorter)
+        self.poll(restarted)
+        self.poll(restarted, after=10)
+        self.assertEqual(sorter.calls, ['/watched/b.csv'])
+    
+    def test_unreadable_state_file_starts_fresh(self):
+        with open(os.path.join(self.output_dir, WATCH_STATE_FILE), 'w', encoding='utf-8') as f:
+            f.write('{"/watched/a.csv": [100')
+        self.assertEqual(self.watcher().processed, {})
+    
+    def test_run_once_waits_for_files_to_settle(self):
+        sorter = FakeSorter()
+        watcher = self.watcher(sorter)
+        self.files.update({'/watched/a.csv': [100, 1], '/watched/b.csv': [100, 2]})
+        self.assertTrue(watcher.run(once=True))
+        self.assertEqual(sorter.calls, ['/watched/a.csv', '/watched/b.csv'])
+        # Polled every 5 seconds until the 10 second settle delay had passed
+        self.assertEqual(self.clock.now, 1010.0)
+
+
+class ScanTest(unittest.TestCase):
+    def test_only_finished_input_files_are_listed(self):
+        with tempfile.TemporaryDirectory() as watch_dir, tempfile.TemporaryDirectory() as output_dir:
+            for name in ('leads.csv', 'LEADS2.XLSX', 'old.xls', '~$leads.xlsx', '.hidden.csv',
+                         'leads.csv.part', 'notes.txt'):
+                with open(os.path.join(watch_dir, name), 'w') as f:
+                    f.write('data')
+            os.mkdir(os.path.join(watch_dir, 'folder.csv'))
+            files = FolderWatcher(None, watch_dir, output_dir).scan()
+        self.assertEqual(sorted(os.path.basename(path) for path in files), ['LEADS2.XLSX', 'leads.csv', 'old.xls'])
+        self.assertTrue(all(version[0] == 4 for version in files.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
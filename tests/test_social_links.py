@@ -0,0 +1,71 @@
+"""Canonical social profile links found on business sites"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enrichment import canonical_social_link
+
+
+class CanonicalSocialLinkTest(unittest.TestCase):
+    def test_profiles(self):
+        cases = {
+            'https://www.facebook.com/AcmePlumbing/': ('Facebook', 'https://facebook.com/AcmePlumbing'),
+            'http://m.facebook.com/AcmePlumbing?ref=page_internal#top':
+                ('Facebook', 'https://facebook.com/AcmePlumbing'),
+            'https://facebook.com/profile.php?id=1234&sk=about':
+                ('Facebook', 'https://facebook.com/profile.php?id=1234'),
+            'https://facebook.com/pages/Acme-Plumbing/1234/reviews':
+                ('Facebook', 'https://facebook.com/pages/Acme-Plumbing/1234'),
+            '//twitter.com/acme': ('Twitter', 'https://twitter.com/acme'),
+            'https://x.com/acme/status/12345': ('Twitter', 'https://x.com/acme'),
+            'https://www.linkedin.com/company/acme/about/': ('LinkedIn', 'https://linkedin.com/company/acme'),
+            'https://instagram.com/acme/p/xyz': ('Instagram', 'https://instagram.com/acme'),
+            'https://www.youtube.com/channel/UCaBcD/videos': ('YouTube', 'https://youtube.com/channel/UCaBcD'),
+            'https://pinterest.com/acme/': ('Pinterest', 'https://pinterest.com/acme'),
+        }
+        for href, expected in cases.items():
+            with self.subTest(href=href):
+                self.assertEqual(canonical_social_link(href), expected)
+    
+    def test_share_buttons_intents_and_posts_are_not_profiles(self):
+        for href in [
+            'https://www.facebook.com/sharer/sharer.php?u=https://acme.example',
+            'https://facebook.com/share.php?u=x',
+            'https://facebook.com/events/123456/',
+            'https://facebook.com/watch/?v=123',
+            'https://facebook.com/photo.php?fbid=1',
+            'https://facebook.com/permalink.php?story_fbid=1&id=2',
+            'https://facebook.com/story.php?story_fbid=1',
+            'https://facebook.com/hashtag/plumbing',
+            'https://facebook.com/marketplace/item/1',
+            'https://facebook.com/gaming/acme',
+            'https://facebook.com/profile.php',
+            'https://twitter.com/intent/tweet?text=hi',
+            'https://x.com/share?url=x',
+            'https://www.linkedin.com/sharing/share-offsite/?url=x',
+            'https://linkedin.com/company',
+            'https://instagram.com/p/xyz',
+            'https://www.youtube.com/watch?v=abc',
+            'https://pinterest.com/pin/create/button/',
+            'https://facebook.com/',
+        ]:
+            with self.subTest(href=href):
+                self.assertIsNone(canonical_social_link(href))
+    
+    def test_host_must_be_the_platform_or_a_subdomain(self):
+        self.assertIsNone(canonical_social_link('https://box.com/acme'))
+        self.assertIsNone(canonical_social_link('https://notfacebook.com/acme'))
+        self.assertIsNone(canonical_social_link('https://facebook.com.evil.example/acme'))
+        self.assertEqual(canonical_social_link('https://mobile.x.com/acme'), ('Twitter', 'https://x.com/acme'))
+    
+    def test_relative_and_invalid_links(self):
+        self.assertIsNone(canonical_social_link('/facebook.com/acme'))
+        self.assertIsNone(canonical_social_link('mailto:info@acme.example'))
+        self.assertIsNone(canonical_social_link('https://[facebook.com/acme'))
+
+
+if __name__ == '__main__':
+    unittest.main()